@@ -0,0 +1,167 @@
+"""
+Benchmark weather parsing: per-row parsers vs the vectorized ones
+Builds synthetic ISD rows (including missing codes and malformed values)
+and ASOS sky layers, checks that both paths produce identical output and
+reports rows/second
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    from Src.data_processing import (parse_metar_field, parse_wind_field, parse_visibility_field,
+                                     parse_ceiling_field, parse_metar_column, parse_wind_column,
+                                     parse_visibility_column, parse_ceiling_column)
+    from Src.sky_conditions import CEILING_COVER_CODES, compute_ceiling_ft
+except ImportError:  # Running as a script from inside Src/
+    from data_processing import (parse_metar_field, parse_wind_field, parse_visibility_field,
+                                 parse_ceiling_field, parse_metar_column, parse_wind_column,
+                                 parse_visibility_column, parse_ceiling_column)
+    from sky_conditions import CEILING_COVER_CODES, compute_ceiling_ft
+
+
+def synthetic_isd(n_rows, seed=42):
+    """ISD-style TMP/DEW/WND/VIS/CIG/SLP columns with ~2% missing codes and a few oddities"""
+    rng = np.random.default_rng(seed)
+
+    def signed_tenths(values, width):
+        return [f"{'+' if v >= 0 else '-'}{abs(v):0{width}d}" for v in values]
+
+    temp = rng.integers(-300, 450, n_rows)
+    dew = temp - rng.integers(0, 200, n_rows)
+    df = pd.DataFrame({
+        'TMP': [f"{t},1" for t in signed_tenths(temp, 4)],
+        'DEW': [f"{t},1" for t in signed_tenths(dew, 4)],
+        'WND': [f"{d:03d},1,N,{s:04d},1" for d, s in zip(rng.integers(0, 37, n_rows) * 10,
+                                                         rng.integers(0, 250, n_rows))],
+        'VIS': [f"{v:06d},1,N,1" for v in rng.choice([400, 1600, 8000, 16093], n_rows)],
+        'CIG': [f"{c:05d},1,M,N" for c in rng.choice([213, 610, 1524, 3353, 22000], n_rows)],
+        'SLP': [f"{p:05d},1" for p in rng.integers(9800, 10400, n_rows)],
+    })
+
+    # Missing codes and malformed values, as found in real station files
+    oddities = {
+        'TMP': ['+9999,9', '', 'M,1', '12.5', '+01.5,1'],
+        'DEW': ['+9999,9', '-0005,1', None],
+        'WND': ['999,9,C,0000,1', '180,1,N,9999,9', '999.9,1,N,0010,1', '180,1,N,0010', '180,1', None],
+        'VIS': ['999999,9,N,9', '16093', 'ABC,1', None],
+        'CIG': ['99999,9,9,N', '22000,1', '0061A,1,M,N', None],
+        'SLP': ['99999,9', '1013.2', None],
+    }
+    n_odd = max(n_rows // 50, 1)
+    for column, values in oddities.items():
+        rows = rng.choice(n_rows, n_odd, replace=False)
+        df.loc[rows, column] = rng.choice(np.array(values, dtype=object), n_odd)
+    return df
+
+
+def synthetic_sky_layers(n_rows, seed=42):
+    """ASOS-style skyc1..4/skyl1..4 columns: increasing layer heights, unused layers missing"""
+    rng = np.random.default_rng(seed)
+    covers = np.array(['CLR', 'FEW', 'SCT', 'BKN', 'OVC', 'VV ', 'M'], dtype=object)
+
+    n_layers = rng.integers(0, 5, n_rows)
+    base = rng.integers(1, 50, n_rows) * 100.0
+    df = pd.DataFrame(index=range(n_rows))
+    for i in range(1, 5):
+        present = n_layers >= i
+        df[f'skyc{i}'] = np.where(present, rng.choice(covers, n_rows), None)
+        df[f'skyl{i}'] = np.where(present, base * i, np.nan)
+    return df
+
+
+def ceiling_rowwise(df):
+    """Row-wise reference: lowest layer whose coverage code is a ceiling"""
+    def row_ceiling(row):
+        heights = [row[f'skyl{i}'] for i in range(1, 5)
+                   if pd.notna(row[f'skyl{i}']) and str(row[f'skyc{i}']).strip().upper() in CEILING_COVER_CODES]
+        return min(heights, default=np.nan)
+
+    return pd.DataFrame({'ceiling_ft': df.apply(row_ceiling, axis=1)})
+
+
+def ceiling_vectorized(df):
+    return pd.DataFrame({'ceiling_ft': compute_ceiling_ft(df)})
+
+
+def parse_rowwise(df):
+    """Original per-row parsing (as clean_metar_data used to do it)"""
+    out = pd.DataFrame(index=df.index)
+    out['temperature_c'] = df['TMP'].apply(lambda x: parse_metar_field(x))
+    out['dewpoint_c'] = df['DEW'].apply(lambda x: parse_metar_field(x))
+    wind_data = df['WND'].apply(parse_wind_field)
+    out['wind_direction'] = [x[0] for x in wind_data]
+    out['wind_speed_kts'] = [x[1] for x in wind_data]
+    out['visibility_km'] = df['VIS'].apply(parse_visibility_field)
+    out['ceiling_ft'] = df['CIG'].apply(parse_ceiling_field)
+    out['sea_level_pressure_mb'] = df['SLP'].apply(lambda x: parse_metar_field(x))
+    return out
+
+
+def parse_vectorized(df):
+    out = pd.DataFrame(index=df.index)
+    out['temperature_c'] = parse_metar_column(df['TMP'])
+    out['dewpoint_c'] = parse_metar_column(df['DEW'])
+    out['wind_direction'], out['wind_speed_kts'] = parse_wind_column(df['WND'])
+    out['visibility_km'] = parse_visibility_column(df['VIS'])
+    out['ceiling_ft'] = parse_ceiling_column(df['CIG'])
+    out['sea_level_pressure_mb'] = parse_metar_column(df['SLP'])
+    return out
+
+
+def run_benchmark(name, n_rows, baseline, candidate, compare):
+    """Time both paths once each, check they agree and print rows/second"""
+    start = time.perf_counter()
+    expected = baseline()
+    baseline_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = candidate()
+    candidate_s = time.perf_counter() - start
+
+    identical = compare(expected, actual)
+    print(f"\n{name} ({n_rows:,} rows)")
+    print(f"  Row-wise:   {baseline_s:8.3f}s  {n_rows / baseline_s:>12,.0f} rows/s")
+    print(f"  Vectorized: {candidate_s:8.3f}s  {n_rows / candidate_s:>12,.0f} rows/s")
+    print(f"  Speedup: {baseline_s / candidate_s:.1f}x   Identical output: {'yes' if identical else 'NO'}")
+    return identical
+
+
+def frames_identical(expected, actual):
+    """Same values, NaN in the same places"""
+    for column in expected.columns:
+        a = expected[column].to_numpy(dtype=np.float64)
+        b = actual[column].to_numpy(dtype=np.float64)
+        if not np.array_equal(a, b, equal_nan=True):
+            print(f"  Mismatch in {column}: {np.count_nonzero(~((a == b) | (np.isnan(a) & np.isnan(b))))} rows")
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark row-wise vs vectorized weather parsing")
+    parser.add_argument('--rows', type=int, default=200_000, help="Synthetic ISD rows")
+    parser.add_argument('--sky-rows', type=int, default=1_000_000, help="Synthetic ASOS sky-layer rows")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("WEATHER PARSING BENCHMARK")
+    print("="*60)
+
+    df = synthetic_isd(args.rows)
+    ok = run_benchmark("ISD fields (TMP, DEW, WND, VIS, CIG, SLP)", args.rows,
+                       lambda: parse_rowwise(df), lambda: parse_vectorized(df), frames_identical)
+
+    sky = synthetic_sky_layers(args.sky_rows)
+    ok &= run_benchmark("Ceiling from sky layers (skyc/skyl 1-4)", args.sky_rows,
+                        lambda: ceiling_rowwise(sky), lambda: ceiling_vectorized(sky), frames_identical)
+
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Compiled tree-ensemble evaluator
+Flattens a zone's XGBoost booster into contiguous NumPy arrays and scores
+batches level by level, so serving needs neither xgboost nor sklearn
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+# Rows scored per pass; bounds the (rows x trees) index matrices
+CHUNK_ROWS = 512
+
+# Trees are padded to perfect binary trees, so memory grows as 2**depth
+MAX_COMPILED_DEPTH = 12
+
+
+class CompiledEnsemble:
+    """
+    Flattened regression tree ensemble
+
+    Every tree is padded to a perfect binary tree of depth `max_depth` and
+    stored breadth-first: internal node i has children 2i+1 and 2i+2, so the
+    child links are implicit and a level step is pure arithmetic. A leaf
+    reached above the bottom level is replicated across all bottom slots of
+    its subtree, which makes whatever the padding nodes decide irrelevant.
+
+    Arrays (T trees, D = max_depth):
+      feature, threshold, default_left : (T, 2**D - 1) split nodes
+      leaf_value                       : (T, 2**D) bottom-level values
+    """
+
+    def __init__(self, feature, threshold, default_left, leaf_value,
+                 base_score, features, mean=None, scale=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.base_score = float(base_score)
+        self.features = list(features)
+        # Present when compiled from a model that still expects scaled input
+        self.mean = mean
+        self.scale = scale
+
+        n_trees, n_internal = feature.shape
+        self.max_depth = int(np.log2(n_internal + 1))
+        self._feature = feature.ravel().astype(np.intp)
+        self._threshold = threshold.ravel()
+        self._default_left = default_left.ravel()
+        self._leaf_value = leaf_value.ravel()
+        self._tree_offset = (np.arange(n_trees, dtype=np.intp) * n_internal)[np.newaxis, :]
+        self._leaf_offset = (np.arange(n_trees, dtype=np.intp) * leaf_value.shape[1])[np.newaxis, :]
+
+    @property
+    def n_trees(self):
+        return self.feature.shape[0]
+
+    def _prepare(self, X):
+        """Raw rows -> float32 matrix the trees compare against"""
+        if self.mean is not None:
+            X = (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+        return np.asarray(X, dtype=np.float32)
+
+    def _predict_chunk(self, X):
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.intp) * n_features)[:, np.newaxis]
+        has_missing = np.isnan(X).any()
+
+        # Position of every (row, tree) pair within its current level
+        position = np.zeros((n_rows, self.n_trees), dtype=np.intp)
+        for level in range(self.max_depth):
+            node = self._tree_offset + (2**level - 1) + position
+            x = flat[row_offset + self._feature[node]]
+            go_right = x >= self._threshold[node]
+            if has_missing:
+                missing = np.isnan(x)
+                go_right[missing] = ~self._default_left[node[missing]]
+            position = 2 * position + go_right
+
+        leaves = self._leaf_value[self._leaf_offset + position]
+        return leaves.sum(axis=1, dtype=np.float64) + self.base_score
+
+    def predict(self, X):
+        """Score an N x F matrix (or a single row); matches XGBRegressor.predict"""
+        X = self._prepare(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            stop = start + CHUNK_ROWS
+            out[start:stop] = self._predict_chunk(X[start:stop])
+        return out.astype(np.float32)
+
+    def save(self, path):
+        """Write the ensemble as an uncompressed .npz (loads with NumPy only)"""
+        arrays = {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'default_left': self.default_left,
+            'leaf_value': self.leaf_value,
+            'base_score': np.float64(self.base_score),
+            'features': np.array(self.features),
+        }
+        if self.mean is not None:
+            arrays['mean'] = self.mean
+            arrays['scale'] = self.scale
+        np.savez(path, **arrays)
+
+
+def load_compiled(path):
+    """Load a CompiledEnsemble written by CompiledEnsemble.save"""
+    with np.load(path, allow_pickle=False) as data:
+        return CompiledEnsemble(
+            feature=data['feature'],
+            threshold=data['threshold'],
+            default_left=data['default_left'],
+            leaf_value=data['leaf_value'],
+            base_score=data['base_score'],
+            features=[str(name) for name in data['features']],
+            mean=data['mean'] if 'mean' in data else None,
+            scale=data['scale'] if 'scale' in data else None,
+        )
+
+
+def _parse_base_score(value):
+    # Stored as e.g. '[4.490026E0]' by XGBoost >= 3, '4.49E0' before that
+    return float(str(value).strip('[]'))
+
+
+def compile_model(model, features, scaler=None):
+    """
+    Flatten a fitted XGBRegressor into a CompiledEnsemble
+
+    Parameters:
+    -----------
+    model : xgb.XGBRegressor
+        Fitted squared-error regressor (gbtree, numeric splits)
+    features : list of str
+        Feature names in model column order
+    scaler : StandardScaler, optional
+        Scaler the model expects in front of it; its mean/scale are embedded
+        and applied by the evaluator
+
+    Returns:
+    --------
+    CompiledEnsemble
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    model_json = json.loads(booster.save_raw(raw_format='json'))
+    learner = model_json['learner']
+
+    objective = learner['objective']['name']
+    if objective != 'reg:squarederror':
+        raise ValueError(f"Unsupported objective for compilation: {objective}")
+
+    gradient_booster = learner['gradient_booster']
+    if gradient_booster['name'] != 'gbtree':
+        raise ValueError(f"Unsupported booster for compilation: {gradient_booster['name']}")
+    trees = gradient_booster['model']['trees']
+
+    # Honor early stopping the same way XGBRegressor.predict does
+    best_iteration = booster.attr('best_iteration')
+    if best_iteration is not None:
+        indptr = gradient_booster['model']['iteration_indptr']
+        trees = trees[:indptr[int(best_iteration) + 1]]
+
+    # Depth of every node; parents always precede children in XGBoost dumps
+    depths = []
+    for tree in trees:
+        if any(split_type != 0 for split_type in tree.get('split_type', [])):
+            raise ValueError("Categorical splits are not supported")
+        left, right = tree['left_children'], tree['right_children']
+        depth = [0] * len(left)
+        for node in range(len(left)):
+            if left[node] != -1:
+                depth[left[node]] = depth[right[node]] = depth[node] + 1
+        depths.append(depth)
+
+    max_depth = max(max(depth) for depth in depths)
+    if max_depth > MAX_COMPILED_DEPTH:
+        raise ValueError(f"Trees of depth {max_depth} are too deep to compile (max {MAX_COMPILED_DEPTH})")
+
+    n_internal = 2**max_depth - 1
+    feature = np.zeros((len(trees), n_internal), dtype=np.int32)
+    threshold = np.zeros((len(trees), n_internal), dtype=np.float32)
+    default_left = np.ones((len(trees), n_internal), dtype=bool)
+    leaf_value = np.zeros((len(trees), n_internal + 1), dtype=np.float32)
+
+    for t, tree in enumerate(trees):
+        left, right = tree['left_children'], tree['right_children']
+        conditions = tree['split_conditions']
+
+        # (xgboost node, position within its level)
+        stack = [(0, 0)]
+        while stack:
+            node, position = stack.pop()
+            level = depths[t][node]
+            if left[node] == -1:
+                span = 2**(max_depth - level)
+                leaf_value[t, position * span:(position + 1) * span] = conditions[node]
+                continue
+
+            slot = 2**level - 1 + position
+            feature[t, slot] = tree['split_indices'][node]
+            threshold[t, slot] = conditions[node]
+            default_left[t, slot] = bool(tree['default_left'][node])
+            stack.append((left[node], 2 * position))
+            stack.append((right[node], 2 * position + 1))
+
+    mean = scale = None
+    if scaler is not None:
+        mean = np.asarray(scaler.mean_ if getattr(scaler, 'with_mean', True) else np.zeros(len(features)),
+                          dtype=np.float64)
+        scale = np.asarray(scaler.scale_ if getattr(scaler, 'with_std', True) else np.ones(len(features)),
+                           dtype=np.float64)
+
+    return CompiledEnsemble(
+        feature, threshold, default_left, leaf_value,
+        _parse_base_score(learner['learner_model_param']['base_score']),
+        features, mean, scale
+    )
+
+
+def export_compiled_model(zone_name, model_dir=None):
+    """
+    Compile a zone's artifacts to {zone}_compiled.npz
+
+    Uses the scaler-free raw model when it is current, otherwise the scaled
+    model with its scaler embedded. Returns (compiled, source model, scaler).
+    """
+    import joblib
+
+    try:
+        from Src.zone_model_registry import MODEL_DIR, zone_artifact_paths
+    except ImportError:  # Running as a script from inside Src/
+        from zone_model_registry import MODEL_DIR, zone_artifact_paths
+
+    paths = zone_artifact_paths(zone_name, model_dir or MODEL_DIR)
+    with open(paths['features'], 'r') as f:
+        features = [line.strip() for line in f.readlines() if line.strip()]
+
+    use_raw = os.path.exists(paths['raw_model']) and (
+        not os.path.exists(paths['model'])
+        or os.path.getmtime(paths['raw_model']) >= os.path.getmtime(paths['model'])
+    )
+    if use_raw:
+        model, scaler = joblib.load(paths['raw_model']), None
+    else:
+        model, scaler = joblib.load(paths['model']), joblib.load(paths['scaler'])
+
+    compiled = compile_model(model, features, scaler)
+    compiled.save(paths['compiled'])
+    print(f"✅ Compiled {compiled.n_trees} trees (depth ≤ {compiled.max_depth}) to {paths['compiled']}")
+
+    return compiled, model, scaler
+
+
+def _time_call(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return np.median(timings)
+
+
+def compare_backends(compiled, model, scaler, n_rows=10000, seed=42):
+    """Max prediction difference vs XGBoost, plus single-row and batch latency"""
+    rng = np.random.default_rng(seed)
+    n_features = len(compiled.features)
+    if scaler is not None:
+        center, spread = scaler.mean_, scaler.scale_
+    else:
+        center, spread = np.zeros(n_features), np.ones(n_features)
+    X = np.round(rng.normal(center, spread * 1.5, size=(n_rows, n_features)), 2)
+    X[rng.random(X.shape) < 0.01] = np.nan
+
+    def xgb_predict(rows):
+        if scaler is not None:
+            rows = (rows - scaler.mean_) / scaler.scale_
+        return model.predict(rows)
+
+    max_diff = float(np.nanmax(np.abs(compiled.predict(X) - xgb_predict(X))))
+
+    single = X[:1]
+    return {
+        'max_abs_diff': max_diff,
+        'xgboost_1_row_ms': _time_call(lambda: xgb_predict(single), 200) * 1000,
+        'compiled_1_row_ms': _time_call(lambda: compiled.predict(single), 200) * 1000,
+        'xgboost_batch_ms': _time_call(lambda: xgb_predict(X), 10) * 1000,
+        'compiled_batch_ms': _time_call(lambda: compiled.predict(X), 10) * 1000,
+        'batch_rows': n_rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile zone models to NumPy arrays")
+    parser.add_argument('--zones', nargs='+', help="Zones to compile (default: every zone with a model)")
+    parser.add_argument('--model-dir', default=None)
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Compare against XGBoost on 1-row and 10k-row batches")
+    args = parser.parse_args()
+
+    try:
+        from Src.zone_model_registry import MODEL_DIR
+    except ImportError:  # Running as a script from inside Src/
+        from zone_model_registry import MODEL_DIR
+    model_dir = args.model_dir or MODEL_DIR
+
+    zones = args.zones or sorted(
+        name[:-len('_features.txt')] for name in os.listdir(model_dir) if name.endswith('_features.txt')
+    )
+
+    print("="*60)
+    print("COMPILED ZONE MODEL EXPORT")
+    print("="*60)
+
+    for zone_name in zones:
+        print(f"\n{zone_name}:")
+        try:
+            compiled, model, scaler = export_compiled_model(zone_name, model_dir)
+        except FileNotFoundError:
+            print(f"  ⚠️  Skipping {zone_name}: model files not found")
+            continue
+
+        if args.benchmark:
+            result = compare_backends(compiled, model, scaler)
+            print(f"  Max |compiled - xgboost|: {result['max_abs_diff']:.2e}")
+            print(f"  1 row:      xgboost {result['xgboost_1_row_ms']:.3f} ms, "
+                  f"compiled {result['compiled_1_row_ms']:.3f} ms")
+            print(f"  {result['batch_rows']:,} rows: xgboost {result['xgboost_batch_ms']:.1f} ms, "
+                  f"compiled {result['compiled_batch_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,13 @@ import re
 from datetime import datetime
 warnings.filterwarnings('ignore')
 
+try:
+    from Src.sky_conditions import compute_ceiling_ft
+    from Src.dtype_policy import compact_dtypes, enable_memory_report, report_memory
+except ImportError:  # Running as a script from inside Src/
+    from sky_conditions import compute_ceiling_ft
+    from dtype_policy import compact_dtypes, enable_memory_report, report_memory
+
 def parse_metar_field(value, field_type='float'):
     """Parse METAR format fields (e.g., '+0128,1' -> 12.8)"""
     if pd.isna(value) or value == '':
@@ -46,8 +53,11 @@ def parse_metar_field(value, field_type='float'):
     except:
         return np.nan
 
+# ISD reports wind speed in m/s; the models use knots, like METAR and the AUS sknt column
+KNOTS_PER_MPS = 1.94384
+
 def parse_wind_field(value):
-    """Parse wind field (e.g., '350,1,N,0082,1' -> direction, speed, quality flags)"""
+    """Parse wind field (e.g., '350,1,N,0082,1' -> direction, speed in knots, quality flags)"""
     if pd.isna(value) or value == '':
         return np.nan, np.nan, np.nan
     
@@ -56,13 +66,16 @@ def parse_wind_field(value):
         if len(parts) >= 4:
             direction = parse_metar_field(parts[0])
             quality_code = parts[1]
-            speed = parse_metar_field(parts[2] + ',' + parts[3])
+            # parts[2] is the observation type; speed is m/s in tenths (e.g. '0082' -> 8.2)
+            speed = parse_metar_field(parts[3] + ',' + (parts[4] if len(parts) > 4 else ''))
             
-            # Handle missing values
-            if direction == 999.9 or speed == 999.9:
-                return np.nan, np.nan, np.nan
+            # Handle missing values (direction 999, e.g. calm or variable; speed 9999)
+            if direction == 999:
+                direction = np.nan
+            if speed == 999.9:
+                speed = np.nan
             
-            return direction, speed, quality_code
+            return direction, speed * KNOTS_PER_MPS, quality_code
     except:
         pass
     
@@ -114,49 +127,223 @@ def parse_ceiling_field(value):
     
     return np.nan
 
-def clean_metar_data(metar_df):
-    """Clean and extract useful features from METAR data"""
-    print("\nCleaning METAR data...")
-    print(f"Original shape: {metar_df.shape}")
-    
-    # Parse key fields
-    print("Parsing METAR fields...")
-    
-    # Parse temperature
-    metar_df['temperature_c'] = metar_df['TMP'].apply(lambda x: parse_metar_field(x))
-    
-    # Parse dewpoint
-    metar_df['dewpoint_c'] = metar_df['DEW'].apply(lambda x: parse_metar_field(x))
+# Vectorized ISD parsers: same results as the per-value parsers above.
+# A station file repeats a small set of codes ('+0128,1', '350,1,N,0082,1')
+# millions of times, so each column is factorized first and only its
+# distinct values are decoded: laid out as a fixed-width character matrix,
+# with the numeric fields computed by array arithmetic. Values that don't
+# follow the usual layout (decimals, stray letters, no commas) are rare and
+# go through the scalar parser.
+
+PARSE_BLOCK_ROWS = 100_000
+
+# Field decoding is exact while the digits fit a float64 mantissa
+_MAX_DIGITS = 15
+_POWERS_OF_TEN = 10.0 ** np.arange(32)
+
+_COMMA, _PLUS, _MINUS, _ZERO, _NINE = (ord(c) for c in ',+-09')
+
+class _FieldMatrix:
+    """Character-code matrix of a block of comma-separated values"""
+
+    def __init__(self, text):
+        width = max(text.dtype.itemsize // 4, 1)
+        self.codes = text.view(np.uint32).reshape(len(text), width) if len(text) else np.zeros((0, 1), np.uint32)
+        is_comma = self.codes == _COMMA
+        # Field number of every character (commas belong to the field they end)
+        self.field = np.cumsum(is_comma, axis=1) - is_comma
+        self.in_value = (self.codes != 0) & ~is_comma
+        self.n_commas = is_comma.sum(axis=1)
+
+    def number(self, k, signed):
+        """
+        Field k as [sign] digits -> (value, valid)
+
+        valid is False where the field is empty, has any other character,
+        or has too many digits to decode exactly.
+        """
+        chars = self.in_value & (self.field == k)
+        codes = self.codes
+
+        # A leading sign is the field's first character
+        first = np.argmax(chars, axis=1)
+        first_code = codes[np.arange(len(codes)), first]
+        has_sign = chars.any(axis=1) & ((first_code == _PLUS) | (first_code == _MINUS))
+        negative = has_sign & (first_code == _MINUS)
+        if signed:
+            chars = chars.copy()
+            chars[np.arange(len(codes))[has_sign], first[has_sign]] = False
+
+        is_digit = (codes >= _ZERO) & (codes <= _NINE)
+        n_digits = chars.sum(axis=1)
+        valid = (n_digits > 0) & (n_digits <= _MAX_DIGITS) & ~(chars & ~is_digit).any(axis=1)
+        if not signed:
+            valid &= ~has_sign
+
+        # Place value of each digit: how many field digits follow it
+        place = np.cumsum(chars[:, ::-1], axis=1)[:, ::-1] - 1
+        digits = np.where(chars & is_digit, codes.astype(np.int64) - _ZERO, 0)
+        value = (digits * _POWERS_OF_TEN[np.clip(place, 0, len(_POWERS_OF_TEN) - 1)]).sum(axis=1)
+        value = np.where(negative, -value, value) if signed else value
+        return value, valid
+
+def _parse_codes(values, n_outputs, parse_block, scalar):
+    """
+    Decode a column through its distinct values
+
+    parse_block(matrix) returns (outputs, fast): outputs are the parsed
+    arrays and fast marks the values it handled. Every other value is
+    parsed by `scalar` (the per-value parser). Missing values give NaN.
+    """
+    codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+    uniques = np.asarray(uniques, dtype=object)
+    text = uniques.astype(str)
+
+    outputs = [np.full(len(text) + 1, np.nan) for _ in range(n_outputs)]
+    for start in range(0, len(text), PARSE_BLOCK_ROWS):
+        block = slice(start, min(start + PARSE_BLOCK_ROWS, len(text)))
+        parsed, fast = parse_block(_FieldMatrix(text[block]))
+
+        for i in np.flatnonzero(~fast):
+            result = scalar(uniques[start + i])
+            for output_values, value in zip(parsed, result if n_outputs > 1 else (result,)):
+                output_values[i] = value
+
+        for output, output_values in zip(outputs, parsed):
+            output[block] = output_values
+
+    # The extra last slot stays NaN and is what missing values (code -1) pick up
+    return [output[codes] for output in outputs]
+
+def _mask_tenths(value):
+    """parse_metar_field's missing codes: 999.9 and 9999.9"""
+    value = value / 10.0
+    value[(value == 9999.9) | (value == 999.9)] = np.nan
+    return value
+
+def parse_metar_column(values):
+    """Vectorized parse_metar_field (e.g. '+0128,1' -> 12.8)"""
+    def parse_block(m):
+        value, valid = m.number(0, signed=True)
+        return [_mask_tenths(value)], valid & (m.n_commas >= 1)
+
+    return _parse_codes(values, 1, parse_block, parse_metar_field)[0]
+
+def parse_wind_column(values):
+    """Vectorized parse_wind_field: (direction, speed in knots) arrays"""
+    def parse_block(m):
+        direction, direction_valid = m.number(0, signed=True)
+        speed, speed_valid = m.number(3, signed=True)
+        speed = _mask_tenths(speed)
+
+        direction[direction == 999] = np.nan
+        return [direction, speed * KNOTS_PER_MPS], direction_valid & speed_valid & (m.n_commas >= 3)
+
+    def scalar(value):
+        direction, speed, _ = parse_wind_field(value)
+        return direction, speed
+
+    direction, speed = _parse_codes(values, 2, parse_block, scalar)
+    return direction, speed
+
+def parse_visibility_column(values):
+    """Vectorized parse_visibility_field: km, NaN for 999999"""
+    def parse_block(m):
+        visibility, valid = m.number(0, signed=False)
+        visibility = visibility / 1000.0
+        visibility[visibility >= 999.0] = np.nan
+        return [visibility], valid & (m.n_commas >= 1)
+
+    return _parse_codes(values, 1, parse_block, parse_visibility_field)[0]
+
+def parse_ceiling_column(values):
+    """Vectorized parse_ceiling_field: NaN for 99999 (22000, UNLIMITED_CEILING_FT, is kept)"""
+    def parse_block(m):
+        height, valid = m.number(0, signed=False)
+        height[height >= 99999] = np.nan
+        return [height], valid & (m.n_commas >= 2)
+
+    return _parse_codes(values, 1, parse_block, parse_ceiling_field)[0]
+
+# Raw ISD columns the cleaning step reads; everything else in the station file is ignored
+METAR_RAW_COLUMNS = ['STATION', 'DATE', 'TMP', 'DEW', 'WND', 'VIS', 'CIG', 'SLP']
+
+METAR_CLEAN_COLUMNS = ['STATION', 'DATE', 'date', 'temperature_c', 'dewpoint_c',
+                       'wind_direction', 'wind_speed_kts', 'visibility_km',
+                       'ceiling_ft', 'sea_level_pressure_mb']
+
+def parse_metar_frame(metar_df):
+    """Parsed METAR columns of a raw ISD frame (or chunk of one)"""
+    metar_clean = pd.DataFrame({
+        'STATION': metar_df['STATION'].to_numpy(),
+        'DATE': metar_df['DATE'].to_numpy(),
+        
+        # Parse date
+        'date': pd.to_datetime(metar_df['DATE']).to_numpy(),
+        
+        # Parse temperature and dewpoint
+        'temperature_c': parse_metar_column(metar_df['TMP']),
+        'dewpoint_c': parse_metar_column(metar_df['DEW']),
+    })
     
     # Parse wind
-    wind_data = metar_df['WND'].apply(parse_wind_field)
-    metar_df['wind_direction'] = [x[0] for x in wind_data]
-    metar_df['wind_speed_kts'] = [x[1] for x in wind_data]
+    metar_clean['wind_direction'], metar_clean['wind_speed_kts'] = parse_wind_column(metar_df['WND'])
     
     # Parse visibility
-    metar_df['visibility_km'] = metar_df['VIS'].apply(parse_visibility_field)
+    metar_clean['visibility_km'] = parse_visibility_column(metar_df['VIS'])
     
     # Parse ceiling
-    metar_df['ceiling_ft'] = metar_df['CIG'].apply(parse_ceiling_field)
+    metar_clean['ceiling_ft'] = parse_ceiling_column(metar_df['CIG'])
     
     # Parse pressure
-    metar_df['sea_level_pressure_mb'] = metar_df['SLP'].apply(lambda x: parse_metar_field(x))
-    
-    # Parse date
-    metar_df['date'] = pd.to_datetime(metar_df['DATE'])
+    metar_clean['sea_level_pressure_mb'] = parse_metar_column(metar_df['SLP'])
     
-    # Keep only parsed columns and key identifiers
-    key_columns = ['STATION', 'DATE', 'date', 'temperature_c', 'dewpoint_c', 
-                   'wind_direction', 'wind_speed_kts', 'visibility_km', 
-                   'ceiling_ft', 'sea_level_pressure_mb']
+    # `date` is the observation timestamp here, not a calendar day
+    return compact_dtypes(metar_clean[METAR_CLEAN_COLUMNS], date_columns=())
+
+def clean_metar_data(metar_df):
+    """Clean and extract useful features from METAR data"""
+    print("\nCleaning METAR data...")
+    print(f"Original shape: {metar_df.shape}")
     
-    metar_clean = metar_df[key_columns].copy()
+    # Parse key fields
+    print("Parsing METAR fields...")
+    metar_clean = parse_metar_frame(metar_df)
     
     print(f"Cleaned shape: {metar_clean.shape}")
     print(f"Sample of cleaned data:\n{metar_clean.head()}")
     
     return metar_clean
 
+def ingest_metar_csv(input_path, output_path, chunksize=100_000):
+    """
+    Stream a raw ISD station CSV into a cleaned CSV
+    
+    Only METAR_RAW_COLUMNS are read, `chunksize` rows at a time, and each
+    cleaned chunk is appended to `output_path`. Peak memory follows the
+    chunk size, not the file size.
+    
+    Returns:
+    --------
+    int
+        Number of rows written
+    """
+    print(f"\nStreaming METAR data from {input_path} ({chunksize:,} rows per chunk)...")
+    
+    rows = 0
+    reader = pd.read_csv(input_path, usecols=METAR_RAW_COLUMNS, dtype=str, chunksize=chunksize)
+    for i, chunk in enumerate(reader):
+        metar_clean = parse_metar_frame(chunk)
+        metar_clean.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        rows += len(metar_clean)
+        print(f"  Chunk {i + 1}: {rows:,} rows cleaned")
+    
+    if rows == 0:
+        pd.DataFrame(columns=METAR_CLEAN_COLUMNS).to_csv(output_path, index=False)
+    
+    print(f"Cleaned METAR data saved to {output_path}")
+    return rows
+
 def clean_aus_data(aus_df):
     """Clean and process AUS airport data"""
     print("\nCleaning AUS data...")
@@ -164,7 +351,7 @@ def clean_aus_data(aus_df):
     
     # Convert columns to appropriate types
     aus_df['valid'] = pd.to_datetime(aus_df['valid'])
-    aus_df['date'] = aus_df['valid'].dt.date
+    aus_df['date'] = aus_df['valid'].dt.normalize()
     
     # Convert temperature from Fahrenheit to Celsius
     aus_df['temperature_c'] = (aus_df['tmpf'] - 32) * 5/9
@@ -179,10 +366,8 @@ def clean_aus_data(aus_df):
     # Visibility (convert from miles to km)
     aus_df['visibility_km'] = aus_df['vsby'] * 1.60934
     
-    # Ceiling - need to extract from sky layers
-    aus_df['ceiling_ft'] = aus_df[['skyl1', 'skyl2', 'skyl3']].apply(
-        lambda row: min([x for x in row if pd.notna(x)], default=np.nan), axis=1
-    )
+    # Ceiling: lowest broken/overcast layer
+    aus_df['ceiling_ft'] = compute_ceiling_ft(aus_df)
     
     # Pressure
     aus_df['sea_level_pressure_mb'] = aus_df['mslp']
@@ -192,23 +377,75 @@ def clean_aus_data(aus_df):
                    'wind_direction', 'wind_speed_kts', 'visibility_km',
                    'ceiling_ft', 'sea_level_pressure_mb', 'gust', 'relh']
     
-    aus_clean = aus_df[key_columns].copy()
+    aus_clean = compact_dtypes(aus_df[key_columns].copy())
     
     print(f"Cleaned shape: {aus_clean.shape}")
     print(f"Sample of cleaned data:\n{aus_clean.head()}")
     
     return aus_clean
 
-def combine_datasets(metar_clean, aus_clean):
-    """Combine both datasets on date"""
+def legacy_join_rows(metar_clean, aus_clean):
+    """Rows the date-only join would produce (sum over days of AUS rows x METAR rows), without building it"""
+    aus_days = pd.to_datetime(aus_clean['date']).dt.normalize().value_counts()
+    metar_days = pd.to_datetime(metar_clean['date']).dt.normalize().value_counts()
+    return int((aus_days * metar_days).dropna().sum())
+
+def combine_datasets(metar_clean, aus_clean, how='asof', tolerance='30min'):
+    """
+    Combine both datasets
+
+    Parameters:
+    -----------
+    metar_clean : pd.DataFrame
+        Cleaned ISD observations (`date` is the observation timestamp)
+    aus_clean : pd.DataFrame
+        Cleaned AUS observations (`valid` is the observation timestamp)
+    how : str
+        'asof' pairs each AUS observation with the nearest METAR observation
+        within `tolerance` (sort-based, one output row per matched AUS row).
+        'date' is the legacy join: every AUS row with every METAR row of the
+        same day
+    tolerance : str or pd.Timedelta
+        Maximum time between paired observations for 'asof'
+
+    Returns:
+    --------
+    pd.DataFrame
+        Combined observations, overlapping columns suffixed _aus/_metar
+    """
     print("\nCombining datasets...")
     
-    # Ensure date columns are the same type
-    metar_clean['date'] = pd.to_datetime(metar_clean['date']).dt.date
-    aus_clean['date'] = pd.to_datetime(aus_clean['date']).dt.date
+    if how == 'date':
+        # Ensure date columns are the same type
+        metar_clean['date'] = pd.to_datetime(metar_clean['date']).dt.normalize()
+        aus_clean['date'] = pd.to_datetime(aus_clean['date']).dt.normalize()
+        
+        # Merge on date
+        combined = pd.merge(aus_clean, metar_clean, on='date', how='inner', suffixes=('_aus', '_metar'))
+    elif how == 'asof':
+        legacy_rows = legacy_join_rows(metar_clean, aus_clean)
+        
+        # merge_asof needs both keys sorted, non-null and of the same resolution
+        left = aus_clean.assign(valid=pd.to_datetime(aus_clean['valid']).astype('datetime64[ns]'))
+        left = left.dropna(subset=['valid']).sort_values('valid', kind='stable')
+        right = metar_clean.assign(metar_time=pd.to_datetime(metar_clean['date']).astype('datetime64[ns]'))
+        right = right.drop(columns=['date']).dropna(subset=['metar_time']).sort_values('metar_time', kind='stable')
+        
+        combined = pd.merge_asof(left, right, left_on='valid', right_on='metar_time', direction='nearest',
+                                 tolerance=pd.Timedelta(tolerance), suffixes=('_aus', '_metar'))
+        
+        # Inner join: drop AUS rows with no METAR observation within tolerance
+        matched = combined['metar_time'].notna()
+        combined = combined[matched].drop(columns=['metar_time']).reset_index(drop=True)
+        
+        print(f"As-of join (nearest within ±{tolerance}): {len(combined):,} rows, "
+              f"{len(left) - len(combined):,} AUS observations unmatched")
+        print(f"Date-only join would produce {legacy_rows:,} rows "
+              f"({legacy_rows / max(len(combined), 1):.1f}x the as-of result)")
+    else:
+        raise ValueError(f"Unknown join mode '{how}' (expected 'asof' or 'date')")
     
-    # Merge on date
-    combined = pd.merge(aus_clean, metar_clean, on='date', how='inner', suffixes=('_aus', '_metar'))
+    combined = compact_dtypes(combined)
     
     print(f"Combined shape: {combined.shape}")
     print(f"Sample of combined data:\n{combined.head()}")
@@ -216,23 +453,51 @@ def combine_datasets(metar_clean, aus_clean):
     return combined
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Clean and combine weather data")
+    parser.add_argument('--chunksize', type=int, default=100_000,
+                        help="Rows per chunk when streaming the ISD station file")
+    parser.add_argument('--in-memory', action='store_true',
+                        help="Load the whole ISD file at once instead of streaming it")
+    parser.add_argument('--join', choices=['asof', 'date'], default='asof',
+                        help="asof: nearest METAR per AUS observation; date: legacy same-day join")
+    parser.add_argument('--tolerance', default='30min',
+                        help="Maximum time between paired observations for the as-of join")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="Print the memory used by each stage's frame")
+    args = parser.parse_args()
+    enable_memory_report(args.memory_report)
+    
     # Load data
     print("="*60)
     print("WEATHER DATA PROCESSING FOR FLIGHT RISK SCORING")
     print("="*60)
     
-    metar_df = pd.read_csv('Data/4152601.csv', low_memory=False)
-    aus_df = pd.read_csv('Data/AUS.csv', low_memory=False)
+    if args.in_memory:
+        metar_df = pd.read_csv('Data/4152601.csv', usecols=METAR_RAW_COLUMNS, dtype=str)
+        print(f"\nLoaded METAR data: {metar_df.shape}")
+        report_memory('METAR raw', metar_df)
+        metar_clean = clean_metar_data(metar_df)
+        del metar_df
+    else:
+        # Stream the station file; only the compact cleaned columns are read back
+        ingest_metar_csv('Data/4152601.csv', 'Data/metar_clean.csv', chunksize=args.chunksize)
+        metar_clean = compact_dtypes(pd.read_csv('Data/metar_clean.csv', parse_dates=['date']), date_columns=())
+        print(f"\nLoaded cleaned METAR data: {metar_clean.shape}")
     
-    print(f"\nLoaded METAR data: {metar_df.shape}")
+    aus_df = pd.read_csv('Data/AUS.csv', low_memory=False)
     print(f"Loaded AUS data: {aus_df.shape}")
+    report_memory('METAR cleaned', metar_clean)
+    report_memory('AUS raw', aus_df)
     
     # Clean data
-    metar_clean = clean_metar_data(metar_df)
     aus_clean = clean_aus_data(aus_df)
+    report_memory('AUS cleaned', aus_clean)
     
     # Combine datasets
-    combined = combine_datasets(metar_clean, aus_clean)
+    combined = combine_datasets(metar_clean, aus_clean, how=args.join, tolerance=args.tolerance)
+    report_memory('Combined', combined)
     
     # Save cleaned data
     combined.to_csv('Data/cleaned_weather_data.csv', index=False)
@@ -0,0 +1,85 @@
+"""
+Compact dtypes for the weather and delay pipelines
+Every stage hands the next one frames with float32 measurements, uint8
+time-of-day features, categorical identifiers and datetime64 dates, and can
+report how much memory each stage's frame takes
+"""
+
+import numpy as np
+import pandas as pd
+
+# Small non-negative integers (hour 0-23, month 1-12, flags)
+UINT8_COLUMNS = ('hour', 'month', 'is_night', 'departure_hour', 'departure_minute')
+
+# Identifiers with a handful of distinct values
+CATEGORICAL_COLUMNS = ('airport', 'zone', 'station', 'STATION', 'ORIGIN')
+
+# Calendar days: datetime64 at midnight instead of datetime.date objects
+DATE_COLUMNS = ('date',)
+
+_memory_report = False
+
+
+def compact_dtypes(df, float_dtype=np.float32, date_columns=DATE_COLUMNS):
+    """
+    Cast a frame to the pipeline's dtype policy (in place)
+
+    float -> float32, UINT8_COLUMNS -> uint8 (when whole and in range),
+    other integers -> smallest integer type, CATEGORICAL_COLUMNS -> category,
+    date_columns -> datetime64 days. Other columns are left as they are.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Frame to compact
+    float_dtype : dtype
+        Dtype for floating-point measurements
+    date_columns : tuple
+        Columns holding calendar days (pass () where `date` is a timestamp)
+
+    Returns:
+    --------
+    pd.DataFrame
+        The same frame, for chaining
+    """
+    for column in df.columns:
+        series = df[column]
+        if column in CATEGORICAL_COLUMNS:
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                df[column] = series.astype('category')
+        elif column in date_columns:
+            if not pd.api.types.is_datetime64_any_dtype(series):
+                df[column] = pd.to_datetime(series)
+            df[column] = df[column].dt.normalize()
+        elif column in UINT8_COLUMNS and pd.api.types.is_numeric_dtype(series) \
+                and not pd.api.types.is_bool_dtype(series):
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            whole = np.isfinite(values).all() and (values >= 0).all() and (values <= 255).all() \
+                and (values == np.round(values)).all()
+            df[column] = series.astype(np.uint8) if whole else series.astype(float_dtype)
+        elif pd.api.types.is_bool_dtype(series):
+            continue
+        elif pd.api.types.is_float_dtype(series):
+            df[column] = series.astype(float_dtype)
+        elif pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast='integer')
+    return df
+
+
+def enable_memory_report(enabled=True):
+    """Turn report_memory output on or off for this process"""
+    global _memory_report
+    _memory_report = enabled
+
+
+def memory_report_enabled():
+    """Whether report_memory prints (e.g. to pass the setting on to worker processes)"""
+    return _memory_report
+
+
+def report_memory(stage, df):
+    """Print a frame's deep memory usage when the memory report is enabled"""
+    if not _memory_report or df is None:
+        return
+    megabytes = df.memory_usage(deep=True).sum() / 1e6
+    print(f"  [memory] {stage}: {megabytes:,.1f} MB ({len(df):,} rows x {df.shape[1]} columns)")
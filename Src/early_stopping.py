@@ -0,0 +1,135 @@
+"""
+Early stopping on a time-ordered validation window
+Zone models hold out their most recent flights (rather than a random
+sample, which leaks the temporal correlation of neighbouring flights),
+stop adding trees once the error on a validation window stops improving,
+and keep only the trees up to the best iteration. The best iteration is
+chosen on that window, so the reported test score comes from a separate,
+later window. A zone's windows are placed on the scheduled departures of
+all its flights, so every training mode and the tuning search split it the
+same way whichever flights end up matched to weather
+"""
+
+import pandas as pd
+
+try:
+    from Src.model_export import booster_json, regressor_from_json
+    from Src.weather_delay_join import departure_times
+except ImportError:  # Running as a script from inside Src/
+    from model_export import booster_json, regressor_from_json
+    from weather_delay_join import departure_times
+
+# Share of the flights, by time, held out as the validation window
+VALID_FRACTION = 0.2
+
+# Share of the flights, by time, after the validation window, held out for the test score
+TEST_FRACTION = 0.1
+
+# Stop after this many rounds without a better validation score
+EARLY_STOPPING_ROUNDS = 30
+
+# Upper bound on the trees of an early-stopped model
+MAX_BOOST_ROUNDS = 1000
+
+
+def validation_start(times, fraction=VALID_FRACTION):
+    """
+    Start of the most recent window holding `fraction` of the rows
+
+    Parameters:
+    -----------
+    times : pd.Series or array-like
+        Time of each row (departure time or flight date)
+    fraction : float
+        Share of the rows to hold out
+
+    Returns:
+    --------
+    pd.Timestamp
+        Rows at or after it are the validation window
+    """
+    times = pd.Series(pd.to_datetime(times)).dropna()
+    if len(times) == 0:
+        raise ValueError("No timestamps to split on")
+    start = times.quantile(1 - fraction)
+    if not (times < start).any():
+        raise ValueError(f"All rows fall in one instant ({start}); can't hold out a time window")
+    return start
+
+
+def validation_mask(times, fraction=VALID_FRACTION):
+    """Boolean mask of the rows in the most recent `fraction` of the time span (see validation_start)"""
+    times = pd.Series(pd.to_datetime(times))
+    return (times >= validation_start(times, fraction)).to_numpy()
+
+
+def holdout_starts(times, valid_fraction=VALID_FRACTION, test_fraction=TEST_FRACTION):
+    """
+    Starts of the validation window and of the later test window
+
+    The most recent `test_fraction` of the rows is the test window and the
+    `valid_fraction` before it the validation window.
+
+    Returns:
+    --------
+    (pd.Timestamp, pd.Timestamp)
+        Validation start and test start: rows before the first train, rows
+        at or after the second test
+    """
+    test_start = validation_start(times, test_fraction)
+    valid_start = validation_start(times, valid_fraction + test_fraction)
+    if not valid_start < test_start:
+        raise ValueError(f"Too few distinct times to split validation and test windows (both start {test_start})")
+    return valid_start, test_start
+
+
+def holdout_masks(times, valid_fraction=VALID_FRACTION, test_fraction=TEST_FRACTION):
+    """Boolean masks of the validation and test windows (see holdout_starts)"""
+    return window_masks(times, holdout_starts(times, valid_fraction, test_fraction))
+
+
+def flight_holdout_starts(delay_df, valid_fraction=VALID_FRACTION, test_fraction=TEST_FRACTION):
+    """holdout_starts over the scheduled departure of every flight of a zone (see weather_delay_join)"""
+    return holdout_starts(departure_times(delay_df), valid_fraction, test_fraction)
+
+
+def window_masks(times, starts):
+    """
+    Boolean masks of the validation and test windows
+
+    Parameters:
+    -----------
+    times : pd.Series or array-like
+        Departure time of each row
+    starts : (pd.Timestamp, pd.Timestamp)
+        Validation and test starts (see holdout_starts)
+
+    Returns:
+    --------
+    (np.array, np.array)
+        Rows in the validation window and rows in the test window
+    """
+    times = pd.Series(pd.to_datetime(times))
+    valid_start, test_start = starts
+    return ((times >= valid_start) & (times < test_start)).to_numpy(), (times >= test_start).to_numpy()
+
+
+def best_iteration_model(model):
+    """
+    Copy of an early-stopped model holding only the trees up to its best iteration
+
+    Parameters:
+    -----------
+    model : xgb.XGBRegressor or xgb.Booster
+        Model fitted with early stopping
+
+    Returns:
+    --------
+    xgb.XGBRegressor
+        Model whose every tree is used at prediction time
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    best = getattr(model, 'best_iteration', None)
+    if best is None:
+        best = booster.best_iteration
+    return regressor_from_json(booster_json(booster[:best + 1]))
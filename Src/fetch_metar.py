@@ -1,11 +1,197 @@
 """
 Fetch real-time METAR weather data from NOAA API
 """
+import asyncio
+import os
 import requests
+from requests.adapters import HTTPAdapter
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
 import re
 
+try:
+    from Src.sky_conditions import CEILING_COVER_CODES, NO_CEILING_SKY_CODES, UNLIMITED_CEILING_FT
+except ImportError:  # Running as a script from inside Src/
+    from sky_conditions import CEILING_COVER_CODES, NO_CEILING_SKY_CODES, UNLIMITED_CEILING_FT
+
+# NOAA API endpoint for METAR data (override to point at a local stub server)
+METAR_API_URL = os.environ.get('METAR_API_URL', 'https://aviationweather.gov/api/data/metar')
+
+# Stations per multi-id request; keeps URLs well under server limits
+METAR_BATCH_SIZE = 100
+
+# Keep-alive session shared by every fetch, so repeated refreshes reuse the
+# TCP+TLS connection instead of handshaking per station
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+class MetarFetchError(Exception):
+    """
+    Some METAR requests failed (network error, HTTP error or unreadable XML)
+    
+    `failed` lists the stations whose request failed and `reports` holds the
+    reports of the requests that succeeded.
+    """
+    
+    def __init__(self, message, failed, reports):
+        super().__init__(message)
+        self.failed = failed
+        self.reports = reports
+
+def _element_text(element, *tags):
+    """Text of the first child found under any of `tags` (API uses both snake and camel case)"""
+    for tag in tags:
+        child = element.find(tag)
+        if child is not None and child.text:
+            return child.text.strip()
+    return None
+
+def parse_metar_xml(content):
+    """
+    Parse every report in an aviationweather XML response
+    
+    Returns:
+        list of dict: {'station_id', 'raw_text', 'observation_time'} per report
+    """
+    root = ET.fromstring(content)
+    reports = []
+    for metar in root.iter('METAR'):
+        raw_text = _element_text(metar, 'raw_text', 'rawText')
+        if not raw_text:
+            continue
+        reports.append({
+            'station_id': _element_text(metar, 'station_id', 'stationId') or raw_text.split()[0],
+            'raw_text': raw_text,
+            'observation_time': _element_text(metar, 'observation_time', 'obsTime')
+        })
+    
+    # Bare rawText elements without a METAR wrapper
+    if not reports:
+        for tag in ('raw_text', 'rawText'):
+            for element in root.iter(tag):
+                if element.text:
+                    raw_text = element.text.strip()
+                    reports.append({'station_id': raw_text.split()[0], 'raw_text': raw_text,
+                                    'observation_time': None})
+    return reports
+
+def _chunks(stations, size):
+    for start in range(0, len(stations), size):
+        yield stations[start:start + size]
+
+def _fetch_chunk(stations, base_url, timeout, session):
+    """One multi-id request; returns the reports found"""
+    response = session.get(base_url, params={'ids': ','.join(stations), 'format': 'xml'}, timeout=timeout)
+    if response.status_code != 200:
+        print(f"Error: API returned status code {response.status_code}")
+        # 4xx/5xx are failures; other codes (204) mean no reports
+        response.raise_for_status()
+        return []
+    return parse_metar_xml(response.content)
+
+def _latest_by_station(reports, stations):
+    """Most recent report per requested station (ISO timestamps sort chronologically)"""
+    wanted = set(stations)
+    latest = {}
+    for report in reports:
+        station = report['station_id'].upper()
+        if station not in wanted:
+            continue
+        current = latest.get(station)
+        if current is None or (report['observation_time'] or '') > (current['observation_time'] or ''):
+            latest[station] = report
+    return latest
+
+def _normalize_stations(stations):
+    return list(dict.fromkeys(station.strip().upper() for station in stations if station and station.strip()))
+
+def fetch_metar_reports(stations, base_url=None, batch_size=METAR_BATCH_SIZE, timeout=10, session=None,
+                        raise_errors=False):
+    """
+    Fetch the latest raw METAR report for many stations
+    
+    Stations are sent as comma-separated ids, `batch_size` per request,
+    over the shared keep-alive session.
+    
+    Args:
+        stations: ICAO station codes
+        base_url: API endpoint (default METAR_API_URL)
+        raise_errors: raise MetarFetchError if any request failed, instead of
+            leaving its stations out as if they had no report
+    
+    Returns:
+        dict: station -> {'station_id', 'raw_text', 'observation_time'};
+        stations without a report (or whose request failed) are absent
+    """
+    stations = _normalize_stations(stations)
+    base_url = base_url or METAR_API_URL
+    session = session or _session
+    
+    reports = []
+    failed = []
+    for chunk in _chunks(stations, batch_size):
+        try:
+            reports.extend(_fetch_chunk(chunk, base_url, timeout, session))
+        except requests.exceptions.RequestException as e:
+            print(f"Network error fetching METAR data for {len(chunk)} stations: {e}")
+            failed.extend(chunk)
+        except ET.ParseError as e:
+            print(f"Error parsing XML response: {e}")
+            failed.extend(chunk)
+    
+    latest = _latest_by_station(reports, stations)
+    if failed and raise_errors:
+        raise MetarFetchError(f"METAR request failed for {len(failed)} of {len(stations)} stations",
+                              failed, latest)
+    return latest
+
+def _parse_reports(stations, reports):
+    return {station: parse_metar_text(reports[station]['raw_text']) if station in reports else None
+            for station in stations}
+
+def fetch_metar_batch(stations, base_url=None, batch_size=METAR_BATCH_SIZE, timeout=10, session=None):
+    """
+    Fetch and parse current METAR data for many stations in a few requests
+    
+    Args:
+        stations: ICAO station codes (e.g., ['KAUS', 'KDFW'])
+    
+    Returns:
+        dict: station -> parsed METAR data (None if no report was found)
+    """
+    stations = _normalize_stations(stations)
+    print(f"Fetching METAR data for {len(stations)} stations...")
+    reports = fetch_metar_reports(stations, base_url, batch_size, timeout, session)
+    return _parse_reports(stations, reports)
+
+async def fetch_metar_batch_async(stations, base_url=None, batch_size=METAR_BATCH_SIZE, timeout=10,
+                                  max_concurrency=4, session=None):
+    """
+    asyncio variant of fetch_metar_batch
+    
+    Chunks are requested concurrently on worker threads, at most
+    `max_concurrency` at a time.
+    """
+    stations = _normalize_stations(stations)
+    base_url = base_url or METAR_API_URL
+    session = session or _session
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def fetch(chunk):
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(_fetch_chunk, chunk, base_url, timeout, session)
+            except requests.exceptions.RequestException as e:
+                print(f"Network error fetching METAR data for {len(chunk)} stations: {e}")
+            except ET.ParseError as e:
+                print(f"Error parsing XML response: {e}")
+            return []
+    
+    results = await asyncio.gather(*(fetch(chunk) for chunk in _chunks(stations, batch_size)))
+    reports = _latest_by_station([report for chunk in results for report in chunk], stations)
+    return _parse_reports(stations, reports)
+
 def fetch_metar_data(station_code):
     """
     Fetch current METAR data from NOAA for a given airport code
@@ -17,29 +203,15 @@ def fetch_metar_data(station_code):
         dict: Parsed METAR data or None if error
     """
     try:
-        # NOAA API endpoint for METAR data
-        url = f"https://aviationweather.gov/api/data/metar?ids={station_code}&format=xml"
-        
         print(f"Fetching METAR data for {station_code}...")
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code != 200:
-            print(f"Error: API returned status code {response.status_code}")
-            return None
+        reports = fetch_metar_reports([station_code])
         
-        # Parse XML response
-        root = ET.fromstring(response.content)
-        
-        # Find the rawtext METAR data (try both possible tags)
-        rawtext = root.find('.//rawText') or root.find('.//raw_text')
-        if rawtext is None:
+        report = reports.get(station_code.strip().upper())
+        if report is None:
             print("Error: No METAR data found in response")
-            # Debug: print the XML structure
-            print("XML content preview:")
-            print(ET.tostring(root, encoding='unicode')[:500])
             return None
         
-        metar_text = rawtext.text
+        metar_text = report['raw_text']
         print(f"METAR: {metar_text}")
         
         # Parse METAR text
@@ -47,12 +219,6 @@ def fetch_metar_data(station_code):
         
         return parsed_data
         
-    except requests.exceptions.RequestException as e:
-        print(f"Network error fetching METAR data: {e}")
-        return None
-    except ET.ParseError as e:
-        print(f"Error parsing XML response: {e}")
-        return None
     except Exception as e:
         print(f"Unexpected error: {e}")
         return None
@@ -102,13 +268,15 @@ def parse_metar_text(metar_text):
             if vis_match:
                 data['visibility_km'] = float(vis_match.group(1)) / 1000.0
         
-        # Parse cloud ceiling
-        cloud_match = re.search(r'OVC(\d{3})|BKN(\d{3})|SCT(\d{3})', metar_text)
-        if cloud_match:
-            ceiling_str = cloud_match.group(1) or cloud_match.group(2) or cloud_match.group(3)
-            data['ceiling_ft'] = float(ceiling_str) * 100
-        elif 'CLR' in metar_text or 'SKC' in metar_text:
-            data['ceiling_ft'] = 9999  # Clear skies
+        # Parse cloud ceiling: the lowest BKN/OVC/VV layer, as in training
+        # (sky_conditions.compute_ceiling_ft). Clear or FEW/SCT skies get the
+        # unlimited ceiling the ISD data codes them with, rather than being
+        # imputed; reports with no sky group at all still leave it out
+        cloud_layers = re.findall(r'\b(' + '|'.join(CEILING_COVER_CODES) + r')(\d{3})\b', metar_text)
+        if cloud_layers:
+            data['ceiling_ft'] = min(float(height) for _, height in cloud_layers) * 100
+        elif re.search(r'\b(' + '|'.join(NO_CEILING_SKY_CODES) + r')(\d{3})?\b', metar_text):
+            data['ceiling_ft'] = UNLIMITED_CEILING_FT
         
         # Parse pressure (e.g., "A3012" or "Q1023")
         pressure_match = re.search(r'A(\d{4})|Q(\d{4})', metar_text)
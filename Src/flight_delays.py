@@ -0,0 +1,224 @@
+"""
+Flight delay loader shared by the zone training scripts
+Reads only the BTS on-time columns the models use, with compact dtypes, and
+derives the departure time and delay target with vectorized arithmetic.
+Large extracts are processed in chunks, keeping only the rows (airports,
+delay events) training needs
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    from Src.dtype_policy import compact_dtypes, report_memory
+except ImportError:  # Running as a script from inside Src/
+    from dtype_policy import compact_dtypes, report_memory
+
+ONTIME_COLUMNS = ['FL_DATE', 'ORIGIN', 'CRS_DEP_TIME', 'DEP_DELAY', 'WEATHER_DELAY']
+ONTIME_DTYPES = {
+    'FL_DATE': str,
+    'ORIGIN': 'category',
+    'CRS_DEP_TIME': np.float32,
+    'DEP_DELAY': np.float32,
+    'WEATHER_DELAY': np.float32,
+}
+
+# 'weather': weather delays score up to 100 (6 h), other delays up to 50, and
+#            only delay/weather events are kept (the improved models)
+# 'total':   any departure delay scores up to 100 (4 h), every flight kept
+DELAY_TARGETS = ('weather', 'total')
+
+# BTS FL_DATE, e.g. "1/1/2024 12:00:00 AM"
+FL_DATE_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+
+DEFAULT_DEPARTURE_HOUR = 12
+CHUNK_ROWS = 2_000_000
+
+
+def departure_hour_minute(crs_dep_time):
+    """
+    Scheduled departure hour and minute from hhmm values (e.g. 1435 -> 14, 35)
+
+    Missing or invalid times get hour 12 (noon), minute 0. 2400 is midnight.
+
+    Returns:
+    --------
+    (np.array, np.array)
+        uint8 hours and minutes
+    """
+    hhmm = pd.to_numeric(crs_dep_time, errors='coerce')
+    hhmm = np.asarray(hhmm, dtype=np.float64)
+    valid = np.isfinite(hhmm) & (hhmm >= 0)
+    hhmm = np.where(valid, np.floor(hhmm), 0)
+    hour = np.where(valid, (hhmm // 100) % 24, DEFAULT_DEPARTURE_HOUR).astype(np.uint8)
+    minute = np.where(valid, hhmm % 100, 0).clip(0, 59).astype(np.uint8)
+    return hour, minute
+
+
+def delay_score(total_delay, weather_delay, target='weather'):
+    """Training target (0-100) from departure and weather delay minutes"""
+    if target == 'weather':
+        return np.where(
+            weather_delay > 0,
+            np.clip(weather_delay / 6, 0, 100),  # 6 hours = 100
+            np.where(
+                total_delay > 15,  # Delayed but not weather-related
+                np.clip(total_delay / 8, 0, 50),  # Lower weight for non-weather delays
+                0  # On-time or early
+            )
+        ).astype(np.float32)
+    if target == 'total':
+        return np.clip(total_delay / 4, 0, 100).astype(np.float32)  # 4 hours = 100
+    raise ValueError(f"Unknown delay target '{target}' (expected one of {DELAY_TARGETS})")
+
+
+def _parse_days(values):
+    """Flight dates as datetime64 days; each distinct string is parsed once"""
+    codes, uniques = pd.factorize(values)
+    try:
+        days = pd.to_datetime(pd.Series(uniques), format=FL_DATE_FORMAT)
+    except (TypeError, ValueError):
+        # Other exports (e.g. ISO dates): parse each value on its own
+        days = pd.to_datetime(pd.Series(uniques), format='mixed')
+    days = days.dt.normalize().to_numpy()
+    if len(days) == 0:  # Every date in the chunk is missing
+        return np.full(len(codes), np.datetime64('NaT'), dtype=days.dtype)
+    return np.where(codes >= 0, days[np.maximum(codes, 0)], np.datetime64('NaT'))
+
+
+def _prepare_chunk(chunk, target, airports, stats):
+    """Derived columns for one chunk of raw on-time rows, filtered to what training keeps"""
+    if airports is not None:
+        chunk = chunk[chunk['ORIGIN'].isin(airports)]
+
+    total_delay = chunk['DEP_DELAY'].fillna(0).to_numpy(dtype=np.float32)
+    weather_delay = chunk['WEATHER_DELAY'].fillna(0).to_numpy(dtype=np.float32)
+    hour, minute = departure_hour_minute(chunk['CRS_DEP_TIME'])
+
+    out = pd.DataFrame({
+        'ORIGIN': chunk['ORIGIN'].array,
+        'date': _parse_days(chunk['FL_DATE'].to_numpy()),
+        'departure_hour': hour,
+        'departure_minute': minute,
+        'total_delay': total_delay,
+        'weather_delay': weather_delay,
+        'delay_score': delay_score(total_delay, weather_delay, target),
+    })
+    if target == 'total':
+        out['has_delay'] = (total_delay > 15).astype(np.uint8)
+
+    stats['rows'] += len(out)
+    stats['weather_delay_rows'] += int((weather_delay > 0).sum())
+    stats['weather_delay_sum'] += float(weather_delay.sum(dtype=np.float64))
+    stats['total_delay_sum'] += float(total_delay.sum(dtype=np.float64))
+
+    if target == 'weather':
+        # Focus on flights with actual delays or weather issues
+        out = out[(total_delay > 10) | (weather_delay > 0) | (total_delay < -5)]
+    return out
+
+
+def _concat(parts):
+    """Concatenate chunk results, keeping ORIGIN categorical across chunks"""
+    if not parts:
+        return pd.DataFrame()
+    origins = union_categoricals([part['ORIGIN'].array for part in parts], ignore_order=True)
+    df = pd.concat([part.drop(columns=['ORIGIN']) for part in parts], ignore_index=True)
+    df.insert(0, 'ORIGIN', origins)
+    return df
+
+
+def load_flight_delays(filepath, target='weather', airports=None, engine='c', chunksize=CHUNK_ROWS):
+    """
+    Load BTS on-time data for zone training
+
+    Parameters:
+    -----------
+    filepath : str
+        T_ONTIME_REPORTING-style CSV
+    target : str
+        'weather' (weather-focused score, delay/weather events only) or
+        'total' (departure delay score, every flight)
+    airports : list or None
+        Only keep flights departing these airports
+    engine : str
+        'c' streams the file in `chunksize` rows; 'pyarrow' reads the
+        pruned columns in one multithreaded pass (needs pyarrow)
+    chunksize : int
+        Rows per chunk for the 'c' engine
+
+    Returns:
+    --------
+    pd.DataFrame
+        ORIGIN, date, departure_hour, departure_minute, total_delay,
+        weather_delay, delay_score (and has_delay for target='total')
+    """
+    if target not in DELAY_TARGETS:
+        raise ValueError(f"Unknown delay target '{target}' (expected one of {DELAY_TARGETS})")
+
+    print("\nLoading flight delay data...")
+    airports = list(airports) if airports is not None else None
+    stats = {'rows': 0, 'weather_delay_rows': 0, 'weather_delay_sum': 0.0, 'total_delay_sum': 0.0}
+
+    read_options = {'usecols': ONTIME_COLUMNS, 'dtype': ONTIME_DTYPES}
+    if engine == 'pyarrow':
+        chunks = [pd.read_csv(filepath, engine='pyarrow', **read_options)]
+    elif engine == 'c':
+        chunks = pd.read_csv(filepath, chunksize=chunksize, **read_options)
+    else:
+        raise ValueError(f"Unknown CSV engine '{engine}' (expected 'c' or 'pyarrow')")
+
+    parts = [_prepare_chunk(chunk, target, airports, stats) for chunk in chunks]
+    df = compact_dtypes(_concat(parts))
+
+    rows = stats['rows']
+    print(f"Loaded {rows:,} delay records" + (f" for {len(airports)} airports" if airports is not None else ""))
+    if target == 'weather' and rows:
+        print(f"Filtered records: {len(df):,} ({len(df)/rows*100:.1f}%)")
+    if rows:
+        print(f"  Weather delay records: {stats['weather_delay_rows']:,}")
+        print(f"  Average weather delay: {stats['weather_delay_sum'] / rows:.1f} min")
+        print(f"  Average total delay: {stats['total_delay_sum'] / rows:.1f} min")
+    if len(df):
+        print(f"  Delay score range: {df['delay_score'].min():.1f} to {df['delay_score'].max():.1f}")
+
+    report_memory('Flight delays', df)
+    return df
+
+
+def partition_by_zone(delay_df, zones):
+    """
+    Split loaded delays into per-zone slices
+
+    Rows are grouped by ORIGIN and reordered by zone once, so each zone's
+    rows are a contiguous slice of that frame (a view, not a copy). Within
+    a zone the rows keep their file order.
+
+    Parameters:
+    -----------
+    delay_df : pd.DataFrame
+        Output of load_flight_delays
+    zones : dict
+        Zone name -> list of airports (an airport may belong to one zone)
+
+    Returns:
+    --------
+    dict
+        Zone name -> delay rows of its airports (empty if none were loaded)
+    """
+    owners = {}
+    for zone_name, airports in zones.items():
+        for airport in airports:
+            if owners.setdefault(airport, zone_name) != zone_name:
+                raise ValueError(f"{airport} is listed in both {owners[airport]} and {zone_name}")
+
+    positions = delay_df.groupby('ORIGIN', observed=True).indices
+    empty = np.array([], dtype=np.intp)
+    zone_positions = [np.sort(np.concatenate([positions.get(airport, empty) for airport in airports] + [empty]))
+                      for airports in zones.values()]
+
+    ordered = delay_df.take(np.concatenate(zone_positions + [empty]))
+    bounds = np.cumsum([0] + [len(rows) for rows in zone_positions])
+    return {zone_name: ordered.iloc[bounds[i]:bounds[i + 1]]
+            for i, zone_name in enumerate(zones)}
@@ -4,9 +4,8 @@ Load airport data from Excel file and create airport-to-zone mapping
 import pandas as pd
 import os
 
-def load_airport_mapping():
+def load_airport_mapping(excel_path='Data/international_airports_by_region.xlsx'):
     """Load airport data from Excel file"""
-    excel_path = 'Data/international_airports_by_region.xlsx'
     
     if not os.path.exists(excel_path):
         print(f"Warning: {excel_path} not found")
@@ -0,0 +1,289 @@
+"""
+Station-keyed METAR cache
+METARs are issued hourly (plus the occasional SPECI), so a report stays
+fresh until its successor is due, measured from the report's own
+observation time. Stale reports are served while a background refresh runs,
+and each station has at most one upstream request in flight
+"""
+
+import functools
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    from Src.fetch_metar import MetarFetchError, fetch_metar_reports, parse_metar_text
+except ImportError:  # Running as a script from inside Src/
+    from fetch_metar import MetarFetchError, fetch_metar_reports, parse_metar_text
+
+# Routine METARs are observed at ~:53 and disseminated a few minutes later
+ROUTINE_INTERVAL_S = 3600
+PUBLICATION_LAG_S = 5 * 60
+
+
+def observation_epoch(report, now=None):
+    """
+    Observation time of a report as a UNIX timestamp
+
+    Uses the API's observation_time, else the DDHHMMZ group of the raw text
+    (in the current or previous month), else `now`.
+    """
+    now = time.time() if now is None else now
+
+    observed = report.get('observation_time')
+    if observed:
+        try:
+            return datetime.fromisoformat(observed.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            pass
+
+    match = re.search(r'\b(\d{2})(\d{2})(\d{2})Z\b', report.get('raw_text', ''))
+    if match:
+        day, hour, minute = (int(group) for group in match.groups())
+        current = datetime.fromtimestamp(now, tz=timezone.utc)
+        year, month = current.year, current.month
+        for _ in range(2):
+            try:
+                candidate = datetime(year, month, day, hour, minute, tzinfo=timezone.utc).timestamp()
+                if candidate <= now + PUBLICATION_LAG_S:
+                    return candidate
+            except ValueError:
+                pass  # Day doesn't exist in this month
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+
+    return now
+
+
+class MetarCache:
+    """
+    Thread-safe METAR cache with observation-time freshness
+
+    Parameters:
+    -----------
+    fresh_for : float
+        Seconds after observation during which a report is served without
+        refreshing (default: until the next routine report is published)
+    max_stale : float
+        Seconds after observation beyond which a report is no longer served
+        and callers block on a refetch
+    retry_interval : float
+        Minimum seconds between refresh attempts for a station, so a late
+        report doesn't turn every request into an upstream call
+    fetch_reports : callable
+        stations -> {station: report}; defaults to fetch_metar_reports.
+        Should raise on upstream failure (MetarFetchError for a partial
+        one): only stations missing from a successful response are cached
+        as having no report
+    clock : callable
+        Wall-clock time source (UNIX seconds)
+    """
+
+    def __init__(self, fresh_for=ROUTINE_INTERVAL_S + PUBLICATION_LAG_S, max_stale=3 * ROUTINE_INTERVAL_S,
+                 retry_interval=120, fetch_reports=None, clock=time.time, refresh_workers=2,
+                 fetch_timeout=15):
+        self.fresh_for = fresh_for
+        self.max_stale = max_stale
+        self.retry_interval = retry_interval
+        self.fetch_timeout = fetch_timeout
+        self._fetch_reports = fetch_reports or functools.partial(fetch_metar_reports, raise_errors=True)
+        self._clock = clock
+
+        # station -> {'report', 'observed_at', 'fetched_at', 'attempted_at'}
+        self._entries = {}
+        # station -> time of the last fetch that returned no report
+        self._absent = {}
+        # station -> time of the last fetch that failed upstream (kept apart
+        # from _absent: an outage isn't evidence the station has no report)
+        self._failed_at = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='metar-refresh')
+
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._refreshes = 0
+        self._upstream_requests = 0
+        self._upstream_errors = 0
+
+    def _claim(self, stations):
+        """Mark stations as in flight; returns (claimed, events to wait on); caller holds self._lock"""
+        claimed, waiting = [], []
+        for station in stations:
+            event = self._inflight.get(station)
+            if event is None:
+                self._inflight[station] = threading.Event()
+                claimed.append(station)
+            else:
+                waiting.append(event)
+        return claimed, waiting
+
+    def _refresh(self, stations):
+        """Fetch claimed stations from upstream and release them"""
+        try:
+            try:
+                reports = self._fetch_reports(stations)
+                failed = set()
+            except MetarFetchError as e:
+                print(f"METAR refresh failed for {len(e.failed)} of {len(stations)} stations: {e}")
+                reports, failed = e.reports, set(e.failed)
+            except Exception as e:
+                print(f"METAR refresh failed for {len(stations)} stations: {e}")
+                reports, failed = {}, set(stations)
+
+            now = self._clock()
+            with self._lock:
+                self._upstream_requests += 1
+                if failed:
+                    self._upstream_errors += 1
+                for station in stations:
+                    entry = self._entries.get(station)
+                    report = reports.get(station)
+                    if report is not None:
+                        observed_at = observation_epoch(report, now)
+                        # Never replace a report with an older one
+                        if entry is None or observed_at >= entry['observed_at']:
+                            entry = self._entries[station] = {'report': report, 'observed_at': observed_at,
+                                                              'fetched_at': now, 'attempted_at': now}
+                    if entry is not None:
+                        entry['attempted_at'] = now
+                    if station in failed:
+                        self._failed_at[station] = now
+                    else:
+                        self._failed_at.pop(station, None)
+                        if report is not None:
+                            self._absent.pop(station, None)
+                        else:
+                            self._absent[station] = now
+        finally:
+            with self._lock:
+                for station in stations:
+                    event = self._inflight.pop(station, None)
+                    if event is not None:
+                        event.set()
+
+    def _background_refresh(self, stations):
+        try:
+            self._refresh(stations)
+        except Exception as e:
+            print(f"METAR background refresh error: {e}")
+
+    def get_reports(self, stations):
+        """
+        Raw reports for many stations: {station: report or None}
+
+        Fresh entries are hits. Stale entries are returned as-is and
+        refreshed in the background. Missing or expired stations are fetched
+        in one blocking upstream call.
+        """
+        stations = list(dict.fromkeys(station.strip().upper() for station in stations))
+        now = self._clock()
+
+        results = {}
+        blocking = []
+        stale = []
+        with self._lock:
+            for station in stations:
+                entry = self._entries.get(station)
+                age = now - entry['observed_at'] if entry is not None else None
+                if entry is None or age >= self.max_stale:
+                    self._misses += 1
+                    # Stations that just came back empty, old or failed aren't retried on every request
+                    attempted_at = max(self._absent.get(station, float('-inf')),
+                                       self._failed_at.get(station, float('-inf')),
+                                       entry['attempted_at'] if entry else float('-inf'))
+                    if now - attempted_at >= self.retry_interval:
+                        blocking.append(station)
+                elif age < self.fresh_for:
+                    self._hits += 1
+                    results[station] = entry['report']
+                else:
+                    self._stale += 1
+                    results[station] = entry['report']
+                    if now - entry['attempted_at'] >= self.retry_interval:
+                        stale.append(station)
+
+            background, _ = self._claim(stale)
+            claimed, waiting = self._claim(blocking)
+            if background:
+                self._refreshes += 1
+
+        if background:
+            self._executor.submit(self._background_refresh, background)
+
+        if claimed:
+            self._refresh(claimed)
+        for event in waiting:
+            event.wait(self.fetch_timeout)
+
+        if blocking:
+            now = self._clock()
+            with self._lock:
+                for station in blocking:
+                    entry = self._entries.get(station)
+                    fresh_enough = entry is not None and now - entry['observed_at'] < self.max_stale
+                    results[station] = entry['report'] if fresh_enough else None
+
+        return {station: results.get(station) for station in stations}
+
+    def get_report(self, station):
+        """Raw report for one station, or None"""
+        return self.get_reports([station])[station.strip().upper()]
+
+    def get_weather_batch(self, stations):
+        """
+        Parsed METAR data for many stations: {station: dict or None}
+
+        Reports are re-parsed on every call so the time-of-day features
+        reflect the request time.
+        """
+        return {station: parse_metar_text(report['raw_text']) if report else None
+                for station, report in self.get_reports(stations).items()}
+
+    def get_weather(self, station):
+        """Parsed METAR data for one station, or None"""
+        return self.get_weather_batch([station])[station.strip().upper()]
+
+    def invalidate(self, station=None):
+        """Drop one station (or every station) from the cache"""
+        with self._lock:
+            if station is None:
+                self._entries.clear()
+                self._absent.clear()
+                self._failed_at.clear()
+            else:
+                self._entries.pop(station.strip().upper(), None)
+                self._absent.pop(station.strip().upper(), None)
+                self._failed_at.pop(station.strip().upper(), None)
+
+    def stats(self):
+        """Hit/miss/stale counters and upstream call volume"""
+        with self._lock:
+            lookups = self._hits + self._misses + self._stale
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'stale': self._stale,
+                'hit_rate': (self._hits + self._stale) / lookups if lookups else 0.0,
+                'background_refreshes': self._refreshes,
+                'upstream_requests': self._upstream_requests,
+                'upstream_errors': self._upstream_errors,
+                'stations': len(self._entries),
+                'in_flight': len(self._inflight),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_metar_cache():
+    """Process-wide METAR cache shared by every caller"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = MetarCache()
+    return _cache
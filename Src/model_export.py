@@ -0,0 +1,321 @@
+"""
+Export scaler-free zone models
+Folds each zone's StandardScaler into the XGBoost split thresholds so the
+exported model scores raw (unscaled) features directly
+"""
+
+import argparse
+import functools
+import json
+import os
+import warnings
+
+import joblib
+import numpy as np
+import xgboost as xgb
+
+try:
+    from Src.zone_model_registry import MODEL_DIR, zone_artifact_paths
+except ImportError:  # Running as a script from inside Src/
+    from zone_model_registry import MODEL_DIR, zone_artifact_paths
+
+
+def booster_json(model):
+    """Parsed JSON dump of a fitted XGBRegressor (or Booster)"""
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    return json.loads(booster.save_raw(raw_format='json'))
+
+
+def booster_trees(model_json):
+    """Tree list of a booster JSON dump (gbtree or dart)"""
+    gradient_booster = model_json['learner']['gradient_booster']
+    if gradient_booster['name'] == 'dart':
+        gradient_booster = gradient_booster['gbtree']
+    return gradient_booster['model']['trees']
+
+
+def regressor_from_json(model_json):
+    """Rebuild an XGBRegressor from a booster JSON dump"""
+    model = xgb.XGBRegressor()
+    model.load_model(bytearray(json.dumps(model_json).encode('utf-8')))
+    return model
+
+
+def _scaler_params(scaler, n_features):
+    """Per-feature (mean, scale) of a StandardScaler, honoring with_mean/with_std"""
+    mean = np.zeros(n_features)
+    scale = np.ones(n_features)
+    if getattr(scaler, 'with_mean', True) and scaler.mean_ is not None:
+        mean = np.asarray(scaler.mean_, dtype=np.float64)
+    if getattr(scaler, 'with_std', True) and scaler.scale_ is not None:
+        scale = np.asarray(scaler.scale_, dtype=np.float64)
+    return mean, scale
+
+
+_FLOAT64_INF_KEY = 0x7ff0000000000000
+
+
+def _float64_key(value):
+    """Monotonic integer key of a float64 (adjacent floats have adjacent keys)"""
+    bits = int(np.float64(value).view(np.int64))
+    return bits if bits >= 0 else -(bits & 0x7fffffffffffffff)
+
+
+def _float64_from_key(key):
+    bits = key if key >= 0 else (-key) | 0x8000000000000000
+    return np.array([bits], dtype=np.uint64).view(np.float64)[0]
+
+
+@functools.lru_cache(maxsize=65536)
+def raw_boundary(threshold, mean, scale):
+    """
+    Smallest raw float64 value that a scaled split sends right
+
+    XGBoost goes left when float32((x - mean) / scale) < threshold. The
+    boundary is found by bisection over float64 keys, bracketed around the
+    arithmetic estimate (a linear ulp walk never ends near zero).
+    """
+    threshold = np.float32(threshold)
+
+    def goes_right(key):
+        return np.float32((_float64_from_key(key) - mean) / scale) >= threshold
+
+    guess = _float64_key(np.float64(threshold) * scale + mean)
+    step = 1
+    if goes_right(guess):
+        hi = guess
+        lo = max(hi - step, -_FLOAT64_INF_KEY)
+        while goes_right(lo) and lo > -_FLOAT64_INF_KEY:
+            hi = lo
+            step *= 2
+            lo = max(hi - step, -_FLOAT64_INF_KEY)
+    else:
+        lo = guess
+        hi = min(lo + step, _FLOAT64_INF_KEY)
+        while not goes_right(hi) and hi < _FLOAT64_INF_KEY:
+            lo = hi
+            step *= 2
+            hi = min(lo + step, _FLOAT64_INF_KEY)
+
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if goes_right(mid):
+            hi = mid
+        else:
+            lo = mid
+
+    return _float64_from_key(hi)
+
+
+def raw_threshold(threshold, mean, scale):
+    """
+    Map a split threshold from scaled space back to raw-feature space
+
+    The folded model compares float32(x) < raw. Rounding the float64
+    boundary up to the next float32 sends every float32 value exactly as
+    the scaled split does. Training features are float32 under the dtype
+    policy and serving rounds observations to float32 before scaling, so
+    both models only ever see float32 values.
+    """
+    boundary = raw_boundary(threshold, mean, scale)
+    raw = np.float32(boundary)
+    if raw < boundary:
+        raw = np.nextafter(raw, np.float32(np.inf))
+    return raw
+
+
+def fold_scaler_into_model(model, scaler):
+    """
+    Return a copy of `model` whose splits operate on raw features
+
+    Parameters:
+    -----------
+    model : xgb.XGBRegressor
+        Model trained on StandardScaler-transformed features
+    scaler : sklearn.preprocessing.StandardScaler
+        The fitted scaler used in front of the model
+
+    Returns:
+    --------
+    xgb.XGBRegressor
+        Equivalent model that takes unscaled features
+    """
+    model_json = booster_json(model)
+    n_features = int(model_json['learner']['learner_model_param']['num_feature'])
+    mean, scale = _scaler_params(scaler, n_features)
+
+    # Thresholds repeat a lot across trees; solve each (feature, threshold) once
+    folded = {}
+    for tree in booster_trees(model_json):
+        left_children = tree['left_children']
+        split_indices = tree['split_indices']
+        split_conditions = tree['split_conditions']
+        split_types = tree.get('split_type', [0] * len(left_children))
+
+        for node, left in enumerate(left_children):
+            if left == -1 or split_types[node] != 0:
+                continue  # Leaf value or categorical split
+            feature = split_indices[node]
+            key = (feature, split_conditions[node])
+            if key not in folded:
+                folded[key] = float(raw_threshold(split_conditions[node], float(mean[feature]), float(scale[feature])))
+            split_conditions[node] = folded[key]
+
+    return regressor_from_json(model_json)
+
+
+def verify_folded_model(model, scaler, folded_model, X):
+    """
+    Check that the folded model reproduces the original predictions
+
+    Rows are rounded to float32 first, as serving does before scaling (see
+    ZoneModelBundle.predict). Returns a dict with the number of rows
+    checked, whether every prediction is bit-identical, the mismatch count
+    and the largest absolute difference.
+    """
+    X = np.asarray(X, dtype=np.float32).astype(np.float64)
+    mean, scale = _scaler_params(scaler, X.shape[1])
+
+    expected = model.predict((X - mean) / scale)
+    actual = folded_model.predict(X)
+
+    mismatches = int(np.count_nonzero(expected != actual))
+    return {
+        'rows': len(X),
+        'identical': mismatches == 0,
+        'mismatches': mismatches,
+        'max_abs_diff': float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    }
+
+
+def export_scaler_free_model(zone_name, model, scaler, features, X=None, output_dir=MODEL_DIR, verify=True):
+    """
+    Fold the scaler into a zone model and save it as {zone}_raw_model.pkl
+
+    With verify=True the folded model is checked against the original on X
+    (the training features, unscaled) and is only written if every
+    prediction is bit-identical. Serving picks the raw model up
+    automatically and skips scaler.transform. A zone without
+    {zone}_impute.json gets one holding the scaler means, so gaps are
+    filled as they were before the export.
+    """
+    print(f"\nExporting scaler-free model for {zone_name}...")
+    folded_model = fold_scaler_into_model(model, scaler)
+
+    report = None
+    if verify:
+        if X is None:
+            raise ValueError("verify=True requires the training features X")
+        report = verify_folded_model(model, scaler, folded_model, X)
+        print(f"  Verified on {report['rows']:,} rows: "
+              f"{report['mismatches']:,} mismatches (max diff {report['max_abs_diff']:.3g})")
+        if not report['identical']:
+            print(f"  ⚠️  Folded model differs from the original; not exporting {zone_name}")
+            return None, report
+
+    paths = zone_artifact_paths(zone_name, output_dir)
+    joblib.dump(folded_model, paths['raw_model'])
+    print(f"✅ Scaler-free model saved to {paths['raw_model']}")
+
+    # Serving fills gaps from {zone}_impute.json, else the scaler means; the
+    # raw model has no scaler, so save those means unless training medians exist
+    if not os.path.exists(paths['impute']) and getattr(scaler, 'mean_', None) is not None:
+        _write_impute_values(paths['impute'], features, scaler.mean_)
+        print(f"✅ Scaler means saved as imputation values to {paths['impute']}")
+
+    return folded_model, report
+
+
+def training_medians(X):
+    """Per-column median of the finite values of X (NaN for columns without any)"""
+    X = np.asarray(X, dtype=np.float64)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN columns
+        return np.nanmedian(np.where(np.isfinite(X), X, np.nan), axis=0)
+
+
+def save_impute_values(zone_name, X, features, output_dir=MODEL_DIR):
+    """
+    Save per-feature training medians as {zone}_impute.json
+
+    Single-observation scoring fills missing values with these (a median
+    over one row is just the row itself).
+    """
+    values = _write_impute_values(zone_artifact_paths(zone_name, output_dir)['impute'], features,
+                                  training_medians(X))
+    print(f"✅ Imputation values saved to {zone_artifact_paths(zone_name, output_dir)['impute']}")
+    return values
+
+
+def _write_impute_values(path, features, fill):
+    """Write per-feature fill values (None where not finite) as an impute JSON"""
+    values = {name: (float(v) if np.isfinite(v) else None) for name, v in zip(features, fill)}
+    with open(path, 'w') as f:
+        json.dump(values, f, indent=2)
+    return values
+
+
+def _threshold_probes(model, scaler, n_features, n_random=20000, seed=42):
+    """
+    Verification rows for artifacts without training data: data-like random
+    rows around the scaler's mean, plus rows sitting exactly on every split
+    boundary and on the float32 values either side of it
+    """
+    rng = np.random.default_rng(seed)
+    mean, scale = _scaler_params(scaler, n_features)
+    # Weather observations are short decimals, not arbitrary binary fractions
+    X = np.round(rng.normal(mean, scale * 1.5, size=(n_random, n_features)), 2)
+
+    probes = set()
+    for tree in booster_trees(booster_json(model)):
+        for node, left in enumerate(tree['left_children']):
+            if left != -1:
+                feature = tree['split_indices'][node]
+                boundary = raw_boundary(tree['split_conditions'][node], float(mean[feature]), float(scale[feature]))
+                raw = np.float32(boundary)
+                for value in (boundary, np.nextafter(raw, np.float32(-np.inf)), np.nextafter(raw, np.float32(np.inf))):
+                    probes.add((feature, float(value)))
+
+    probe_rows = np.repeat(mean[np.newaxis, :], len(probes), axis=0)
+    for i, (feature, value) in enumerate(sorted(probes)):
+        probe_rows[i, feature] = value
+
+    return np.vstack([X, probe_rows])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold StandardScalers into existing zone models")
+    parser.add_argument('--zones', nargs='+', help="Zones to export (default: every zone with artifacts)")
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--no-verify', action='store_true', help="Skip the bit-identical prediction check")
+    args = parser.parse_args()
+
+    zones = args.zones or sorted(
+        name[:-len('_model.pkl')] for name in os.listdir(args.model_dir)
+        if name.endswith('_model.pkl') and not name.endswith('_raw_model.pkl')
+    )
+
+    print("="*60)
+    print("SCALER-FREE MODEL EXPORT")
+    print("="*60)
+
+    for zone_name in zones:
+        paths = zone_artifact_paths(zone_name, args.model_dir)
+        if not all(os.path.exists(paths[k]) for k in ('model', 'scaler', 'features')):
+            print(f"\n⚠️  Skipping {zone_name}: model files not found")
+            continue
+
+        model = joblib.load(paths['model'])
+        scaler = joblib.load(paths['scaler'])
+        with open(paths['features'], 'r') as f:
+            features = [line.strip() for line in f.readlines() if line.strip()]
+
+        # No training data alongside the artifacts: verify on random rows and
+        # on probes placed exactly at every split threshold
+        X = None if args.no_verify else _threshold_probes(model, scaler, len(features))
+        export_scaler_free_model(zone_name, model, scaler, features, X,
+                                 output_dir=args.model_dir, verify=not args.no_verify)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Out-of-core zone model training
+Streams a zone's flights through the departure-time weather join in
+batches of a fixed number of flights, stages each batch's features on disk
+and feeds them to XGBoost through a DataIter. XGBoost builds a quantized
+(hist) matrix from them, in memory (QuantileDMatrix) or paged to disk
+(ExtMemQuantileDMatrix), so peak RAM follows the batch size instead of the
+size of the joined data
+"""
+
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
+try:
+    from Src.zone_store import ZONE_DATA_DIR, WEATHER_FEATURE_COLUMNS, load_zone_weather
+    from Src.weather_delay_join import join_departure_weather
+    from Src.model_export import booster_json, regressor_from_json, save_impute_values, training_medians
+    from Src.zone_model_registry import zone_artifact_paths
+    from Src.dtype_policy import report_memory
+    from Src.early_stopping import EARLY_STOPPING_ROUNDS, MAX_BOOST_ROUNDS, flight_holdout_starts, window_masks
+except ImportError:  # Running as a script from inside Src/
+    from zone_store import ZONE_DATA_DIR, WEATHER_FEATURE_COLUMNS, load_zone_weather
+    from weather_delay_join import join_departure_weather
+    from model_export import booster_json, regressor_from_json, save_impute_values, training_medians
+    from zone_model_registry import zone_artifact_paths
+    from dtype_policy import report_memory
+    from early_stopping import EARLY_STOPPING_ROUNDS, MAX_BOOST_ROUNDS, flight_holdout_starts, window_masks
+
+FEATURE_COLUMNS = WEATHER_FEATURE_COLUMNS + ['departure_hour']
+
+# Flights per batch; each batch holds its flights, their weather window and
+# the joined features
+BATCH_ROWS = 250_000
+
+# Weather loaded around a batch's flight dates: covers the join tolerance
+# and the local -> UTC shift
+WEATHER_MARGIN = pd.Timedelta(days=1)
+
+# Rows kept for the imputation medians
+IMPUTE_SAMPLE_ROWS = 100_000
+
+MAX_BIN = 256
+
+# Same model as train_all_zone_models_improved.train_zone_model
+XGB_PARAMS = {
+    'objective': 'reg:squarederror',
+    'tree_method': 'hist',
+    'max_depth': 8,
+    'eta': 0.05,
+    'min_child_weight': 2,
+    'subsample': 0.9,
+    'colsample_bytree': 0.9,
+    'gamma': 0.1,
+    'seed': 42,
+}
+NUM_BOOST_ROUND = 300
+
+
+def stage_zone_batches(zone_name, airports, delay_df, cache_dir, batch_rows=BATCH_ROWS, test_size=0.2, seed=42,
+                       holdout=None, data_dir=ZONE_DATA_DIR):
+    """
+    Join a zone's flights to the weather once, batch by batch, and stage the features on disk
+
+    The flights are taken in date order, `batch_rows` at a time; each batch
+    loads only the weather around its dates and is joined on its own. Rows
+    go to the train or test subset by a seeded draw per batch (or by date,
+    with holdout). Each subset of each batch is written to `cache_dir`
+    as .npy files, which XGBoost then reads on every pass without redoing
+    the join.
+
+    Parameters:
+    -----------
+    zone_name : str
+        Zone whose processed weather is read
+    airports : list
+        Airports of the zone
+    delay_df : pd.DataFrame
+        The zone's flights (output of load_flight_delays)
+    cache_dir : str
+        Directory for the staged batches
+    batch_rows : int
+        Flights per batch
+    test_size : float
+        Fraction of joined rows held out for testing
+    holdout : (pd.Timestamp, pd.Timestamp) or None
+        Validation and test window starts (see early_stopping.flight_holdout_starts):
+        if set, flights departing from the first are the validation subset
+        and flights departing from the second the test subset, instead of
+        the random draw
+
+    Returns:
+    --------
+    dict
+        'train' / 'valid' / 'test': lists of (features path, target path),
+        'rows': rows per subset, and 'impute_sample': training rows sampled
+        across the batches for the imputation medians
+    """
+    order = np.argsort(delay_df['date'].to_numpy(), kind='stable')
+    batches = [order[start:start + batch_rows] for start in range(0, len(order), batch_rows)]
+    sample_rows = -(-IMPUTE_SAMPLE_ROWS // max(len(batches), 1))
+
+    staged = {'train': [], 'valid': [], 'test': [], 'rows': {'train': 0, 'valid': 0, 'test': 0},
+              'impute_sample': []}
+    for index, rows in enumerate(batches):
+        flights = delay_df.iloc[rows]
+        start = flights['date'].min() - WEATHER_MARGIN
+        end = flights['date'].max() + pd.Timedelta(days=1) + WEATHER_MARGIN
+
+        # No `date` column: the join then skips the date-join comparison
+        weather = load_zone_weather(zone_name, columns=['airport', 'valid'] + WEATHER_FEATURE_COLUMNS,
+                                    airports=airports, start=start, end=end, data_dir=data_dir)
+        joined = join_departure_weather(flights, weather)
+        if index == 0:
+            report_memory(f'{zone_name} batch', joined)
+
+        if holdout is not None:
+            valid, test = window_masks(joined['departure_time'], holdout)
+        else:
+            test = np.random.default_rng([seed, index]).random(len(joined)) < test_size
+            valid = np.zeros(len(joined), dtype=bool)
+        train = ~valid & ~test
+
+        X = joined.reindex(columns=FEATURE_COLUMNS).to_numpy(dtype=np.float32, na_value=np.nan)
+        X = np.where(np.isinf(X), np.nan, X)
+        y = joined['delay_score'].to_numpy(dtype=np.float32)
+
+        for subset, mask in (('train', train), ('valid', valid), ('test', test)):
+            if not mask.any():
+                continue
+            paths = (os.path.join(cache_dir, f'{subset}_{index}_X.npy'),
+                     os.path.join(cache_dir, f'{subset}_{index}_y.npy'))
+            np.save(paths[0], X[mask])
+            np.save(paths[1], y[mask])
+            staged[subset].append(paths)
+            staged['rows'][subset] += int(mask.sum())
+
+        X_train = X[train]
+        take = min(len(X_train), sample_rows)
+        picked = np.random.default_rng([seed, index, 1]).choice(len(X_train), take, replace=False)
+        staged['impute_sample'].append(X_train[np.sort(picked)])
+
+    staged['impute_sample'] = np.vstack(staged['impute_sample'] or [np.empty((0, len(FEATURE_COLUMNS)))])
+    return staged
+
+
+class ZoneBatchIter(xgb.DataIter):
+    """
+    Staged feature batches of one zone for XGBoost
+
+    Gaps are filled with the training medians, as serving fills them from
+    {zone}_impute.json, so the model never learns a branch for missing
+    values that serving would not take.
+
+    Parameters:
+    -----------
+    batches : list
+        (features path, target path) per batch (see stage_zone_batches)
+    fill_values : np.array
+        Value per feature for NaN cells (NaN leaves the cell missing)
+    cache_prefix : str or None
+        Where XGBoost pages the matrix (ExtMemQuantileDMatrix only)
+    """
+
+    def __init__(self, batches, fill_values, cache_prefix=None):
+        self.batches = list(batches)
+        self.fill_values = np.asarray(fill_values, dtype=np.float32)
+        self._next_batch = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def batch(self, index):
+        """Features and target of one staged batch"""
+        X_path, y_path = self.batches[index]
+        X = np.load(X_path)
+        X = np.where(np.isnan(X), self.fill_values, X)
+        return pd.DataFrame(X, columns=FEATURE_COLUMNS), np.load(y_path)
+
+    def reset(self):
+        self._next_batch = 0
+
+    def next(self, input_data):
+        if self._next_batch >= len(self.batches):
+            return False
+        X, y = self.batch(self._next_batch)
+        self._next_batch += 1
+        input_data(data=X, label=y)
+        return True
+
+
+def _quantile_matrix(batches, n_jobs, external_memory, ref=None):
+    if external_memory:
+        return xgb.ExtMemQuantileDMatrix(batches, max_bin=MAX_BIN, nthread=n_jobs, ref=ref)
+    return xgb.QuantileDMatrix(batches, max_bin=MAX_BIN, nthread=n_jobs, ref=ref)
+
+
+def _metrics(booster, dmatrix):
+    y = dmatrix.get_label()
+    y_pred = booster.predict(dmatrix)
+    return np.sqrt(mean_squared_error(y, y_pred)), mean_absolute_error(y, y_pred), r2_score(y, y_pred)
+
+
+def train_zone_out_of_core(zone_name, airports, zone_delay, batch_rows=BATCH_ROWS, n_jobs=-1,
+                           output_dir='models/zones', external_memory=False, cache_dir=None,
+                           params=None, num_boost_round=NUM_BOOST_ROUND, early_stopping=False):
+    """
+    Train a zone model from streamed feature batches
+
+    The join runs once, batch by batch, and the features are staged on disk
+    (see stage_zone_batches). Gaps are filled with the imputation medians
+    (from a sample of the training rows), which are saved with the model,
+    so training sees the same fill values serving uses. The model is fit
+    on raw (unscaled) features - trees don't need scaling - and saved as
+    the zone's scaler-free model.
+
+    Parameters:
+    -----------
+    zone_name : str
+        Zone name
+    airports : list
+        Airports of the zone
+    zone_delay : pd.DataFrame
+        The zone's flights (output of load_flight_delays)
+    batch_rows : int
+        Flights joined per batch; bounds the memory of the pandas stages
+    n_jobs : int
+        XGBoost threads
+    external_memory : bool
+        Page the quantized training matrix to disk instead of holding it
+    cache_dir : str or None
+        Directory for the staged batches and external-memory pages
+        (default: a temporary one)
+    params : dict or None
+        Overrides of XGB_PARAMS
+    num_boost_round : int
+        Trees to fit
+    early_stopping : bool
+        Split by date: stop once the error on a validation window stops
+        improving (up to MAX_BOOST_ROUNDS), keep only the best trees, and
+        test on the most recent flights, after that window
+
+    Returns:
+    --------
+    dict or None
+        model, features, train/test rmse, mae and r2, valid_rmse (None
+        without early stopping), trees, and artifacts
+        (paths written); None if no flight matched any weather
+    """
+    print(f"\n{'='*60}")
+    print(f"Training Model for {zone_name} (out-of-core, {batch_rows:,} flights per batch)")
+    print(f"{'='*60}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    params = {**XGB_PARAMS, **(params or {}), 'nthread': n_jobs}
+    holdout = flight_holdout_starts(zone_delay) if early_stopping else None
+
+    with tempfile.TemporaryDirectory(dir=cache_dir) as cache:
+        print(f"Joining {-(-len(zone_delay) // batch_rows)} batch(es) of flights...")
+        staged = stage_zone_batches(zone_name, airports, zone_delay, cache, batch_rows, holdout=holdout)
+        rows = staged['rows']
+        if not rows['train'] or not rows['test'] or (early_stopping and not rows['valid']):
+            print("⚠️  No joined rows to train, validate or test on")
+            return None
+        print(f"Training set: {rows['train']:,}")
+        if early_stopping:
+            print(f"Validation set: {rows['valid']:,} (departures from {holdout[0]})")
+        print(f"Test set: {rows['test']:,}" + (f" (departures from {holdout[1]})" if early_stopping else ""))
+
+        fill_values = training_medians(staged['impute_sample'])
+        cache_prefix = os.path.join(cache, zone_name) if external_memory else None
+        train_batches = ZoneBatchIter(staged['train'], fill_values, cache_prefix and cache_prefix + '_train')
+        test_batches = ZoneBatchIter(staged['test'], fill_values, cache_prefix and cache_prefix + '_test')
+        valid_batches = ZoneBatchIter(staged['valid'], fill_values, cache_prefix and cache_prefix + '_valid')
+
+        print(f"Streaming {len(train_batches.batches)} batch(es) into a "
+              f"{'disk-paged' if external_memory else 'quantized in-memory'} matrix...")
+        dtrain = _quantile_matrix(train_batches, n_jobs, external_memory)
+        dtest = _quantile_matrix(test_batches, n_jobs, external_memory, ref=dtrain)
+        dvalid = _quantile_matrix(valid_batches, n_jobs, external_memory, ref=dtrain) if early_stopping else None
+
+        print("\nTraining XGBoost model...")
+        if early_stopping:
+            booster = xgb.train(params, dtrain, num_boost_round=MAX_BOOST_ROUNDS,
+                                evals=[(dtrain, 'train'), (dvalid, 'valid')], verbose_eval=100,
+                                early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+            print(f"Stopped early: best iteration {booster.best_iteration + 1} "
+                  f"(validation RMSE {booster.best_score:.2f})")
+            # Keep only the trees up to the best iteration
+            booster = booster[:booster.best_iteration + 1]
+        else:
+            booster = xgb.train(params, dtrain, num_boost_round=num_boost_round,
+                                evals=[(dtrain, 'train'), (dtest, 'test')], verbose_eval=100)
+
+        train_rmse, train_mae, train_r2 = _metrics(booster, dtrain)
+        test_rmse, test_mae, test_r2 = _metrics(booster, dtest)
+        valid_rmse = _metrics(booster, dvalid)[0] if early_stopping else None
+
+    print(f"\n{'='*60}")
+    print(f"MODEL EVALUATION - {zone_name}")
+    print(f"{'='*60}")
+    print(f"\nTrain R²: {train_r2:.3f}, RMSE: {train_rmse:.2f}, MAE: {train_mae:.2f}")
+    if early_stopping:
+        print(f"Validation RMSE: {valid_rmse:.2f} (picks the best iteration)")
+    print(f"Test R²:  {test_r2:.3f}, RMSE: {test_rmse:.2f}, MAE: {test_mae:.2f}")
+
+    # Scaler-free artifacts: serving prefers the raw model when it is the newest
+    model = regressor_from_json(booster_json(booster))
+    paths = zone_artifact_paths(zone_name, output_dir)
+    joblib.dump(model, paths['raw_model'])
+    with open(paths['features'], 'w') as f:
+        for name in FEATURE_COLUMNS:
+            f.write(name + '\n')
+    print(f"\n✅ Scaler-free model saved to {paths['raw_model']}")
+
+    save_impute_values(zone_name, staged['impute_sample'], FEATURE_COLUMNS, output_dir)
+
+    return {
+        'model': model,
+        'features': FEATURE_COLUMNS,
+        'train_rmse': train_rmse,
+        'test_rmse': test_rmse,
+        'train_mae': train_mae,
+        'test_mae': test_mae,
+        'train_r2': train_r2,
+        'test_r2': test_r2,
+        'valid_rmse': valid_rmse,
+        'trees': booster.num_boosted_rounds(),
+        'artifacts': [paths['raw_model'], paths['features'], paths['impute']],
+    }
@@ -3,10 +3,16 @@ Zone-based flight risk prediction system
 Predicts flight risk using region-specific trained models
 """
 
+import math
 import pandas as pd
 import numpy as np
-import joblib
-import os
+
+try:
+    from Src.zone_model_registry import get_registry
+    from Src.prediction_cache import get_prediction_cache
+except ImportError:  # Running as a script from inside Src/
+    from zone_model_registry import get_registry
+    from prediction_cache import get_prediction_cache
 
 ZONES = {
     'Northeast': ['BOS', 'JFK'],
@@ -16,28 +22,32 @@ ZONES = {
     'Southeast': ['ATL', 'MIA']
 }
 
-def load_zone_model(zone_name):
-    """Load model files for a specific zone"""
-    # Get the project root directory (parent of Src/)
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(current_dir)
-    model_dir = os.path.join(project_root, 'models', 'zones')
-    
-    model_path = os.path.join(model_dir, f'{zone_name}_model.pkl')
-    scaler_path = os.path.join(model_dir, f'{zone_name}_scaler.pkl')
-    features_path = os.path.join(model_dir, f'{zone_name}_features.txt')
-    
-    if not all(os.path.exists(p) for p in [model_path, scaler_path, features_path]):
-        raise FileNotFoundError(f"Model files not found for {zone_name}")
-    
-    model = joblib.load(model_path)
-    scaler = joblib.load(scaler_path)
-    
-    with open(features_path, 'r') as f:
-        features = [line.strip() for line in f.readlines()]
-    
+# Raw weather features produced by the pipeline, in training order
+FEATURE_COLUMNS = [
+    'temperature_c', 'dewpoint_c', 'wind_direction', 'wind_speed_kts',
+    'visibility_km', 'ceiling_ft', 'sea_level_pressure_mb',
+    'gust', 'relh', 'temp_spread', 'gust_factor', 'ceiling_vis_ratio',
+    'pressure_change', 'humidity', 'hour', 'month', 'is_night',
+    'departure_hour'
+]
+
+RISK_BINS = np.array([20, 40, 60, 80])
+RISK_CATEGORIES = np.array(["Very Low Risk", "Low Risk", "Moderate Risk", "High Risk", "Very High Risk"],
+                           dtype=object)
+
+def load_zone_model(zone_name, backend='xgboost'):
+    """Load model files for a specific zone (cached by the process-wide registry)"""
+    model, scaler, features = get_registry().get(zone_name, backend)
     return model, scaler, features
 
+def model_registry_stats():
+    """Cache statistics for the zone model registry"""
+    return get_registry().stats()
+
+def prediction_cache_stats():
+    """Hit/miss statistics for the quantized prediction cache"""
+    return get_prediction_cache().stats()
+
 def prepare_features(weather_data, feature_names):
     """Prepare features for prediction"""
     df = pd.DataFrame([weather_data]) if isinstance(weather_data, dict) else weather_data.copy()
@@ -55,7 +65,142 @@ def prepare_features(weather_data, feature_names):
     
     return X
 
-def predict_zone_risk(zone_name, weather_data):
+def fill_observation(row, observation, features, impute_values):
+    """
+    Write one observation into a preallocated row in model feature order
+    
+    Absent, None, NaN and infinite values get the training-time fill value.
+    """
+    for i, name in enumerate(features):
+        value = observation.get(name)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = math.nan
+        row[i] = value if math.isfinite(value) else impute_values[i]
+    return row
+
+def predict_observation(zone_name, observation, backend='xgboost'):
+    """
+    Score a single observation without pandas
+    
+    Builds the feature vector directly in the zone's feature order on a
+    per-thread preallocated buffer and imputes gaps with statistics saved at
+    training time (median of one row is meaningless).
+    
+    Parameters:
+    -----------
+    zone_name : str
+        Zone name
+    observation : dict
+        Weather conditions, e.g. the output of fetch_metar_data
+    backend : str
+        'xgboost' (default) or 'compiled'
+    
+    Returns:
+    --------
+    np.array
+        One-element array with the risk score between 0-100
+    """
+    bundle = get_registry().get(zone_name, backend)
+    
+    row = bundle.row_buffer()
+    fill_observation(row[0], observation, bundle.features, bundle.impute_values)
+    
+    return np.clip(bundle.predict(row), 0, 100)
+
+def predict_zone_risk_cached(zone_name, observation, backend='xgboost', cache=None):
+    """
+    Score a single observation through the quantized prediction cache
+    
+    The observation is snapped to the cache's per-feature resolutions and
+    the snapped vector is what gets scored, so a hit and a miss return the
+    same value. Keys include the model's artifact hash: retraining a zone
+    invalidates its entries.
+    
+    Parameters:
+    -----------
+    zone_name : str
+        Zone name
+    observation : dict
+        Weather conditions, e.g. the output of fetch_metar_data
+    backend : str
+        'xgboost' (default) or 'compiled'
+    cache : PredictionCache or None
+        Defaults to the process-wide cache
+    
+    Returns:
+    --------
+    np.array
+        One-element array with the risk score between 0-100
+    """
+    bundle = get_registry().get(zone_name, backend)
+    cache = get_prediction_cache() if cache is None else cache
+    
+    # Quantize what was observed; gaps stay NaN in the key and are imputed after
+    values = fill_observation(np.empty(len(bundle.features)), observation, bundle.features,
+                              np.full(len(bundle.features), np.nan))
+    key_values, snapped = cache.quantize(values, bundle.features)
+    key = (zone_name, backend, bundle.version, key_values)
+    
+    score = cache.get(key)
+    if score is None:
+        row = bundle.row_buffer()
+        row[0] = np.where(np.isnan(snapped), bundle.impute_values, snapped)
+        score = float(np.clip(bundle.predict(row)[0], 0, 100))
+        cache.put(key, score)
+    
+    return np.array([score])
+
+def predict_observations_cached(zone_name, observations, backend='xgboost', cache=None):
+    """
+    Score many observations of one zone through the quantized prediction cache
+    
+    Same keys and arithmetic as predict_zone_risk_cached, so an observation
+    scores the same either way; the misses are scored in one vectorized call.
+    
+    Parameters:
+    -----------
+    zone_name : str
+        Zone name
+    observations : list of dict
+        Weather conditions, e.g. the output of fetch_metar_data
+    backend : str
+        'xgboost' (default) or 'compiled'
+    cache : PredictionCache or None
+        Defaults to the process-wide cache
+    
+    Returns:
+    --------
+    np.array
+        Risk score between 0-100 per observation
+    """
+    bundle = get_registry().get(zone_name, backend)
+    cache = get_prediction_cache() if cache is None else cache
+    no_fill = np.full(len(bundle.features), np.nan)
+    
+    scores = np.empty(len(observations))
+    keys, rows, pending = [], [], []
+    for i, observation in enumerate(observations):
+        values = fill_observation(np.empty(len(bundle.features)), observation, bundle.features, no_fill)
+        key_values, snapped = cache.quantize(values, bundle.features)
+        key = (zone_name, backend, bundle.version, key_values)
+        score = cache.get(key)
+        if score is None:
+            keys.append(key)
+            rows.append(np.where(np.isnan(snapped), bundle.impute_values, snapped))
+            pending.append(i)
+        else:
+            scores[i] = score
+    
+    if pending:
+        for i, key, score in zip(pending, keys, np.clip(bundle.predict(np.vstack(rows)), 0, 100)):
+            scores[i] = float(score)
+            cache.put(key, float(score))
+    
+    return scores
+
+def predict_zone_risk(zone_name, weather_data, backend='xgboost'):
     """
     Predict flight risk for a specific zone
     
@@ -65,23 +210,27 @@ def predict_zone_risk(zone_name, weather_data):
         Zone name (e.g., 'Northeast', 'PacificCoast', etc.)
     weather_data : dict or pd.DataFrame
         Weather conditions with required features
+    backend : str
+        'xgboost' (default) or 'compiled' for the NumPy-only evaluator
+        built by Src/compiled_ensemble.py
     
     Returns:
     --------
     float or np.array
         Risk score(s) between 0-100 (100 = maximum risk)
     """
+    # Single observations take the pandas-free fast path
+    if isinstance(weather_data, dict):
+        return predict_observation(zone_name, weather_data, backend)
+    
     # Load zone model
-    model, scaler, features = load_zone_model(zone_name)
+    bundle = get_registry().get(zone_name, backend)
     
     # Prepare features
-    X = prepare_features(weather_data, features)
+    X = prepare_features(weather_data, bundle.features)
     
-    # Scale features
-    X_scaled = scaler.transform(X)
-    
-    # Make predictions
-    predictions = model.predict(X_scaled)
+    # Make predictions (scaled as at training time; scaler-free models take raw features)
+    predictions = bundle.predict(X.to_numpy(dtype=np.float64))
     
     # Clip to 0-100 range
     predictions = np.clip(predictions, 0, 100)
@@ -101,6 +250,121 @@ def interpret_risk_score(score):
     else:
         return "Very High Risk"
 
+def interpret_risk_scores(scores):
+    """Vectorized interpret_risk_score; NaN scores map to None"""
+    scores = np.asarray(scores, dtype=np.float64)
+    categories = RISK_CATEGORIES[np.searchsorted(RISK_BINS, scores, side='right')]
+    categories[np.isnan(scores)] = None
+    return categories
+
+def build_feature_matrix(weather_rows, columns=FEATURE_COLUMNS):
+    """
+    Stack weather observations into one raw feature matrix
+    
+    Parameters:
+    -----------
+    weather_rows : dict, list of dict or pd.DataFrame
+        Weather observations; absent, None or infinite values become NaN
+    columns : list of str
+        Column layout of the returned matrix
+    
+    Returns:
+    --------
+    (np.array, set)
+        N x len(columns) float64 matrix and the set of columns present in the input
+    """
+    if isinstance(weather_rows, dict):
+        weather_rows = [weather_rows]
+    
+    if isinstance(weather_rows, pd.DataFrame):
+        present = set(weather_rows.columns)
+        X = weather_rows.reindex(columns=columns).to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        present = set()
+        for row in weather_rows:
+            present.update(row.keys())
+        X = np.array([[row.get(c) for c in columns] for row in weather_rows], dtype=np.float64)
+        X = X.reshape(len(weather_rows), len(columns))
+    
+    # Gaps are left to the caller: filling them from other rows would make
+    # each row's score depend on the rows sent with it
+    X[np.isinf(X)] = np.nan
+    
+    return X, present
+
+def predict_zones_batch(weather_rows, zones=None, backend='xgboost', impute=True):
+    """
+    Score N weather observations against several zone models at once
+    
+    The raw feature matrix is built once; each zone's feature subset is
+    projected out of it with the column indices cached on its model bundle.
+    
+    Parameters:
+    -----------
+    weather_rows : dict, list of dict or pd.DataFrame
+        Weather observations
+    zones : list of str, optional
+        Zones to score (default: all zones)
+    backend : str
+        'xgboost' (default) or 'compiled'
+    impute : bool
+        Fill gaps with each zone's training-time values, as predict_observation
+        does (default). False makes a feature absent from every row an error
+        for the zone and passes gaps to the model as NaN. Either way each row
+        is scored independently of the others
+    
+    Returns:
+    --------
+    dict
+        'zones': zone order of the columns,
+        'scores': N x Z array of risk scores (NaN where a zone failed),
+        'categories': N x Z array of risk categories,
+        'errors': {zone: message} for zones that could not be scored
+    """
+    zones = list(ZONES.keys()) if zones is None else list(zones)
+    registry = get_registry()
+    
+    bundles = {}
+    errors = {}
+    for zone_name in zones:
+        try:
+            bundles[zone_name] = registry.get(zone_name, backend)
+        except Exception as e:
+            errors[zone_name] = str(e)
+    
+    # Any zone features outside the standard layout are appended to it
+    columns = list(FEATURE_COLUMNS)
+    for bundle in bundles.values():
+        columns.extend(f for f in bundle.features if f not in columns)
+    
+    X, present = build_feature_matrix(weather_rows, columns)
+    scores = np.full((X.shape[0], len(zones)), np.nan)
+    
+    for j, zone_name in enumerate(zones):
+        bundle = bundles.get(zone_name)
+        if bundle is None:
+            continue
+        
+        missing = [f for f in bundle.features if f not in present]
+        if missing and not impute:
+            errors[zone_name] = f"Missing required feature: {missing[0]}"
+            continue
+        
+        try:
+            X_zone = X[:, bundle.column_index(columns)]
+            if impute:
+                X_zone = np.where(np.isnan(X_zone), bundle.impute_values, X_zone)
+            scores[:, j] = np.clip(bundle.predict(X_zone), 0, 100)
+        except Exception as e:
+            errors[zone_name] = str(e)
+    
+    return {
+        'zones': zones,
+        'scores': scores,
+        'categories': interpret_risk_scores(scores),
+        'errors': errors
+    }
+
 def predict_all_zones(weather_data):
     """
     Predict risk for all zones and compare
@@ -115,18 +379,18 @@ def predict_all_zones(weather_data):
     dict
         Predictions for each zone
     """
-    results = {}
+    batch = predict_zones_batch([weather_data])
     
-    for zone_name in ZONES.keys():
-        try:
-            risk_score = predict_zone_risk(zone_name, weather_data)
+    results = {}
+    for j, zone_name in enumerate(batch['zones']):
+        if zone_name in batch['errors']:
+            print(f"Error predicting for {zone_name}: {batch['errors'][zone_name]}")
+            results[zone_name] = None
+        else:
             results[zone_name] = {
-                'score': risk_score[0],
-                'category': interpret_risk_score(risk_score[0])
+                'score': batch['scores'][0, j],
+                'category': batch['categories'][0, j]
             }
-        except Exception as e:
-            print(f"Error predicting for {zone_name}: {e}")
-            results[zone_name] = None
     
     return results
 
@@ -0,0 +1,150 @@
+"""
+Memoization of zone risk predictions
+Live METAR inputs barely change between observations, and airports in the
+same zone often report near-identical conditions. Observations are snapped
+to per-feature resolutions and the prediction for the snapped vector is
+cached under (zone, backend, model version, snapped vector)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Resolution each feature is snapped to before lookup. METAR reports in
+# discrete steps (whole degrees and knots, 10 degrees, 100 ft), so live
+# observations land on these grids unchanged and repeat often, which is where
+# the hit rate comes from. Derived features (humidity, ratios, converted
+# pressure and visibility) are exact functions of the reported fields and are
+# matched exactly: snapping them only moves values across split thresholds
+# (10SM = 16.09 km snapped to 16.0 km shifts scores) without adding hits.
+# ceiling_ft is matched exactly too: METAR already reports it in hundreds of feet.
+# Features not listed are matched exactly.
+DEFAULT_RESOLUTIONS = {
+    'temperature_c': 0.5,
+    'dewpoint_c': 0.5,
+    'wind_direction': 10,
+    'wind_speed_kts': 1,
+    'gust': 1,
+    'temp_spread': 0.5,
+    'hour': 1,
+    'month': 1,
+    'is_night': 1,
+    'departure_hour': 1,
+}
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of risk scores keyed on quantized feature vectors
+
+    Parameters:
+    -----------
+    max_size : int
+        Maximum number of cached predictions
+    ttl : float or None
+        Seconds a prediction stays valid (None = until evicted). Model
+        retraining does not need a TTL: the key includes the model version
+    resolutions : dict or None
+        Per-feature quantization step (0 or missing = exact match);
+        defaults to DEFAULT_RESOLUTIONS
+    """
+
+    def __init__(self, max_size=4096, ttl=None, resolutions=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.resolutions = dict(DEFAULT_RESOLUTIONS if resolutions is None else resolutions)
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._steps = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self._evictions = 0
+
+    def _resolution_array(self, features):
+        """Quantization steps aligned to `features` (memoized per feature layout)"""
+        key = tuple(features)
+        steps = self._steps.get(key)
+        if steps is None:
+            steps = np.array([self.resolutions.get(name) or 0 for name in key], dtype=np.float64)
+            self._steps[key] = steps
+        return steps
+
+    def quantize(self, values, features):
+        """
+        Snap a filled feature vector to the configured resolutions
+
+        Returns (key, snapped): a hashable tuple of bin indices (NaN becomes
+        inf) and the snapped values to score.
+        """
+        steps = self._resolution_array(features)
+        quantized = steps > 0
+        bins = np.where(quantized, np.round(values / np.where(quantized, steps, 1.0)), values)
+        snapped = np.where(quantized, bins * steps, values)
+        key = tuple(np.where(np.isnan(bins), np.inf, bins).tolist())
+        return key, snapped
+
+    def get(self, key):
+        """Cached score for `key`, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl is not None and now - stored_at >= self.ttl:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'expirations': self._expirations,
+                'evictions': self._evictions,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_s': self.ttl,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """Process-wide prediction cache shared by every caller"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache()
+    return _cache
@@ -1,8 +1,26 @@
 import pandas as pd
 import numpy as np
+import io
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from glob import glob
 
+try:
+    from Src.sky_conditions import compute_ceiling_ft
+    from Src.dtype_policy import compact_dtypes, enable_memory_report, report_memory
+    from Src.zone_store import (ZONE_DATA_DIR, save_zone_weather, load_zone_weather, zone_weather_exists,
+                                apply_zone_dtypes, cast_to_schema)
+    from Src.zone_manifest import (load_manifest, empty_manifest, save_manifest, check_input, record_input,
+                                   forget_input, record_zone, segment_dir)
+except ImportError:  # Running as a script from inside Src/
+    from sky_conditions import compute_ceiling_ft
+    from dtype_policy import compact_dtypes, enable_memory_report, report_memory
+    from zone_store import (ZONE_DATA_DIR, save_zone_weather, load_zone_weather, zone_weather_exists,
+                            apply_zone_dtypes, cast_to_schema)
+    from zone_manifest import (load_manifest, empty_manifest, save_manifest, check_input, record_input,
+                               forget_input, record_zone, segment_dir)
+
 # Define zones and their airports
 ZONES = {
     'Northeast': ['BOS', 'JFK'],
@@ -12,24 +30,39 @@ ZONES = {
     'Southeast': ['ATL', 'MIA']
 }
 
+def read_airport_weather(filepath, offset=0):
+    """
+    Load and parse a single airport weather CSV file (raises on error)
+    
+    With offset > 0 only the rows after that byte offset are parsed (the
+    rows appended since the file was last processed).
+    """
+    print(f"  Loading {os.path.basename(filepath)}" + (f" from byte {offset:,}..." if offset else "..."))
+    
+    if offset:
+        with open(filepath, 'rb') as f:
+            header = f.readline()
+            f.seek(offset)
+            df = pd.read_csv(io.BytesIO(header + f.read()), low_memory=False)
+    else:
+        df = pd.read_csv(filepath, low_memory=False)
+    
+    # Check what columns we have
+    print(f"    Columns: {list(df.columns[:10])}")
+    print(f"    Shape: {df.shape}")
+    
+    # Try to detect the format
+    if 'station' in df.columns and 'valid' in df.columns:
+        # AUS-style format
+        return parse_aus_format(df)
+    else:
+        # Try METAR format
+        return parse_metar_format(df)
+
 def parse_airport_weather(filepath):
     """Load and parse a single airport weather CSV file"""
-    print(f"  Loading {os.path.basename(filepath)}...")
-    
     try:
-        df = pd.read_csv(filepath, low_memory=False)
-        
-        # Check what columns we have
-        print(f"    Columns: {list(df.columns[:10])}")
-        print(f"    Shape: {df.shape}")
-        
-        # Try to detect the format
-        if 'station' in df.columns and 'valid' in df.columns:
-            # AUS-style format
-            return parse_aus_format(df)
-        else:
-            # Try METAR format
-            return parse_metar_format(df)
+        return read_airport_weather(filepath)
     
     except Exception as e:
         print(f"    Error loading {filepath}: {e}")
@@ -39,7 +72,7 @@ def parse_aus_format(df):
     """Parse AUS-style airport data format"""
     # Convert timestamp
     df['valid'] = pd.to_datetime(df['valid'])
-    df['date'] = df['valid'].dt.date
+    df['date'] = df['valid'].dt.normalize()
     
     # Temperature (F to C)
     df['temperature_c'] = (df['tmpf'] - 32) * 5/9
@@ -54,10 +87,8 @@ def parse_aus_format(df):
     # Visibility (miles to km)
     df['visibility_km'] = df['vsby'] * 1.60934
     
-    # Ceiling from sky layers
-    df['ceiling_ft'] = df[['skyl1', 'skyl2', 'skyl3']].apply(
-        lambda row: min([x for x in row if pd.notna(x)], default=np.nan), axis=1
-    )
+    # Ceiling: lowest broken/overcast layer
+    df['ceiling_ft'] = compute_ceiling_ft(df)
     
     # Pressure
     df['sea_level_pressure_mb'] = df['mslp']
@@ -66,7 +97,7 @@ def parse_aus_format(df):
     df['gust'] = df['gust']
     df['relh'] = df['relh']
     
-    return df
+    return compact_dtypes(df)
 
 def parse_metar_format(df):
     """Parse METAR format data (like 4152601.csv)"""
@@ -75,35 +106,109 @@ def parse_metar_format(df):
     print("    METAR format detected - using basic parsing")
     return df
 
-def process_zone(zone_name, airports):
+def airport_file(zone_name, airport):
+    return f"Data/{zone_name}/{airport}.csv"
+
+def load_airport(zone_name, airport, offset=0):
+    """
+    Parse one airport file (from `offset` bytes); runs in a worker process
+    
+    Returns:
+    --------
+    dict
+        zone, airport, data (DataFrame or None), rows, seconds and error
+        (None on success)
+    """
+    start = time.perf_counter()
+    result = {'zone': zone_name, 'airport': airport, 'data': None, 'rows': 0, 'error': None}
+    filepath = airport_file(zone_name, airport)
+    
+    try:
+        if not os.path.exists(filepath):
+            raise FileNotFoundError(f"{filepath} not found")
+        df = read_airport_weather(filepath, offset)
+        
+        # Add zone and airport identifiers
+        df['zone'] = zone_name
+        df['airport'] = airport
+        result['data'] = df
+        result['rows'] = len(df)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def load_airports(zones, workers=1, offsets=None):
+    """
+    Parse every airport file of `zones` ({zone: [airports]})
+    
+    With workers > 1 the files are parsed concurrently in a process pool.
+    A failing file is reported in its result and doesn't stop the others.
+    `offsets` maps (zone, airport) to the byte offset to start parsing at.
+    
+    Returns:
+    --------
+    dict
+        (zone, airport) -> load_airport result
+    """
+    offsets = offsets or {}
+    tasks = [(zone_name, airport) for zone_name, airports in zones.items() for airport in airports]
+    workers = max(1, min(workers, len(tasks)))
+    
+    if workers == 1:
+        return {task: load_airport(*task, offsets.get(task, 0)) for task in tasks}
+    
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(load_airport, *task, offsets.get(task, 0)): task for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                results[task] = future.result()
+            except Exception as e:  # Worker died or the result couldn't be sent back
+                results[task] = {'zone': task[0], 'airport': task[1], 'data': None, 'rows': 0,
+                                 'seconds': float('nan'), 'error': f"{type(e).__name__}: {e}"}
+    return {task: results[task] for task in tasks}
+
+def print_airport_timings(results):
+    """Per-airport parse time, row count and status"""
+    print("\n" + "="*60)
+    print("AIRPORT PARSING TIMES")
+    print("="*60)
+    print(f"  {'Zone':<16}{'Airport':<9}{'Rows':>10}{'Seconds':>10}  Status")
+    for (zone_name, airport), result in results.items():
+        status = 'ok' if result['error'] is None else result['error']
+        print(f"  {zone_name:<16}{airport:<9}{result['rows']:>10,}{result['seconds']:>10.2f}  {status}")
+
+def process_zone(zone_name, airports, loaded=None):
     """Process all airports in a zone and combine them"""
     print(f"\n{'='*60}")
     print(f"Processing Zone: {zone_name}")
     print(f"{'='*60}")
     
+    if loaded is None:
+        loaded = load_airports({zone_name: airports})
+    
     zone_data = []
     
+    # Airport order (not completion order) so the output is deterministic
     for airport in airports:
-        filepath = f"Data/{zone_name}/{airport}.csv"
+        result = loaded[(zone_name, airport)]
         
-        if not os.path.exists(filepath):
-            print(f"  Warning: {filepath} not found, skipping")
+        if result['error'] is not None:
+            print(f"  Warning: {airport} skipped ({result['error']})")
             continue
         
-        df = parse_airport_weather(filepath)
-        
-        if df is not None:
-            # Add zone and airport identifiers
-            df['zone'] = zone_name
-            df['airport'] = airport
-            zone_data.append(df)
+        zone_data.append(result['data'])
     
     if not zone_data:
         print(f"  No data found for zone {zone_name}")
         return None
     
     # Combine all airports in the zone
-    combined = pd.concat(zone_data, ignore_index=True)
+    combined = compact_dtypes(pd.concat(zone_data, ignore_index=True))
+    report_memory(f'{zone_name} combined', combined)
     
     print(f"\n  Combined data shape: {combined.shape}")
     print(f"  Date range: {combined['date'].min()} to {combined['date'].max()}")
@@ -134,31 +239,136 @@ def engineer_features(df):
         df['month'] = pd.to_datetime(df['valid']).dt.month
         df['is_night'] = ((df['hour'] >= 20) | (df['hour'] <= 6)).astype(int)
     
-    return df
+    return compact_dtypes(df)
 
-def main():
+def update_segments(zones, manifest, workers=1, data_dir=ZONE_DATA_DIR):
+    """
+    Bring every airport's parsed segment up to date with its input file
+    
+    Unchanged files are skipped, files that only grew have just their new
+    rows parsed and appended, and everything else is reparsed in full.
+    
+    Returns:
+    --------
+    set
+        Zones whose segments changed
+    """
+    plans = {}
+    for zone_name, airports in zones.items():
+        for airport in airports:
+            path = airport_file(zone_name, airport)
+            previous = manifest['inputs'].get(path)
+            segment_exists = previous is not None and os.path.exists(previous['segment'])
+            plans[(zone_name, airport)] = check_input(path, previous, segment_exists)
+    
+    actions = [plan[0] for plan in plans.values()]
+    print(f"\nInputs: {actions.count('unchanged')} unchanged, {actions.count('append')} appended, "
+          f"{actions.count('full')} new/changed, {actions.count('missing')} missing")
+    
+    to_parse = {}
+    offsets = {}
+    for (zone_name, airport), (action, _, offset) in plans.items():
+        if action in ('append', 'full'):
+            to_parse.setdefault(zone_name, []).append(airport)
+            if action == 'append':
+                offsets[(zone_name, airport)] = offset
+    
+    changed = set()
+    
+    for (zone_name, airport), (action, fingerprint, _) in plans.items():
+        path = airport_file(zone_name, airport)
+        if action == 'unchanged':
+            # Touched but identical: remember the new mtime to skip hashing next time
+            manifest['inputs'][path].update(fingerprint)
+        elif action == 'missing':
+            # Inputs that disappeared drop out of their zone
+            print(f"  Warning: {path} not found, skipping")
+            if path in manifest['inputs']:
+                forget_input(manifest, path)
+                changed.add(zone_name)
+    
+    if not to_parse:
+        return changed
+    
+    start = time.perf_counter()
+    print(f"\nParsing {sum(map(len, to_parse.values()))} airport file(s) with {workers} worker(s)...")
+    loaded = load_airports(to_parse, workers, offsets)
+    print_airport_timings(loaded)
+    print(f"  Total parse wall time: {time.perf_counter() - start:.2f}s")
+    
+    for (zone_name, airport), result in loaded.items():
+        action, fingerprint, _ = plans[(zone_name, airport)]
+        path = airport_file(zone_name, airport)
+        
+        if result['error'] is not None:
+            # Keep serving the previous segment (if any); retried next run
+            print(f"  Warning: {airport} not updated ({result['error']})")
+            continue
+        
+        data = result['data']
+        if action == 'append':
+            # The tail was parsed on its own: give it the segment's dtypes before joining them
+            existing = load_zone_weather(airport, data_dir=segment_dir(zone_name, data_dir))
+            data = apply_zone_dtypes(pd.concat([existing, cast_to_schema(data, existing)], ignore_index=True))
+            # A drop that repeats the last observations replaces them
+            if 'valid' in data.columns:
+                data = data.drop_duplicates(subset=['valid'], keep='last')
+        
+        segment = save_zone_weather(data, airport, segment_dir(zone_name, data_dir))
+        record_input(manifest, path, fingerprint, zone_name, airport, segment, len(data))
+        changed.add(zone_name)
+    
+    return changed
+
+def load_segments(zone_name, airports, manifest, data_dir=ZONE_DATA_DIR):
+    """Parsed segments of a zone's airports, in the shape process_zone expects"""
+    loaded = {}
+    for airport in airports:
+        entry = manifest['inputs'].get(airport_file(zone_name, airport))
+        if entry is None:
+            loaded[(zone_name, airport)] = {'data': None, 'error': 'no parsed data'}
+        else:
+            loaded[(zone_name, airport)] = {
+                'data': load_zone_weather(airport, data_dir=segment_dir(zone_name, data_dir)),
+                'error': None,
+            }
+    return loaded
+
+def main(workers=1, full=False):
     print("="*60)
     print("MULTI-ZONE WEATHER DATA PROCESSING")
     print("="*60)
     
     all_zones_data = {}
     
-    # Process each zone
+    # Reparse only new or changed airport files (everything with full=True)
+    manifest = empty_manifest() if full else load_manifest(ZONE_DATA_DIR)
+    changed = update_segments(ZONES, manifest, workers, ZONE_DATA_DIR)
+    
+    # Rebuild only the zones whose inputs changed
     for zone_name, airports in ZONES.items():
-        zone_df = process_zone(zone_name, airports)
+        available = [airport for airport in airports if airport_file(zone_name, airport) in manifest['inputs']]
+        previous = manifest['zones'].get(zone_name)
+        up_to_date = (zone_name not in changed and previous is not None
+                      and previous['airports'] == available and zone_weather_exists(zone_name, ZONE_DATA_DIR))
+        if up_to_date:
+            print(f"\n{zone_name}: inputs unchanged, keeping {previous['output']}")
+            continue
+        
+        zone_df = process_zone(zone_name, airports, load_segments(zone_name, airports, manifest, ZONE_DATA_DIR))
         
         if zone_df is not None:
             # Engineer features
             zone_df = engineer_features(zone_df)
+            report_memory(f'{zone_name} engineered', zone_df)
             all_zones_data[zone_name] = zone_df
+            
+            # Save processed data for the zone (typed Parquet store)
+            output_path = save_zone_weather(zone_df, zone_name, ZONE_DATA_DIR)
+            record_zone(manifest, zone_name, available, output_path, len(zone_df))
+            print(f"\n✅ Saved {zone_name} data to {output_path}")
     
-    # Save processed data for each zone
-    os.makedirs('Data/processed_zones', exist_ok=True)
-    
-    for zone_name, df in all_zones_data.items():
-        output_path = f"Data/processed_zones/{zone_name}_weather.csv"
-        df.to_csv(output_path, index=False)
-        print(f"\n✅ Saved {zone_name} data to {output_path}")
+    save_manifest(manifest, ZONE_DATA_DIR)
     
     # Summary
     print("\n" + "="*60)
@@ -176,4 +386,16 @@ def main():
     print("\nNext step: Load flight delay data and train models")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Process airport weather files into per-zone datasets")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Processes parsing airport files concurrently (1 = sequential)")
+    parser.add_argument('--full', action='store_true',
+                        help="Ignore the manifest and reparse every airport file")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="Print the memory used by each stage's frame")
+    args = parser.parse_args()
+    enable_memory_report(args.memory_report)
+    
+    main(workers=args.workers, full=args.full)
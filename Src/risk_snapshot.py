@@ -0,0 +1,181 @@
+"""
+Pre-computed flight risk for every mapped airport
+A background thread periodically refreshes METARs, scores every airport
+and publishes the results as an immutable snapshot. Request handlers read
+the current snapshot without taking a lock
+"""
+
+import threading
+import time
+from types import MappingProxyType
+
+try:
+    from Src.fetch_metar import airport_code_to_icao
+    from Src.metar_cache import get_metar_cache
+    from Src.predict_zone_risk import predict_observations_cached, interpret_risk_score
+except ImportError:  # Running as a script from inside Src/
+    from fetch_metar import airport_code_to_icao
+    from metar_cache import get_metar_cache
+    from predict_zone_risk import predict_observations_cached, interpret_risk_score
+
+
+def score_airports(airport_zones, metar_cache=None, backend='xgboost'):
+    """
+    Fetch METARs and score a set of airports, one vectorized call per zone
+
+    Scores go through the quantized prediction cache, the same path as a
+    single /api/flight-risk request, so an airport scores the same whether
+    it comes from the snapshot or is scored live.
+
+    Parameters:
+    -----------
+    airport_zones : dict
+        IATA code -> zone name
+    metar_cache : MetarCache or None
+        Defaults to the process-wide METAR cache
+
+    Returns:
+    --------
+    (dict, dict)
+        Results {iata: {'zone', 'risk_score', 'risk_category', 'weather_data'}}
+        and errors {iata: message}
+    """
+    metar_cache = get_metar_cache() if metar_cache is None else metar_cache
+    errors = {}
+
+    # Only uncached stations go upstream, in one multi-station request
+    icao_codes = {iata_code: airport_code_to_icao(iata_code) for iata_code in airport_zones}
+    reports = metar_cache.get_weather_batch(list(icao_codes.values()))
+
+    weather = {}
+    for iata_code, icao_code in icao_codes.items():
+        weather_data = reports.get(icao_code)
+        if weather_data:
+            weather[iata_code] = weather_data
+        else:
+            errors[iata_code] = f'Could not retrieve weather data for {iata_code}'
+
+    by_zone = {}
+    for iata_code in weather:
+        by_zone.setdefault(airport_zones[iata_code], []).append(iata_code)
+
+    results = {}
+    for zone, zone_airports in by_zone.items():
+        try:
+            scores = predict_observations_cached(zone, [weather[code] for code in zone_airports], backend)
+        except Exception as e:
+            print(f"Error scoring {zone}: {e}")
+            for code in zone_airports:
+                errors[code] = f'Prediction failed: {e}'
+            continue
+
+        for code, score in zip(zone_airports, scores):
+            score_value = float(score)
+            results[code] = {
+                'zone': zone,
+                'risk_score': score_value,
+                'risk_category': interpret_risk_score(score_value),
+                'weather_data': weather[code]
+            }
+
+    return results, errors
+
+
+class RiskSnapshot:
+    """Read-only risk results for every airport as of one refresh"""
+
+    __slots__ = ('airports', 'errors', 'generated_at', 'duration_s')
+
+    def __init__(self, results, errors, generated_at, duration_s):
+        self.airports = MappingProxyType({code: MappingProxyType(result) for code, result in results.items()})
+        self.errors = MappingProxyType(dict(errors))
+        self.generated_at = generated_at
+        self.duration_s = duration_s
+
+    def age_s(self, now=None):
+        """Seconds since the snapshot was computed"""
+        return (time.time() if now is None else now) - self.generated_at
+
+
+class RiskSnapshotWarmer:
+    """
+    Background thread that keeps a RiskSnapshot current
+
+    Parameters:
+    -----------
+    airport_zones : dict
+        IATA code -> zone name for every airport to pre-compute
+    interval : float
+        Seconds between refreshes
+    max_age : float or None
+        Snapshots older than this are not served (default: 3 intervals)
+    """
+
+    def __init__(self, airport_zones, interval=300, max_age=None, metar_cache=None, backend='xgboost'):
+        self.airport_zones = dict(airport_zones)
+        self.interval = interval
+        self.max_age = 3 * interval if max_age is None else max_age
+        self.metar_cache = metar_cache
+        self.backend = backend
+
+        # Replaced wholesale on each refresh; readers never see a partial update
+        self.snapshot = None
+        self.refresh_count = 0
+        self.last_error = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """Recompute every airport and publish a new snapshot"""
+        start = time.perf_counter()
+        results, errors = score_airports(self.airport_zones, self.metar_cache, self.backend)
+        self.snapshot = RiskSnapshot(results, errors, time.time(), time.perf_counter() - start)
+        self.refresh_count += 1
+        return self.snapshot
+
+    def current(self):
+        """The latest snapshot if it is recent enough to serve, else None"""
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.age_s() > self.max_age:
+            return None
+        return snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                snapshot = self.refresh()
+                self.last_error = None
+                print(f"Risk snapshot refreshed: {len(snapshot.airports)} airports, "
+                      f"{len(snapshot.errors)} errors in {snapshot.duration_s:.2f}s")
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Risk snapshot refresh failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start refreshing in a daemon thread (no-op if already running)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='risk-snapshot-warmer', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'interval_s': self.interval,
+            'airports': len(self.airport_zones),
+            'refreshes': self.refresh_count,
+            'snapshot_age_s': snapshot.age_s() if snapshot is not None else None,
+            'snapshot_airports': len(snapshot.airports) if snapshot is not None else 0,
+            'snapshot_errors': len(snapshot.errors) if snapshot is not None else 0,
+            'last_refresh_s': snapshot.duration_s if snapshot is not None else None,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,62 @@
+"""
+Sky-layer features shared by the weather processing pipelines
+"""
+
+import numpy as np
+import pandas as pd
+
+# Coverage codes that make a layer a ceiling (broken, overcast, vertical visibility)
+CEILING_COVER_CODES = ('BKN', 'OVC', 'VV')
+
+# METAR sky groups that report the sky without a ceiling layer (clear, few, scattered)
+NO_CEILING_SKY_CODES = ('CLR', 'SKC', 'NSC', 'NCD', 'FEW', 'SCT')
+
+# ISD CIG code for an unlimited ceiling; data_processing keeps it as the height
+UNLIMITED_CEILING_FT = 22000.0
+
+MAX_SKY_LAYERS = 4
+
+
+def _ceiling_cover_mask(column):
+    """True where a sky coverage code counts as a ceiling; decoded once per distinct code"""
+    codes, uniques = pd.factorize(column, use_na_sentinel=True)
+    is_ceiling = np.array([str(code).strip().upper() in CEILING_COVER_CODES for code in uniques] + [False])
+    return is_ceiling[codes]
+
+
+def compute_ceiling_ft(df, max_layers=MAX_SKY_LAYERS):
+    """
+    Ceiling height (ft) from ASOS sky layers: the lowest BKN/OVC/VV layer
+
+    Uses skyl1..skyl{max_layers} heights with their skyc coverage codes.
+    FEW/SCT/CLR layers don't count, so rows without a ceiling layer get
+    NaN. Files without coverage columns fall back to the lowest reported
+    layer.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        IEM ASOS-style frame with skyl*/skyc* columns
+    max_layers : int
+        Number of sky layers to consider
+
+    Returns:
+    --------
+    np.array
+        Ceiling height per row (float64, NaN = no ceiling or no data)
+    """
+    layers = [i for i in range(1, max_layers + 1) if f'skyl{i}' in df.columns]
+    if not layers:
+        return np.full(len(df), np.nan)
+
+    heights = np.column_stack([
+        pd.to_numeric(df[f'skyl{i}'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        for i in layers
+    ])
+
+    if all(f'skyc{i}' in df.columns for i in layers):
+        is_ceiling = np.column_stack([_ceiling_cover_mask(df[f'skyc{i}']) for i in layers])
+        heights = np.where(is_ceiling, heights, np.nan)
+
+    # NaN-aware minimum across layers; all-NaN rows stay NaN
+    return np.fmin.reduce(heights, axis=1)
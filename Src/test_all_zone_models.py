@@ -7,8 +7,7 @@ import sys
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from Src.predict_zone_risk import predict_zone_risk, ZONES, interpret_risk_score
-import numpy as np
+from Src.predict_zone_risk import predict_zones_batch, ZONES
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -47,19 +46,19 @@ def test_all_zones():
     print(f"  Wind Speed: {sample_weather['wind_speed_kts']} kts")
     print()
     
+    batch = predict_zones_batch([sample_weather], list(ZONES.keys()))
+    
     results = {}
     
-    for zone_name in ZONES.keys():
-        try:
-            risk_score = predict_zone_risk(zone_name, sample_weather)
-            category = interpret_risk_score(risk_score[0] if isinstance(risk_score, np.ndarray) else risk_score)
+    for j, zone_name in enumerate(batch['zones']):
+        if zone_name in batch['errors']:
             results[zone_name] = {
-                'score': risk_score[0] if isinstance(risk_score, np.ndarray) else risk_score,
-                'category': category
+                'error': batch['errors'][zone_name]
             }
-        except Exception as e:
+        else:
             results[zone_name] = {
-                'error': str(e)
+                'score': batch['scores'][0, j],
+                'category': batch['categories'][0, j]
             }
     
     # Print results
@@ -9,6 +9,17 @@ from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from Src.zone_store import TRAINING_COLUMNS, load_zone_weather, zone_weather_exists
+    from Src.weather_delay_join import join_departure_weather
+    from Src.flight_delays import load_flight_delays
+    from Src.dtype_policy import enable_memory_report, report_memory
+except ImportError:  # Running as a script from inside Src/
+    from zone_store import TRAINING_COLUMNS, load_zone_weather, zone_weather_exists
+    from weather_delay_join import join_departure_weather
+    from flight_delays import load_flight_delays
+    from dtype_policy import enable_memory_report, report_memory
+
 # Define zones and their airports
 ZONES = {
     'Northeast': ['BOS', 'JFK'],
@@ -18,62 +29,13 @@ ZONES = {
     'Southeast': ['ATL', 'MIA']
 }
 
-def load_flight_delays(filepath):
-    """Load and process flight delay data"""
-    print("\nLoading flight delay data...")
-    
-    df = pd.read_csv(filepath, low_memory=False)
-    print(f"Loaded {len(df):,} delay records")
-    
-    # Parse date
-    df['FL_DATE'] = pd.to_datetime(df['FL_DATE'])
-    df['date'] = df['FL_DATE'].dt.date
-    
-    # Extract hour from CRS_DEP_TIME
-    def parse_time(time_val):
-        try:
-            time_str = str(int(float(time_val)))
-            if len(time_str) <= 2:
-                hour = int(time_str)
-            else:
-                hour = int(time_str[:-2])
-            return hour % 24
-        except:
-            return 12  # Default noon
-    
-    df['departure_hour'] = df['CRS_DEP_TIME'].apply(parse_time)
-    
-    # Calculate total delay (use weather delay or total delay)
-    df['total_delay'] = df['DEP_DELAY'].fillna(0)
-    df['weather_delay'] = df['WEATHER_DELAY'].fillna(0)
-    
-    # Create a delay indicator (1 if delay > 15 minutes, else 0)
-    df['has_delay'] = (df['total_delay'] > 15).astype(int)
-    
-    # Create delay severity score (0-100 based on delay minutes)
-    df['delay_score'] = np.clip(df['total_delay'] / 4, 0, 100)  # 4 hours = 100
-    
-    print(f"Delay data summary:")
-    print(f"  Records: {len(df):,}")
-    print(f"  Airports: {sorted(df['ORIGIN'].unique())}")
-    print(f"  Date range: {df['date'].min()} to {df['date'].max()}")
-    print(f"  Average delay: {df['total_delay'].mean():.1f} minutes")
-    
-    return df[['ORIGIN', 'date', 'departure_hour', 'total_delay', 'weather_delay', 
-               'has_delay', 'delay_score']]
-
 def combine_weather_delays(weather_df, delay_df):
     """Combine weather data with flight delay data"""
     print("\nCombining weather and delay data...")
     
-    # Merge on airport and date
-    combined = pd.merge(
-        delay_df,
-        weather_df,
-        left_on=['ORIGIN', 'date'],
-        right_on=['airport', 'date'],
-        how='inner'
-    )
+    # Match each flight to the observation nearest its scheduled departure
+    combined = join_departure_weather(delay_df, weather_df)
+    report_memory('Weather x delays', combined)
     
     print(f"Combined records: {len(combined):,}")
     print(f"Matching rate: {len(combined)/len(delay_df)*100:.1f}%")
@@ -102,6 +64,7 @@ def prepare_features(combined_df):
     # Handle missing values
     X = X.fillna(X.median())
     X = X.replace([np.inf, -np.inf], np.nan).fillna(X.median())
+    report_memory('Feature matrix', X)
     
     print(f"Features: {len(available_features)}")
     print(f"Records: {len(X):,}")
@@ -126,10 +89,10 @@ def train_zone_model(zone_name, X, y, features, output_dir='models/zones'):
     print(f"Training set: {X_train.shape[0]:,}")
     print(f"Test set: {X_test.shape[0]:,}")
     
-    # Scale features
+    # Scale features (in float64, as serving does; float32 scaling shifts the splits)
     scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    X_train_scaled = scaler.fit_transform(X_train.astype(np.float64))
+    X_test_scaled = scaler.transform(X_test.astype(np.float64))
     
     # Train model
     print("\nTraining XGBoost model...")
@@ -212,16 +175,15 @@ def main():
     print("="*60)
     
     # Load delay data
-    delay_df = load_flight_delays('Data/T_ONTIME_REPORTING.csv')
+    delay_df = load_flight_delays('Data/T_ONTIME_REPORTING.csv', target='total',
+                                  airports=[airport for airports in ZONES.values() for airport in airports])
     
     # Train models for each zone
     results = {}
     
     for zone_name in ZONES.keys():
         # Load weather data
-        weather_path = f'Data/processed_zones/{zone_name}_weather.csv'
-        
-        if not os.path.exists(weather_path):
+        if not zone_weather_exists(zone_name):
             print(f"\n⚠️  Skipping {zone_name}: weather data not found")
             continue
         
@@ -229,11 +191,10 @@ def main():
         print(f"Processing {zone_name}")
         print(f"{'='*60}")
         
-        weather_df = pd.read_csv(weather_path, parse_dates=['valid'])
-        weather_df['date'] = pd.to_datetime(weather_df['valid']).dt.date
-        
         # Get airports for this zone
         airports = ZONES[zone_name]
+        weather_df = load_zone_weather(zone_name, columns=TRAINING_COLUMNS, airports=airports)
+        report_memory(f'{zone_name} weather', weather_df)
         
         # Filter delay data for this zone's airports
         zone_delay = delay_df[delay_df['ORIGIN'].isin(airports)].copy()
@@ -271,4 +232,12 @@ def main():
     print(f"\nModels saved in: models/zones/")
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train flight risk models for every zone")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="Print the memory used by each stage's frame")
+    args = parser.parse_args()
+    
+    enable_memory_report(args.memory_report)
     main()
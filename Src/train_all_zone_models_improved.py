@@ -1,7 +1,9 @@
 import pandas as pd
 import numpy as np
 import os
+import time
 import joblib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 import xgboost as xgb
@@ -9,6 +11,25 @@ from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from Src.model_export import export_scaler_free_model, save_impute_values
+    from Src.zone_store import TRAINING_COLUMNS, load_zone_weather, zone_weather_exists
+    from Src.weather_delay_join import join_departure_weather
+    from Src.flight_delays import load_flight_delays, partition_by_zone
+    from Src.dtype_policy import enable_memory_report, memory_report_enabled, report_memory
+    from Src.zone_model_registry import zone_artifact_paths
+    from Src.out_of_core_training import BATCH_ROWS, NUM_BOOST_ROUND, train_zone_out_of_core
+    from Src.early_stopping import EARLY_STOPPING_ROUNDS, MAX_BOOST_ROUNDS, best_iteration_model, flight_holdout_starts, holdout_starts, window_masks
+except ImportError:  # Running as a script from inside Src/
+    from model_export import export_scaler_free_model, save_impute_values
+    from zone_store import TRAINING_COLUMNS, load_zone_weather, zone_weather_exists
+    from weather_delay_join import join_departure_weather
+    from flight_delays import load_flight_delays, partition_by_zone
+    from dtype_policy import enable_memory_report, memory_report_enabled, report_memory
+    from zone_model_registry import zone_artifact_paths
+    from out_of_core_training import BATCH_ROWS, NUM_BOOST_ROUND, train_zone_out_of_core
+    from early_stopping import EARLY_STOPPING_ROUNDS, MAX_BOOST_ROUNDS, best_iteration_model, flight_holdout_starts, holdout_starts, window_masks
+
 ZONES = {
     'Northeast': ['BOS', 'JFK'],
     'PacificCoast': ['LAX', 'SEA'],
@@ -17,77 +38,23 @@ ZONES = {
     'Southeast': ['ATL', 'MIA']
 }
 
-def load_flight_delays(filepath):
-    """Load and process flight delay data with improved target creation"""
-    print("\nLoading flight delay data...")
-    
-    df = pd.read_csv(filepath, low_memory=False)
-    print(f"Loaded {len(df):,} delay records")
-    
-    # Parse date
-    df['FL_DATE'] = pd.to_datetime(df['FL_DATE'])
-    df['date'] = df['FL_DATE'].dt.date
-    
-    # Extract hour from CRS_DEP_TIME
-    def parse_time(time_val):
-        try:
-            time_str = str(int(float(time_val)))
-            if len(time_str) <= 2:
-                hour = int(time_str)
-            else:
-                hour = int(time_str[:-2])
-            return hour % 24
-        except:
-            return 12
-    
-    df['departure_hour'] = df['CRS_DEP_TIME'].apply(parse_time)
-    
-    # Clean delay data
-    df['total_delay'] = df['DEP_DELAY'].fillna(0)
-    df['weather_delay'] = df['WEATHER_DELAY'].fillna(0)
-    
-    # CREATE IMPROVED TARGET: Focus on weather-related delays
-    # Use weather delay as primary indicator, but scale total delay for context
-    df['delay_score'] = np.where(
-        df['weather_delay'] > 0,
-        np.clip(df['weather_delay'] / 6, 0, 100),  # 6 hours = 100
-        np.where(
-            df['total_delay'] > 15,  # Delayed but not weather-related
-            np.clip(df['total_delay'] / 8, 0, 50),  # Lower weight for non-weather delays
-            0  # On-time or early
-        )
-    )
-    
-    # FILTER: Focus on flights with actual delays or weather issues
-    # This creates a more signal-rich dataset
-    df_filtered = df[
-        (df['total_delay'] > 10) | (df['weather_delay'] > 0) | (df['total_delay'] < -5)
-    ].copy()
-    
-    print(f"Original records: {len(df):,}")
-    print(f"Filtered records: {len(df_filtered):,} ({len(df_filtered)/len(df)*100:.1f}%)")
-    
-    print(f"\nDelay statistics:")
-    print(f"  Weather delay records: {len(df[df['weather_delay']>0]):,}")
-    print(f"  Average weather delay: {df['weather_delay'].mean():.1f} min")
-    print(f"  Average total delay: {df['total_delay'].mean():.1f} min")
-    print(f"  Delay score range: {df_filtered['delay_score'].min():.1f} to {df_filtered['delay_score'].max():.1f}")
-    
-    return df_filtered[['ORIGIN', 'date', 'departure_hour', 'total_delay', 'weather_delay', 
-                        'delay_score']]
+# Metrics a train_zone result reports (valid_rmse only with early stopping)
+METRIC_KEYS = ('train_rmse', 'test_rmse', 'train_r2', 'test_r2', 'valid_rmse', 'trees')
+
+# Features whose variance is at most this are dropped before training
+MIN_FEATURE_VARIANCE = 0.01
+
+# Native XGBoost parameter names (as in a tuned {zone}_best.json) -> XGBRegressor names
+REGRESSOR_PARAM_NAMES = {'eta': 'learning_rate', 'lambda': 'reg_lambda', 'alpha': 'reg_alpha',
+                         'seed': 'random_state', 'nthread': 'n_jobs'}
 
 def combine_weather_delays(weather_df, delay_df):
     """Combine weather data with flight delay data"""
     print("\nCombining weather and delay data...")
     
-    # Merge on airport and date
-    combined = pd.merge(
-        delay_df,
-        weather_df,
-        left_on=['ORIGIN', 'date'],
-        right_on=['airport', 'date'],
-        how='inner'
-    )
+    # Match each flight to the observation nearest its scheduled departure
+    combined = join_departure_weather(delay_df, weather_df)
+    report_memory('Weather x delays', combined)
     
     print(f"Combined records: {len(combined):,}")
     if len(delay_df) > 0:
@@ -118,11 +85,13 @@ def prepare_features(combined_df):
     
     # Remove features with zero variance
     from sklearn.feature_selection import VarianceThreshold
-    selector = VarianceThreshold(threshold=0.01)
+    selector = VarianceThreshold(threshold=MIN_FEATURE_VARIANCE)
     X_selected = selector.fit_transform(X)
-    selected_features = [available_features[i] for i in range(len(available_features)) if selector.variances_[i] > 0.01]
+    selected_features = [available_features[i] for i in range(len(available_features))
+                         if selector.variances_[i] > MIN_FEATURE_VARIANCE]
     
     X = pd.DataFrame(X_selected, columns=selected_features, index=X.index)
+    report_memory('Feature matrix', X)
     
     print(f"Features: {len(selected_features)} (removed {len(available_features) - len(selected_features)} low-variance features)")
     print(f"Records: {len(X):,}")
@@ -131,31 +100,57 @@ def prepare_features(combined_df):
     
     return X, y, selected_features
 
-def train_zone_model(zone_name, X, y, features, output_dir='models/zones'):
-    """Train XGBoost model for a specific zone with improved hyperparameters"""
+def train_zone_model(zone_name, X, y, features, output_dir='models/zones', n_jobs=-1, times=None, params=None,
+                     n_estimators=None, holdout=None):
+    """
+    Train XGBoost model for a specific zone with improved hyperparameters
+    
+    With `times` (each row's departure time) the split is by time instead
+    of a random 20%: training stops early on a validation window, the saved
+    model keeps only the trees up to the best iteration, and the test
+    metrics come from the most recent window, after the validation one.
+    The windows start at `holdout` (see early_stopping.flight_holdout_starts),
+    by default placed on `times` itself. `params` (native XGBoost names, e.g. a tuned configuration) override the
+    hyperparameters below and `n_estimators` the tree count (without early
+    stopping).
+    """
     print(f"\n{'='*60}")
     print(f"Training Model for {zone_name}")
     print(f"{'='*60}")
     
     os.makedirs(output_dir, exist_ok=True)
+    early_stopping = times is not None
     
     # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
+    if early_stopping:
+        valid, test = window_masks(times, holdout or holdout_starts(times))
+        train = ~valid & ~test
+        if not valid.any() or not test.any():
+            raise ValueError("No matched flights in the validation or test window")
+        X_train, X_valid, X_test = X[train], X[valid], X[test]
+        y_train, y_valid, y_test = y[train], y[valid], y[test]
+        print(f"Validation window: departures from {pd.Series(times)[valid].min()}")
+        print(f"Test window: departures from {pd.Series(times)[test].min()}")
+    else:
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42
+        )
     
     print(f"Training set: {X_train.shape[0]:,}")
+    if early_stopping:
+        print(f"Validation set: {X_valid.shape[0]:,}")
     print(f"Test set: {X_test.shape[0]:,}")
     
-    # Scale features
+    # Scale features (in float64, as serving does; float32 scaling shifts the splits)
     scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    X_train_scaled = scaler.fit_transform(X_train.astype(np.float64))
+    X_test_scaled = scaler.transform(X_test.astype(np.float64))
+    if early_stopping:
+        X_valid_scaled = scaler.transform(X_valid.astype(np.float64))
     
     # Train with improved hyperparameters
     print("\nTraining XGBoost model...")
-    model = xgb.XGBRegressor(
-        n_estimators=300,  # More estimators
+    hyperparameters = dict(
         max_depth=8,  # Deeper trees
         learning_rate=0.05,  # Lower learning rate
         min_child_weight=2,
@@ -163,10 +158,23 @@ def train_zone_model(zone_name, X, y, features, output_dir='models/zones'):
         colsample_bytree=0.9,
         gamma=0.1,
         random_state=42,
-        n_jobs=-1
+    )
+    hyperparameters.update((REGRESSOR_PARAM_NAMES.get(name, name), value) for name, value in (params or {}).items())
+    hyperparameters['n_jobs'] = n_jobs
+    model = xgb.XGBRegressor(
+        n_estimators=MAX_BOOST_ROUNDS if early_stopping else (n_estimators or 300),  # More estimators
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS if early_stopping else None,
+        **hyperparameters
     )
     
-    model.fit(X_train_scaled, y_train)
+    if early_stopping:
+        model.fit(X_train_scaled, y_train, eval_set=[(X_valid_scaled, y_valid)], verbose=False)
+        print(f"Stopped early: best iteration {model.best_iteration + 1} of {model.n_estimators} "
+              f"(validation RMSE {model.best_score:.2f})")
+        # Drop the trees after the best iteration from the saved model
+        model = best_iteration_model(model)
+    else:
+        model.fit(X_train_scaled, y_train)
     
     # Predictions
     y_train_pred = model.predict(X_train_scaled)
@@ -187,7 +195,11 @@ def train_zone_model(zone_name, X, y, features, output_dir='models/zones'):
     print(f"  RMSE: {train_rmse:.2f}")
     print(f"  MAE: {train_mae:.2f}")
     print(f"  R²: {train_r2:.3f}")
-    print(f"\nTest:")
+    if early_stopping:
+        valid_rmse = np.sqrt(mean_squared_error(y_valid, model.predict(X_valid_scaled)))
+        print(f"\nValidation (picks the best iteration):")
+        print(f"  RMSE: {valid_rmse:.2f}")
+    print(f"\n{'Test (most recent window)' if early_stopping else 'Test'}:")
     print(f"  RMSE: {test_rmse:.2f}")
     print(f"  MAE: {test_mae:.2f}")
     print(f"  R²: {test_r2:.3f}")
@@ -216,6 +228,12 @@ def train_zone_model(zone_name, X, y, features, output_dir='models/zones'):
     
     print(f"\n✅ Model saved to {model_path}")
     
+    # Scaler-free copy for serving, verified bit-identical on the training data
+    export_scaler_free_model(zone_name, model, scaler, features, X_train, output_dir)
+    
+    # Fill values for single-observation scoring
+    save_impute_values(zone_name, X_train, features, output_dir)
+    
     return {
         'model': model,
         'scaler': scaler,
@@ -223,10 +241,160 @@ def train_zone_model(zone_name, X, y, features, output_dir='models/zones'):
         'train_rmse': train_rmse,
         'test_rmse': test_rmse,
         'train_r2': train_r2,
-        'test_r2': test_r2
+        'test_r2': test_r2,
+        'valid_rmse': valid_rmse if early_stopping else None,
+        'trees': model.get_booster().num_boosted_rounds()
     }
 
-def main():
+def core_budget(workers, n_zones, cores=None):
+    """
+    Split the machine's cores between concurrent zone trainings
+    
+    Returns:
+    --------
+    (int, int)
+        Worker processes and XGBoost threads per worker, with
+        workers x threads <= cores
+    """
+    cores = cores or os.cpu_count() or 1
+    workers = max(1, min(workers, n_zones, cores))
+    return workers, max(1, cores // workers)
+
+def train_zone(zone_name, airports, zone_delay, n_jobs=-1, output_dir='models/zones', batch_rows=None,
+               external_memory=False, early_stopping=False, params=None, num_boost_round=None):
+    """
+    Load, join and train one zone (runs in a worker process when training in parallel)
+    
+    With batch_rows set the zone is trained out-of-core instead (see
+    out_of_core_training.train_zone_out_of_core): the join is streamed in
+    batches of that many flights and nothing is held at full size in pandas.
+    With early_stopping the most recent flights are the validation window
+    and training stops at the best iteration (see early_stopping.py).
+    params and num_boost_round (e.g. from tune_zone_models) override the
+    default hyperparameters and tree count.
+    
+    Returns:
+    --------
+    dict
+        zone, status ('trained', 'skipped' or 'failed'), message, metrics,
+        artifacts (paths written), start/end (wall clock) and pid
+    """
+    start = time.time()
+    result = {'zone': zone_name, 'status': 'skipped', 'message': None, 'metrics': {},
+              'artifacts': [], 'threads': n_jobs, 'pid': os.getpid()}
+    
+    print(f"\n{'='*60}")
+    print(f"Processing {zone_name}")
+    print(f"{'='*60}")
+    
+    if not zone_weather_exists(zone_name):
+        result['message'] = 'weather data not found'
+    elif len(zone_delay) == 0:
+        result['message'] = 'no delay data for its airports'
+    elif batch_rows is not None or external_memory:
+        trained = train_zone_out_of_core(zone_name, airports, zone_delay, batch_rows or BATCH_ROWS, n_jobs,
+                                         output_dir, external_memory, params=params,
+                                         num_boost_round=num_boost_round or NUM_BOOST_ROUND,
+                                         early_stopping=early_stopping)
+        if trained is None:
+            result['message'] = 'no matching weather-delay records'
+        else:
+            result['status'] = 'trained'
+            result['metrics'] = {key: float(trained[key]) for key in METRIC_KEYS if trained.get(key) is not None}
+            result['artifacts'] = trained['artifacts']
+    else:
+        weather_df = load_zone_weather(zone_name, columns=TRAINING_COLUMNS, airports=airports)
+        report_memory(f'{zone_name} weather', weather_df)
+        
+        combined = combine_weather_delays(weather_df, zone_delay)
+        
+        if len(combined) == 0:
+            result['message'] = 'no matching weather-delay records'
+        else:
+            X, y, features = prepare_features(combined)
+            times = combined.loc[X.index, 'departure_time'] if early_stopping else None
+            holdout = flight_holdout_starts(zone_delay) if early_stopping else None
+            trained = train_zone_model(zone_name, X, y, features, output_dir, n_jobs=n_jobs, times=times,
+                                       params=params, n_estimators=num_boost_round, holdout=holdout)
+            result['status'] = 'trained'
+            result['metrics'] = {key: float(trained[key]) for key in METRIC_KEYS if trained.get(key) is not None}
+            result['artifacts'] = [path for path in zone_artifact_paths(zone_name, output_dir).values()
+                                   if os.path.exists(path)]
+    
+    if result['status'] == 'skipped':
+        print(f"\n⚠️  Skipping {zone_name}: {result['message']}")
+    
+    result['start'], result['end'] = start, time.time()
+    return result
+
+def failed_result(zone_name, error, n_jobs, start):
+    """train_zone-shaped result for a zone whose training raised"""
+    return {'zone': zone_name, 'status': 'failed', 'message': f"{type(error).__name__}: {error}",
+            'metrics': {}, 'artifacts': [], 'threads': n_jobs, 'pid': None, 'start': start, 'end': time.time()}
+
+def train_zones(zone_delays, workers=1, n_jobs=-1, output_dir='models/zones', batch_rows=None,
+                external_memory=False, early_stopping=False, tuned=None):
+    """
+    Train every zone of `zone_delays` ({zone: (airports, delay slice)})
+    
+    With workers > 1 the zones train concurrently in a process pool. Either
+    way a failing zone is reported in its result and doesn't stop the others.
+    batch_rows / external_memory select out-of-core training and
+    early_stopping the time-ordered early-stopping mode (see train_zone).
+    tuned maps zones to the (params, num_boost_round) they train with.
+    
+    Returns:
+    --------
+    dict
+        zone -> train_zone result, in `zone_delays` order
+    """
+    tuned = tuned or {}
+    results = {}
+    if workers == 1:
+        for zone_name, (airports, zone_delay) in zone_delays.items():
+            start = time.time()
+            try:
+                results[zone_name] = train_zone(zone_name, airports, zone_delay, n_jobs, output_dir, batch_rows,
+                                                external_memory, early_stopping, *tuned.get(zone_name, (None, None)))
+            except Exception as e:
+                print(f"⚠️  {zone_name} failed: {type(e).__name__}: {e}")
+                results[zone_name] = failed_result(zone_name, e, n_jobs, start)
+        return results
+    
+    # Workers start with the parent's memory-report setting
+    with ProcessPoolExecutor(max_workers=workers, initializer=enable_memory_report,
+                             initargs=(memory_report_enabled(),)) as executor:
+        submitted = time.time()
+        futures = {executor.submit(train_zone, zone_name, airports, zone_delay, n_jobs, output_dir, batch_rows,
+                                   external_memory, early_stopping, *tuned.get(zone_name, (None, None))): zone_name
+                   for zone_name, (airports, zone_delay) in zone_delays.items()}
+        for future in as_completed(futures):
+            zone_name = futures[future]
+            try:
+                results[zone_name] = future.result()
+            except Exception as e:  # Training raised, the worker died or the result couldn't be sent back
+                results[zone_name] = failed_result(zone_name, e, n_jobs, submitted)
+    return {zone_name: results[zone_name] for zone_name in zone_delays}
+
+def print_training_timeline(results, started, width=40):
+    """Wall-clock start, end and duration of each zone, with a bar per zone"""
+    finished = max([result['end'] for result in results.values()], default=started)
+    total = max(finished - started, 1e-9)
+    
+    print("\n" + "="*60)
+    print("TRAINING TIMELINE (wall clock)")
+    print("="*60)
+    print(f"  {'Zone':<16}{'Start':>8}{'End':>8}{'Seconds':>9}{'Threads':>9}  Timeline")
+    for zone_name, result in results.items():
+        offset, end = result['start'] - started, result['end'] - started
+        first = min(int(offset / total * width), width - 1)
+        bar = ' ' * first + '█' * max(1, int(end / total * width) - first)
+        print(f"  {zone_name:<16}{offset:>7.1f}s{end:>7.1f}s{end - offset:>9.1f}{result['threads']:>9}  |{bar:<{width}}|")
+    
+    busy = sum(result['end'] - result['start'] for result in results.values())
+    print(f"\n  Wall time: {total:.1f}s (sum of zone times: {busy:.1f}s)")
+
+def main(workers=1, early_stopping=False):
     print("="*60)
     print("IMPROVED MULTI-ZONE FLIGHT RISK MODEL TRAINING")
     print("="*60)
@@ -237,41 +405,24 @@ def main():
     print("  - Feature selection")
     
     # Load delay data
-    delay_df = load_flight_delays('Data/T_ONTIME_REPORTING.csv')
+    delay_df = load_flight_delays('Data/T_ONTIME_REPORTING.csv',
+                                  airports=[airport for airports in ZONES.values() for airport in airports])
     
-    # Train models for each zone
-    results = {}
+    # Each zone gets its slice of the delays; zones train concurrently
+    partitions = partition_by_zone(delay_df, ZONES)
+    zone_delays = {zone_name: (airports, partitions[zone_name]) for zone_name, airports in ZONES.items()}
+    workers, n_jobs = core_budget(workers, len(zone_delays))
+    print(f"\nTraining {len(zone_delays)} zones with {workers} worker(s) x {n_jobs} XGBoost thread(s)...")
     
-    for zone_name in ZONES.keys():
-        weather_path = f'Data/processed_zones/{zone_name}_weather.csv'
-        
-        if not os.path.exists(weather_path):
-            print(f"\n⚠️  Skipping {zone_name}: weather data not found")
-            continue
-        
-        print(f"\n{'='*60}")
-        print(f"Processing {zone_name}")
-        print(f"{'='*60}")
-        
-        weather_df = pd.read_csv(weather_path, parse_dates=['valid'])
-        weather_df['date'] = pd.to_datetime(weather_df['valid']).dt.date
-        
-        airports = ZONES[zone_name]
-        zone_delay = delay_df[delay_df['ORIGIN'].isin(airports)].copy()
-        
-        if len(zone_delay) == 0:
-            print(f"⚠️  No delay data for {zone_name} airports")
-            continue
-        
-        combined = combine_weather_delays(weather_df, zone_delay)
-        
-        if len(combined) == 0:
-            print(f"⚠️  No matching weather-delay records for {zone_name}")
-            continue
-        
-        X, y, features = prepare_features(combined)
-        result = train_zone_model(zone_name, X, y, features)
-        results[zone_name] = result
+    started = time.time()
+    outcomes = train_zones(zone_delays, workers, n_jobs, early_stopping=early_stopping)
+    print_training_timeline(outcomes, started)
+    
+    results = {zone_name: outcome['metrics'] for zone_name, outcome in outcomes.items()
+               if outcome['status'] == 'trained'}
+    for zone_name, outcome in outcomes.items():
+        if outcome['status'] == 'failed':
+            print(f"\n❌ {zone_name} failed: {outcome['message']}")
     
     # Summary
     print("\n" + "="*60)
@@ -283,8 +434,23 @@ def main():
         print(f"  Train R²: {result['train_r2']:.3f}")
         print(f"  Test R²: {result['test_r2']:.3f}")
         print(f"  Test RMSE: {result['test_rmse']:.2f}")
+        print(f"  Trees: {int(result['trees'])}")
+    
+        print(f"  Artifacts: {', '.join(os.path.basename(path) for path in outcomes[zone_name]['artifacts'])}")
     
     print(f"\n✅ Trained {len(results)} zone models successfully!")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train improved flight risk models for every zone")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Zones trained concurrently; cores are split between them (1 = sequential)")
+    parser.add_argument('--early-stopping', action='store_true',
+                        help="Hold out the most recent flights and stop at the best iteration")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="Print the memory used by each stage's frame")
+    args = parser.parse_args()
+    
+    enable_memory_report(args.memory_report)
+    main(workers=args.workers, early_stopping=args.early_stopping)
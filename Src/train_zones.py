@@ -0,0 +1,211 @@
+"""
+Train zone flight risk models from a single load of the on-time data
+The delays of every configured airport are loaded and preprocessed once,
+partitioned by ORIGIN, and each zone trains on its slice. Zones train
+concurrently (see train_all_zone_models_improved.train_zones)
+"""
+
+import json
+import os
+import time
+
+try:
+    from Src.flight_delays import load_flight_delays, partition_by_zone
+    from Src.train_all_zone_models_improved import core_budget, train_zones, print_training_timeline
+    from Src.dtype_policy import enable_memory_report
+except ImportError:  # Running as a script from inside Src/
+    from flight_delays import load_flight_delays, partition_by_zone
+    from train_all_zone_models_improved import core_budget, train_zones, print_training_timeline
+    from dtype_policy import enable_memory_report
+
+DELAY_FILE = 'Data/T_ONTIME_REPORTING.csv'
+OUTPUT_DIR = 'models/zones'
+
+# Airports of each zone (from the Excel airport list)
+ZONE_AIRPORTS = {
+    'Northeast': ['JFK', 'LGA', 'EWR', 'BOS', 'BWI', 'PHL', 'IAD', 'BDL', 'BUF', 'ALB', 'PVD', 'PWM'],
+    'PacificCoast': ['LAX', 'SFO', 'SEA', 'PDX', 'SAN', 'OAK', 'SJC', 'SMF'],
+    'RockyMountains': ['DEN', 'SLC', 'BOI', 'BIL', 'BZN', 'JAC', 'COS', 'MSO'],
+    'CentralPlains': ['MCI', 'OMA', 'DSM', 'STL', 'TUL', 'ICT'],
+    'Southeast': ['ATL', 'MIA'],
+}
+
+
+def load_zone_config(path=None):
+    """
+    Zone -> airports mapping: ZONE_AIRPORTS, or a JSON file of the same shape
+
+    Returns:
+    --------
+    dict
+        Zone name -> list of airport codes
+    """
+    if path is None:
+        return dict(ZONE_AIRPORTS)
+
+    with open(path, 'r') as f:
+        config = json.load(f)
+    if not isinstance(config, dict) or not all(
+            isinstance(airports, list) and all(isinstance(code, str) for code in airports)
+            for airports in config.values()):
+        raise ValueError(f"{path} must map each zone name to a list of airport codes")
+    return config
+
+
+def select_zones(zone_airports, zones=None):
+    """The requested subset of the config (all zones if zones is None), in the order given"""
+    if zones is None:
+        return zone_airports
+    unknown = [zone_name for zone_name in zones if zone_name not in zone_airports]
+    if unknown:
+        raise ValueError(f"Unknown zone(s) {', '.join(unknown)} (configured: {', '.join(zone_airports)})")
+    return {zone_name: zone_airports[zone_name] for zone_name in zones}
+
+
+def load_tuned_params(path, zones):
+    """
+    Tuned hyperparameters for each zone, from tune_zone_models output
+
+    Parameters:
+    -----------
+    path : str
+        A {zone}_best.json (used for every zone) or the tuning directory
+        (each zone uses its own {zone}_best.json; zones without one keep
+        the defaults)
+    zones : list
+        Zones being trained
+
+    Returns:
+    --------
+    dict
+        Zone -> (XGBoost params, number of trees)
+    """
+    if os.path.isdir(path):
+        paths = {zone_name: os.path.join(path, f'{zone_name}_best.json') for zone_name in zones}
+        paths = {zone_name: best_path for zone_name, best_path in paths.items() if os.path.exists(best_path)}
+    else:
+        paths = {zone_name: path for zone_name in zones}
+
+    tuned = {}
+    for zone_name, best_path in paths.items():
+        with open(best_path, 'r') as f:
+            best = json.load(f)
+        if not isinstance(best, dict) or 'xgb_params' not in best or 'n_estimators' not in best:
+            raise ValueError(f"{best_path} is not a tune_zone_models best configuration")
+        tuned[zone_name] = (best['xgb_params'], int(best['n_estimators']))
+    return tuned
+
+
+def main(zones=None, config=None, workers=1, delay_file=DELAY_FILE, output_dir=OUTPUT_DIR, batch_rows=None,
+         external_memory=False, early_stopping=False, params=None):
+    """
+    Train the selected zones
+
+    Parameters:
+    -----------
+    zones : list or None
+        Zones to train (None = every configured zone)
+    config : str or None
+        JSON zone -> airports file (None = ZONE_AIRPORTS)
+    workers : int
+        Zones trained concurrently; cores are split between them
+    delay_file : str
+        BTS on-time CSV
+    output_dir : str
+        Where the model artifacts are written
+    batch_rows : int or None
+        Train out-of-core, joining this many flights per batch
+    external_memory : bool
+        Train out-of-core with the quantized matrix paged to disk
+    early_stopping : bool
+        Validate on the most recent flights and stop at the best iteration
+    params : str or None
+        Tuned hyperparameters: a {zone}_best.json or the tuning directory
+        (see load_tuned_params)
+
+    Returns:
+    --------
+    dict
+        zone -> train_zone result
+    """
+    selected = select_zones(load_zone_config(config), zones)
+    tuned = load_tuned_params(params, list(selected)) if params is not None else {}
+
+    print("="*60)
+    print(f"TRAINING {len(selected)} ZONE MODEL(S): {', '.join(selected)}")
+    print("="*60)
+    for zone_name, (_, trees) in tuned.items():
+        print(f"  {zone_name}: tuned hyperparameters ({trees} trees unless early stopping)")
+
+    # One parse of the on-time data for every selected airport
+    delay_df = load_flight_delays(delay_file, airports=[airport for airports in selected.values()
+                                                        for airport in airports])
+    partitions = partition_by_zone(delay_df, selected)
+    for zone_name, zone_delay in partitions.items():
+        print(f"  {zone_name}: {len(zone_delay):,} delay records")
+
+    workers, n_jobs = core_budget(workers, len(selected))
+    print(f"\nTraining with {workers} worker(s) x {n_jobs} XGBoost thread(s)...")
+
+    started = time.time()
+    outcomes = train_zones({zone_name: (airports, partitions[zone_name]) for zone_name, airports in selected.items()},
+                           workers, n_jobs, output_dir, batch_rows, external_memory, early_stopping, tuned)
+    print_training_timeline(outcomes, started)
+
+    print("\n" + "="*60)
+    print("TRAINING SUMMARY")
+    print("="*60)
+    for zone_name, outcome in outcomes.items():
+        if outcome['status'] == 'trained':
+            metrics = outcome['metrics']
+            validation = f", validation RMSE {metrics['valid_rmse']:.2f}" if 'valid_rmse' in metrics else ""
+            print(f"  {zone_name:<16}Test R² {metrics['test_r2']:.3f}, RMSE {metrics['test_rmse']:.2f}{validation}, "
+                  f"{int(metrics['trees'])} trees")
+        else:
+            print(f"  {zone_name:<16}{outcome['status']}: {outcome['message']}")
+
+    trained = sum(outcome['status'] == 'trained' for outcome in outcomes.values())
+    print(f"\n✅ Trained {trained} of {len(outcomes)} zone models")
+    return outcomes
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train zone flight risk models from one load of the delay data")
+    parser.add_argument('zones', nargs='*',
+                        help="Zones to train (default: every zone in the config)")
+    parser.add_argument('--config',
+                        help="JSON file mapping zone names to airport lists (default: ZONE_AIRPORTS)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Zones trained concurrently; cores are split between them (1 = sequential)")
+    parser.add_argument('--delay-file', default=DELAY_FILE,
+                        help="BTS on-time CSV")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR,
+                        help="Directory for the model artifacts")
+    parser.add_argument('--batch-rows', type=int,
+                        help="Train out-of-core: stream the join in batches of this many flights "
+                             "into a quantized XGBoost matrix")
+    parser.add_argument('--external-memory', action='store_true',
+                        help="Train out-of-core with the quantized matrix paged to disk "
+                             "(default batch size unless --batch-rows is given)")
+    parser.add_argument('--early-stopping', action='store_true',
+                        help="Hold out the most recent flights and stop at the best iteration")
+    parser.add_argument('--params',
+                        help="Train with tuned hyperparameters: a tune_zone_models {zone}_best.json, or its "
+                             "output directory to give each zone its own")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="Print the memory used by each stage's frame")
+    args = parser.parse_args()
+
+    try:
+        selected = select_zones(load_zone_config(args.config), args.zones or None)
+        if args.params is not None:
+            load_tuned_params(args.params, list(selected))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    enable_memory_report(args.memory_report)
+    main(zones=args.zones or None, config=args.config, workers=args.workers,
+         delay_file=args.delay_file, output_dir=args.output_dir, batch_rows=args.batch_rows,
+         external_memory=args.external_memory, early_stopping=args.early_stopping, params=args.params)
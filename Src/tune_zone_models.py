@@ -0,0 +1,563 @@
+"""
+Hyperparameter search for the zone models
+Successive halving (optionally Hyperband brackets of it) per zone: many
+sampled configurations get a few boosting rounds, the best third earn three
+times the rounds, and so on up to the full budget. Each zone is joined once
+and staged to disk; the trials of every rung are spread over a pool of
+worker processes, each of which quantizes a zone once and trains all its
+trials there on that cached matrix. Zones are searched concurrently on the
+same pool, every finished trial is appended to a per-zone journal (headed
+by the search settings it was run with) so an interrupted search resumes
+where it stopped, and the search objective can charge for inference latency
+(trees x depth) next to RMSE
+"""
+
+import json
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+import xgboost as xgb
+
+try:
+    from Src.flight_delays import load_flight_delays, partition_by_zone
+    from Src.zone_store import TRAINING_COLUMNS, load_zone_weather, zone_weather_exists
+    from Src.weather_delay_join import join_departure_weather
+    from Src.out_of_core_training import FEATURE_COLUMNS, MAX_BIN, XGB_PARAMS
+    from Src.early_stopping import flight_holdout_starts, window_masks
+    from Src.train_all_zone_models_improved import MIN_FEATURE_VARIANCE, core_budget
+    from Src.model_export import training_medians
+    from Src.train_zones import DELAY_FILE, load_zone_config, select_zones
+    from Src.dtype_policy import enable_memory_report, memory_report_enabled, report_memory
+except ImportError:  # Running as a script from inside Src/
+    from flight_delays import load_flight_delays, partition_by_zone
+    from zone_store import TRAINING_COLUMNS, load_zone_weather, zone_weather_exists
+    from weather_delay_join import join_departure_weather
+    from out_of_core_training import FEATURE_COLUMNS, MAX_BIN, XGB_PARAMS
+    from early_stopping import flight_holdout_starts, window_masks
+    from train_all_zone_models_improved import MIN_FEATURE_VARIANCE, core_budget
+    from model_export import training_medians
+    from train_zones import DELAY_FILE, load_zone_config, select_zones
+    from dtype_policy import enable_memory_report, memory_report_enabled, report_memory
+
+TUNING_DIR = 'models/tuning'
+
+# name -> (scale, low, high); 'int' and 'uniform' are linear, 'log' is log-uniform
+SEARCH_SPACE = {
+    'max_depth': ('int', 3, 10),
+    'eta': ('log', 0.01, 0.3),
+    'min_child_weight': ('log', 1, 20),
+    'subsample': ('uniform', 0.5, 1.0),
+    'colsample_bytree': ('uniform', 0.5, 1.0),
+    'gamma': ('uniform', 0.0, 1.0),
+    'lambda': ('log', 0.1, 10.0),
+}
+
+# Boosting-round budgets: the first rung trains MIN_ROUNDS, each later rung
+# HALVING_RATE times more, up to MAX_ROUNDS
+MIN_ROUNDS = 25
+MAX_ROUNDS = 675
+HALVING_RATE = 3
+N_TRIALS = 27
+
+# Stage directory -> (training, validation) QuantileDMatrix, quantized once per process
+_MATRICES = {}
+
+
+def sample_params(rng):
+    """One configuration drawn from SEARCH_SPACE"""
+    params = {}
+    for name, (scale, low, high) in SEARCH_SPACE.items():
+        if scale == 'int':
+            params[name] = int(rng.integers(low, high + 1))
+        elif scale == 'log':
+            params[name] = float(math.exp(rng.uniform(math.log(low), math.log(high))))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    return params
+
+
+def rung_budgets(min_rounds=MIN_ROUNDS, max_rounds=MAX_ROUNDS, rate=HALVING_RATE):
+    """Boosting rounds of each rung: min_rounds, x rate, ..., ending at max_rounds"""
+    budgets = [min_rounds]
+    while budgets[-1] * rate < max_rounds:
+        budgets.append(budgets[-1] * rate)
+    if budgets[-1] < max_rounds:
+        budgets.append(max_rounds)
+    return budgets
+
+
+def brackets(n_trials=N_TRIALS, min_rounds=MIN_ROUNDS, max_rounds=MAX_ROUNDS, rate=HALVING_RATE, hyperband=False):
+    """
+    (number of configurations, rung budgets) of each successive-halving bracket
+
+    Without hyperband a single bracket starts n_trials configurations at
+    min_rounds. Hyperband adds brackets that start fewer configurations at
+    larger budgets, hedging against early rounds being a poor predictor.
+    """
+    budgets = rung_budgets(min_rounds, max_rounds, rate)
+    if not hyperband:
+        return [(n_trials, budgets)]
+    rungs = len(budgets)
+    return [(max(1, math.ceil(n_trials * rungs / ((rungs - skip) * rate ** skip))), budgets[skip:])
+            for skip in range(rungs)]
+
+
+def latency_cost(trees, params):
+    """Inference cost proxy: trees x depth (split comparisons per prediction)"""
+    return trees * params['max_depth']
+
+
+def objective(rmse, trees, params, latency_weight=0.0, max_latency=None):
+    """
+    Score to minimize: validation RMSE + latency_weight x trees x depth
+
+    Configurations over the max_latency budget (trees x depth) score inf.
+    The journal keeps only RMSE and trees, so objectives are always
+    recomputed with the current settings.
+    """
+    latency = latency_cost(trees, params)
+    if max_latency is not None and latency > max_latency:
+        return math.inf
+    return rmse + latency_weight * latency
+
+
+def journal_path(zone_name, output_dir=TUNING_DIR):
+    return os.path.join(output_dir, f'{zone_name}_journal.jsonl')
+
+
+def load_journal(path):
+    """
+    Search settings and finished trials of a journal
+
+    Returns:
+    --------
+    (dict or None, dict)
+        Settings of its header line (None for a missing file or a journal
+        without one) and the trials keyed by (bracket, rung, trial); a torn
+        last line is ignored
+    """
+    search, records = None, {}
+    if not os.path.exists(path):
+        return search, records
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Interrupted mid-write
+            if 'search' in record:
+                search = record['search']
+            else:
+                records[(record['bracket'], record['rung'], record['trial'])] = record
+    return search, records
+
+
+def append_journal(path, record):
+    """Append one line (the settings header or a finished trial) and flush it to disk before moving on"""
+    with open(path, 'a') as f:
+        f.write(json.dumps(record, sort_keys=True, allow_nan=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def drop_torn_line(path):
+    """Cut an interrupted last write off a journal so the next append starts on its own line"""
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+
+def open_journal(path, search):
+    """
+    Finished trials of the journal at `path`, started with a `search` header if new
+
+    Raises:
+    -------
+    ValueError
+        If the journal was written with different search settings or data
+    """
+    if os.path.exists(path):
+        drop_torn_line(path)
+    journal_search, journal = load_journal(path)
+    if journal_search is None and not journal:
+        append_journal(path, {'search': search})
+    elif journal_search != search:
+        changed = sorted(name for name in set(search) | set(journal_search or {})
+                         if (journal_search or {}).get(name) != search.get(name))
+        raise ValueError(f"{path} was written by a different search ({', '.join(changed)} changed); "
+                         f"rerun with --fresh")
+    return journal
+
+
+def stage_zone(zone_name, airports, zone_delay, stage_dir):
+    """
+    Join a zone once and save its training and validation arrays for the trial workers
+
+    The validation window and the later test window are those of the
+    early-stopping training mode (see early_stopping.flight_holdout_starts); the
+    test flights are left out so the search never sees them. As in
+    training, gaps are filled with the training rows' medians and
+    near-constant features are dropped.
+
+    Returns:
+    --------
+    (int, int) or None
+        Training and validation rows (None if nothing to tune on)
+    """
+    weather_df = load_zone_weather(zone_name, columns=TRAINING_COLUMNS, airports=airports)
+    combined = join_departure_weather(zone_delay, weather_df)
+    report_memory(f'{zone_name} tuning join', combined)
+    if len(combined) == 0:
+        return None
+
+    X = combined.reindex(columns=FEATURE_COLUMNS).to_numpy(dtype=np.float32)
+    X = np.where(np.isinf(X), np.nan, X)
+    y = combined['delay_score'].to_numpy(dtype=np.float32)
+    valid, test = window_masks(combined['departure_time'], flight_holdout_starts(zone_delay))
+    train = ~(valid | test)
+    if not train.any() or not valid.any():
+        raise ValueError("No matched flights in the training or validation window")
+
+    fill = training_medians(X[train])
+    X = np.where(np.isnan(X), fill.astype(np.float32), X)
+    # Columns without a single value stay NaN; they count as constant
+    X = X[:, np.var(np.nan_to_num(X, nan=0.0).astype(np.float64), axis=0) > MIN_FEATURE_VARIANCE]
+
+    for subset, mask in (('train', train), ('valid', valid)):
+        np.save(os.path.join(stage_dir, f'{subset}_X.npy'), X[mask])
+        np.save(os.path.join(stage_dir, f'{subset}_y.npy'), y[mask])
+    print(f"  {zone_name}: {int(train.sum()):,} training / {int(valid.sum()):,} validation rows "
+          f"({int(test.sum()):,} test rows held out)")
+    return int(train.sum()), int(valid.sum())
+
+
+def zone_matrices(stage_dir, n_jobs=-1):
+    """Training and validation QuantileDMatrix of a staged zone, quantized on first use in this process"""
+    if stage_dir not in _MATRICES:
+        arrays = {subset: (np.load(os.path.join(stage_dir, f'{subset}_X.npy')),
+                           np.load(os.path.join(stage_dir, f'{subset}_y.npy')))
+                  for subset in ('train', 'valid')}
+        dtrain = xgb.QuantileDMatrix(*arrays['train'], max_bin=MAX_BIN, nthread=n_jobs)
+        dvalid = xgb.QuantileDMatrix(*arrays['valid'], max_bin=MAX_BIN, nthread=n_jobs, ref=dtrain)
+        _MATRICES[stage_dir] = dtrain, dvalid
+    return _MATRICES[stage_dir]
+
+
+def validation_curve(params, dtrain, dvalid, rounds):
+    """
+    Validation RMSE after each of `rounds` boosting rounds
+
+    Every rung trains from scratch: continuing a booster draws its row and
+    column samples from a random state shared with the other trials in the
+    process, so results would depend on trial order and a resumed search
+    would not reproduce an uninterrupted one.
+    """
+    history = {}
+    xgb.train(params, dtrain, num_boost_round=rounds, evals=[(dvalid, 'valid')], evals_result=history,
+              verbose_eval=False)
+    return history['valid']['rmse']
+
+
+def run_trial(stage_dir, params, rounds):
+    """
+    Train one configuration of a staged zone (runs in a worker process when tuning in parallel)
+
+    Returns:
+    --------
+    (float, int, float)
+        Best validation RMSE within the budget, the trees it takes (the best
+        truncation, which a deployed model would keep) and training seconds
+    """
+    dtrain, dvalid = zone_matrices(stage_dir, params['nthread'])
+    start = time.perf_counter()
+    curve = validation_curve(params, dtrain, dvalid, rounds)
+    best = int(np.argmin(curve))
+    return float(curve[best]), best + 1, time.perf_counter() - start
+
+
+def successive_halving(zone_name, stage_dir, bracket, n_configs, budgets, journal, path, settings, executor=None):
+    """
+    Run one successive-halving bracket for a zone
+
+    Trials already in the journal are not rerun, and a resumed bracket
+    promotes the same trials an uninterrupted one would. The remaining
+    trials of each rung run on `executor` when given, otherwise in turn.
+
+    Returns:
+    --------
+    list
+        Journal records of the bracket's last rung
+    """
+    rng = np.random.default_rng([settings['seed'], bracket])
+    configs = [sample_params(rng) for _ in range(n_configs)]
+    survivors = list(range(n_configs))
+    rate = settings['rate']
+
+    for rung, rounds in enumerate(budgets):
+        pending = []
+        for trial in survivors:
+            key = (bracket, rung, trial)
+            if key not in journal:
+                pending.append(trial)
+            elif journal[key]['params'] != configs[trial] or journal[key]['rounds'] != rounds:
+                raise ValueError(f"{path} was written by a different search (search space changed); "
+                                 f"rerun with --fresh")
+
+        trials = [(trial, {**XGB_PARAMS, **configs[trial], 'nthread': settings['n_jobs']}) for trial in pending]
+        if executor is None:
+            finished = ((trial, run_trial(stage_dir, params, rounds)) for trial, params in trials)
+        else:
+            futures = {executor.submit(run_trial, stage_dir, params, rounds): trial for trial, params in trials}
+            finished = ((futures[future], future.result()) for future in as_completed(futures))
+        for trial, (rmse, trees, seconds) in finished:
+            record = {
+                'zone': zone_name, 'bracket': bracket, 'rung': rung, 'trial': trial,
+                'params': configs[trial], 'rounds': rounds, 'rmse': rmse, 'trees': trees,
+                'latency': latency_cost(trees, configs[trial]), 'seconds': seconds,
+            }
+            append_journal(path, record)
+            journal[(bracket, rung, trial)] = record
+
+        results = []
+        for trial in survivors:
+            record = journal[(bracket, rung, trial)]
+            results.append({**record, 'objective': objective(record['rmse'], record['trees'], configs[trial],
+                                                             settings['latency_weight'], settings['max_latency'])})
+        results.sort(key=lambda record: (record['objective'], record['trial']))
+        print(f"  {zone_name} bracket {bracket} rung {rung}: {len(results)} trial(s) x {rounds} rounds, "
+              f"best RMSE {results[0]['rmse']:.3f} ({results[0]['trees']} trees)")
+
+        if rung == len(budgets) - 1:
+            return results
+        survivors = sorted(record['trial'] for record in results[:max(1, len(results) // rate)])
+
+
+def tune_zone(zone_name, airports, zone_delay, settings, output_dir=TUNING_DIR, executor=None):
+    """
+    Search one zone's hyperparameters
+
+    With an executor the zone is joined and its trials are trained in that
+    pool's worker processes, otherwise in this process.
+
+    Returns:
+    --------
+    dict
+        zone, status ('tuned' or 'skipped'), message, best (journal record
+        of the winning trial, with its objective), trials (run this time),
+        start/end (wall clock)
+    """
+    start = time.time()
+    result = {'zone': zone_name, 'status': 'skipped', 'message': None, 'best': None, 'trials': 0}
+
+    if not zone_weather_exists(zone_name):
+        result['message'] = 'weather data not found'
+    elif len(zone_delay) == 0:
+        result['message'] = 'no delay data for its airports'
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=output_dir) as stage_dir:
+            if executor is None:
+                rows = stage_zone(zone_name, airports, zone_delay, stage_dir)
+            else:
+                rows = executor.submit(stage_zone, zone_name, airports, zone_delay, stage_dir).result()
+
+            if rows is None:
+                result['message'] = 'no matching weather-delay records'
+            else:
+                path = journal_path(zone_name, output_dir)
+                journal = open_journal(path, {**settings['search'], 'rows': list(rows)})
+                resumed = len(journal)
+
+                finalists = []
+                for bracket, (n_configs, budgets) in enumerate(settings['brackets']):
+                    finalists += successive_halving(zone_name, stage_dir, bracket, n_configs, budgets,
+                                                    journal, path, settings, executor)
+                _MATRICES.pop(stage_dir, None)
+
+                best = min(finalists, key=lambda record: (record['objective'], record['bracket'], record['trial']))
+                result.update(status='tuned', best=best, trials=len(journal) - resumed)
+                with open(os.path.join(output_dir, f'{zone_name}_best.json'), 'w') as f:
+                    json.dump({**best, 'objective': None if math.isinf(best['objective']) else best['objective'],
+                               'xgb_params': {**XGB_PARAMS, **best['params']}, 'n_estimators': best['trees']},
+                              f, indent=2, allow_nan=False)
+
+    result['start'], result['end'] = start, time.time()
+    return result
+
+
+def failed_result(zone_name, error, start):
+    """tune_zone-shaped result of a zone whose search raised"""
+    return {'zone': zone_name, 'status': 'failed', 'message': f"{type(error).__name__}: {error}",
+            'best': None, 'trials': 0, 'start': start, 'end': time.time()}
+
+
+def tune_zones(zone_delays, settings, workers=1, output_dir=TUNING_DIR):
+    """
+    Tune every zone of `zone_delays` ({zone: (airports, delay slice)})
+
+    With several workers the zones are searched concurrently and every
+    trial, of any zone, runs on one shared pool of worker processes, so a
+    single zone's rungs are parallel too. A zone whose search raises is
+    reported as failed and the others carry on.
+    """
+    results = {}
+    if workers == 1:
+        for zone_name, (airports, zone_delay) in zone_delays.items():
+            start = time.time()
+            try:
+                results[zone_name] = tune_zone(zone_name, airports, zone_delay, settings, output_dir)
+            except Exception as e:
+                results[zone_name] = failed_result(zone_name, e, start)
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=enable_memory_report,
+                             initargs=(memory_report_enabled(),)) as executor, \
+            ThreadPoolExecutor(max_workers=len(zone_delays)) as zones:
+        submitted = time.time()
+        futures = {zones.submit(tune_zone, zone_name, airports, zone_delay, settings, output_dir, executor): zone_name
+                   for zone_name, (airports, zone_delay) in zone_delays.items()}
+        for future in as_completed(futures):
+            zone_name = futures[future]
+            try:
+                results[zone_name] = future.result()
+            except Exception as e:  # Search raised, a worker died or a result couldn't be sent back
+                results[zone_name] = failed_result(zone_name, e, submitted)
+    return {zone_name: results[zone_name] for zone_name in zone_delays}
+
+
+def main(zones=None, config=None, workers=1, delay_file=DELAY_FILE, output_dir=TUNING_DIR, n_trials=N_TRIALS,
+         min_rounds=MIN_ROUNDS, max_rounds=MAX_ROUNDS, rate=HALVING_RATE, hyperband=False, latency_weight=0.0,
+         max_latency=None, seed=42, fresh=False):
+    """
+    Tune the selected zones and write {zone}_best.json to output_dir
+
+    Parameters:
+    -----------
+    zones, config, delay_file
+        As in train_zones.main
+    workers : int
+        Worker processes the trials (of every zone) are spread over
+    n_trials : int
+        Configurations started in the (first) bracket
+    min_rounds, max_rounds : int
+        Boosting rounds of the first and last rung
+    rate : int
+        Rounds multiply and survivors divide by this at every rung
+    hyperband : bool
+        Also run the brackets that start fewer trials at larger budgets
+    latency_weight : float
+        RMSE charged per unit of trees x depth
+    max_latency : int or None
+        Reject configurations whose trees x depth exceeds this
+    fresh : bool
+        Discard the journals and start over (resuming a journal written
+        with other settings raises ValueError)
+
+    Returns:
+    --------
+    dict
+        zone -> tune_zone result
+    """
+    selected = select_zones(load_zone_config(config), zones)
+    plan = brackets(n_trials, min_rounds, max_rounds, rate, hyperband)
+
+    print("="*60)
+    print(f"TUNING {len(selected)} ZONE MODEL(S): {', '.join(selected)}")
+    print("="*60)
+    for bracket, (n_configs, budgets) in enumerate(plan):
+        print(f"  Bracket {bracket}: {n_configs} configuration(s), rounds {' -> '.join(map(str, budgets))}")
+
+    if fresh:
+        for zone_name in selected:
+            if os.path.exists(journal_path(zone_name, output_dir)):
+                os.remove(journal_path(zone_name, output_dir))
+
+    delay_df = load_flight_delays(delay_file, airports=[airport for airports in selected.values()
+                                                        for airport in airports])
+    partitions = partition_by_zone(delay_df, selected)
+
+    # Every trial of a zone's first rung can run at once
+    workers, n_jobs = core_budget(workers, len(selected) * max(n_configs for n_configs, _ in plan))
+    settings = {'brackets': plan, 'rate': rate, 'seed': seed, 'n_jobs': n_jobs,
+                'latency_weight': latency_weight, 'max_latency': max_latency,
+                'search': {'n_trials': n_trials, 'min_rounds': min_rounds, 'max_rounds': max_rounds, 'rate': rate,
+                           'hyperband': hyperband, 'latency_weight': latency_weight,
+                           'max_latency': max_latency, 'seed': seed}}
+    print(f"\nSearching with {workers} worker(s) x {n_jobs} XGBoost thread(s)...")
+
+    started = time.time()
+    outcomes = tune_zones({zone_name: (airports, partitions[zone_name]) for zone_name, airports in selected.items()},
+                          settings, workers, output_dir)
+
+    print("\n" + "="*60)
+    print(f"TUNING SUMMARY ({time.time() - started:.1f}s)")
+    print("="*60)
+    for zone_name, outcome in outcomes.items():
+        best = outcome['best']
+        if best is None:
+            print(f"  {zone_name:<16}{outcome['status']}: {outcome['message']}")
+            continue
+        if math.isinf(best['objective']):
+            print(f"  {zone_name:<16}⚠️  no configuration within --max-latency {max_latency}; closest:")
+        print(f"  {zone_name:<16}RMSE {best['rmse']:.3f}, {best['trees']} trees x depth {best['params']['max_depth']} "
+              f"(latency {best['latency']}), {outcome['trials']} new trial(s), "
+              f"{outcome['end'] - outcome['start']:.1f}s")
+        print(f"  {'':<16}" + ", ".join(f"{name}={value:.3g}" for name, value in best['params'].items()))
+    print(f"\n✅ Best configurations written to {output_dir}/<zone>_best.json")
+    return outcomes
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter search for the zone models")
+    parser.add_argument('zones', nargs='*',
+                        help="Zones to tune (default: every zone in the config)")
+    parser.add_argument('--config',
+                        help="JSON file mapping zone names to airport lists (default: train_zones.ZONE_AIRPORTS)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes the trials are spread over; cores are split between them "
+                             "(1 = sequential)")
+    parser.add_argument('--delay-file', default=DELAY_FILE,
+                        help="BTS on-time CSV")
+    parser.add_argument('--output-dir', default=TUNING_DIR,
+                        help="Directory for the journals and best configurations")
+    parser.add_argument('--trials', type=int, default=N_TRIALS,
+                        help="Configurations started in the first bracket")
+    parser.add_argument('--min-rounds', type=int, default=MIN_ROUNDS,
+                        help="Boosting rounds of the first rung")
+    parser.add_argument('--max-rounds', type=int, default=MAX_ROUNDS,
+                        help="Boosting rounds of the last rung")
+    parser.add_argument('--rate', type=int, default=HALVING_RATE,
+                        help="Keep 1/rate of the trials and multiply their rounds by rate at every rung")
+    parser.add_argument('--hyperband', action='store_true',
+                        help="Run Hyperband brackets instead of a single successive-halving bracket")
+    parser.add_argument('--latency-weight', type=float, default=0.0,
+                        help="RMSE charged per unit of trees x depth")
+    parser.add_argument('--max-latency', type=int,
+                        help="Reject configurations whose trees x depth exceeds this")
+    parser.add_argument('--seed', type=int, default=42,
+                        help="Seed of the sampled configurations")
+    parser.add_argument('--fresh', action='store_true',
+                        help="Discard the journals instead of resuming from them")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="Print the memory used by each stage's frame")
+    args = parser.parse_args()
+
+    if args.rate < 2 or args.min_rounds < 1 or args.max_rounds < args.min_rounds:
+        parser.error("need --rate >= 2 and 1 <= --min-rounds <= --max-rounds")
+    try:
+        select_zones(load_zone_config(args.config), args.zones or None)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    enable_memory_report(args.memory_report)
+    main(zones=args.zones or None, config=args.config, workers=args.workers, delay_file=args.delay_file,
+         output_dir=args.output_dir, n_trials=args.trials, min_rounds=args.min_rounds, max_rounds=args.max_rounds,
+         rate=args.rate, hyperband=args.hyperband, latency_weight=args.latency_weight,
+         max_latency=args.max_latency, seed=args.seed, fresh=args.fresh)
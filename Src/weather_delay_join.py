@@ -0,0 +1,143 @@
+"""
+Join flights to the weather at their scheduled departure
+Each flight is matched to the observation nearest its scheduled departure
+at the origin airport (or to a lookback-window aggregate of the observations
+before it) with a sort-based as-of join, instead of to every observation of
+the day
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from Src.dtype_policy import compact_dtypes
+except ImportError:  # Running as a script from inside Src/
+    from dtype_policy import compact_dtypes
+
+# Scheduled departure times (CRS_DEP_TIME) are local; IEM ASOS `valid`
+# timestamps are UTC
+AIRPORT_TIMEZONES = {
+    **dict.fromkeys(['ATL', 'MIA', 'JFK', 'LGA', 'EWR', 'BOS', 'BWI', 'PHL', 'IAD',
+                     'BDL', 'BUF', 'ALB', 'PVD', 'PWM'], 'America/New_York'),
+    **dict.fromkeys(['ORD', 'OKC', 'MCI', 'OMA', 'DSM', 'STL', 'TUL', 'ICT'], 'America/Chicago'),
+    **dict.fromkeys(['DEN', 'SLC', 'BIL', 'BZN', 'JAC', 'COS', 'MSO'], 'America/Denver'),
+    'BOI': 'America/Boise',
+    **dict.fromkeys(['LAX', 'SFO', 'SEA', 'PDX', 'SAN', 'OAK', 'SJC', 'SMF'], 'America/Los_Angeles'),
+}
+WEATHER_TIMEZONE = 'UTC'
+
+# Time-of-day features describe the matched observation, not an average
+POINT_IN_TIME_COLUMNS = ('hour', 'month', 'is_night')
+
+
+def departure_times(delay_df, weather_tz=WEATHER_TIMEZONE, origin_column='ORIGIN'):
+    """
+    Scheduled departure of each flight on the weather data's clock
+
+    Built from `date` + `departure_hour` (+ `departure_minute` when present)
+    in the origin's local time and converted to `weather_tz`. Origins with
+    no known timezone (or weather_tz=None) are left on the local clock.
+
+    Returns:
+    --------
+    pd.Series
+        Naive datetime64[ns] per flight, aligned to delay_df.index
+    """
+    local = pd.to_datetime(delay_df['date']) + pd.to_timedelta(delay_df['departure_hour'], unit='h')
+    if 'departure_minute' in delay_df.columns:
+        local = local + pd.to_timedelta(delay_df['departure_minute'].fillna(0), unit='m')
+    local = local.astype('datetime64[ns]')
+    if weather_tz is None:
+        return local
+
+    departures = local.copy()
+    origins = delay_df[origin_column].astype(str)
+    timezones = origins.map(AIRPORT_TIMEZONES)
+    unknown = sorted(origins[timezones.isna()].unique())
+    if unknown:
+        print(f"  No timezone for {', '.join(unknown)}; matching their local departure times as-is")
+
+    for tz, index in timezones.groupby(timezones).groups.items():
+        # Fall-back hour is taken as standard time, spring-forward gaps move forward
+        departures.loc[index] = (local.loc[index].dt
+                                 .tz_localize(tz, ambiguous=np.zeros(len(index), dtype=bool),
+                                              nonexistent='shift_forward')
+                                 .dt.tz_convert(weather_tz).dt.tz_localize(None))
+    return departures
+
+
+def _date_join_rows(delay_df, weather_df):
+    """Rows the legacy (airport, date) join would produce, without building it"""
+    flights = delay_df.groupby(['ORIGIN', 'date'], observed=True).size()
+    observations = weather_df.groupby([weather_df['airport'].astype(str), 'date'], observed=True).size()
+    flights.index.names = observations.index.names = ['airport', 'date']
+    return int((flights * observations).dropna().sum())
+
+
+def join_departure_weather(delay_df, weather_df, tolerance='90min', lookback=None, agg='mean',
+                           weather_tz=WEATHER_TIMEZONE):
+    """
+    Match each flight to the weather at its origin around scheduled departure
+
+    Parameters:
+    -----------
+    delay_df : pd.DataFrame
+        Flights with ORIGIN, date and departure_hour (optionally departure_minute)
+    weather_df : pd.DataFrame
+        Zone weather with airport and valid
+    tolerance : str or pd.Timedelta
+        Nearest mode: maximum distance between departure and observation
+    lookback : str or pd.Timedelta or None
+        If set, use the `agg` of each weather measurement over this window,
+        taken at the last observation at or before departure (which must be
+        within `lookback` of departure)
+    agg : str
+        Rolling aggregate for the lookback mode ('mean', 'max', 'min', ...)
+    weather_tz : str or None
+        Timezone of weather_df['valid'] (None = same clock as the flights)
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per matched flight in departure order: the flight columns,
+        `departure_time` and the weather columns (airport, valid and features)
+    """
+    flights = delay_df.copy()
+    flights['departure_time'] = departure_times(flights, weather_tz)
+    flights['ORIGIN'] = flights['ORIGIN'].astype(str)
+    flights = flights.dropna(subset=['departure_time']).sort_values('departure_time', kind='stable')
+
+    weather = weather_df.drop(columns=['date'], errors='ignore').copy()
+    weather['airport'] = weather['airport'].astype(str)
+    weather['valid'] = pd.to_datetime(weather['valid']).astype('datetime64[ns]')
+    weather = weather.dropna(subset=['valid']).sort_values(['airport', 'valid'], kind='stable')
+    # The as-of key column would be dropped by the join; keep the observation time
+    weather['weather_time'] = weather['valid']
+
+    if lookback is None:
+        direction, window = 'nearest', pd.Timedelta(tolerance)
+    else:
+        direction, window = 'backward', pd.Timedelta(lookback)
+        measurements = [column for column in weather.columns
+                        if pd.api.types.is_numeric_dtype(weather[column]) and column not in POINT_IN_TIME_COLUMNS]
+        rolled = (weather.set_index('valid').groupby('airport', observed=True, sort=False)[measurements]
+                  .rolling(window).agg(agg))
+        weather[measurements] = rolled.to_numpy()
+
+    combined = pd.merge_asof(flights, weather.sort_values('weather_time', kind='stable'),
+                             left_on='departure_time', right_on='weather_time',
+                             left_by='ORIGIN', right_by='airport', direction=direction, tolerance=window)
+
+    matched = combined['weather_time'].notna()
+    combined = (combined[matched].drop(columns=['valid']).rename(columns={'weather_time': 'valid'})
+                .reset_index(drop=True))
+
+    if len(delay_df) > 0 and 'date' in weather_df.columns:
+        legacy_rows = _date_join_rows(delay_df, weather_df)
+        mode = f"nearest within ±{tolerance}" if lookback is None else f"{agg} over {lookback} before departure"
+        print(f"Departure-time join ({mode}): {len(combined):,} rows, "
+              f"{len(delay_df) - len(combined):,} flights without weather")
+        print(f"Date-only join would produce {legacy_rows:,} rows "
+              f"({legacy_rows / max(len(combined), 1):.1f}x)")
+
+    return compact_dtypes(combined)
@@ -0,0 +1,169 @@
+"""
+Manifest of processed airport inputs for incremental zone processing
+Records a fingerprint (size, mtime, content hash) of every airport CSV and
+the parsed segment derived from it, so process_all_zones reparses only new
+or changed files, parses just the appended rows when a file grew, and
+rebuilds only the zones whose inputs changed
+"""
+
+import hashlib
+import json
+import os
+import time
+
+try:
+    from Src.zone_store import ZONE_DATA_DIR
+except ImportError:  # Running as a script from inside Src/
+    from zone_store import ZONE_DATA_DIR
+
+MANIFEST_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+SEGMENT_DIR = 'segments'
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def manifest_path(data_dir=ZONE_DATA_DIR):
+    return os.path.join(data_dir, MANIFEST_FILE)
+
+
+def segment_dir(zone_name, data_dir=ZONE_DATA_DIR):
+    """Directory holding the parsed per-airport segments of a zone"""
+    return os.path.join(data_dir, SEGMENT_DIR, zone_name)
+
+
+def empty_manifest():
+    return {'version': MANIFEST_VERSION, 'inputs': {}, 'zones': {}}
+
+
+def load_manifest(data_dir=ZONE_DATA_DIR):
+    """The manifest on disk, or an empty one (missing, unreadable or old format)"""
+    path = manifest_path(data_dir)
+    if not os.path.exists(path):
+        return empty_manifest()
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"  Ignoring unreadable manifest {path}: {e}")
+        return empty_manifest()
+    if manifest.get('version') != MANIFEST_VERSION:
+        return empty_manifest()
+    return manifest
+
+
+def save_manifest(manifest, data_dir=ZONE_DATA_DIR):
+    """Write the manifest atomically (a crash never leaves a partial file)"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = manifest_path(data_dir)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def hash_file(path, prefix_size=None):
+    """
+    SHA-256 of a file, plus the hash of its first `prefix_size` bytes
+
+    Both come from a single read, so detecting an append costs no more
+    than hashing the file once.
+
+    Returns:
+    --------
+    (str, str or None)
+        Full hash and prefix hash (None if prefix_size is None or larger
+        than the file)
+    """
+    digest = hashlib.sha256()
+    prefix_hash = None
+    remaining = prefix_size
+    with open(path, 'rb') as f:
+        if prefix_size is not None:
+            while remaining > 0:
+                block = f.read(min(HASH_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                remaining -= len(block)
+            if remaining == 0:
+                prefix_hash = digest.copy().hexdigest()
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest(), prefix_hash
+
+
+def _ends_with_newline(path, size):
+    if size == 0:
+        return True
+    with open(path, 'rb') as f:
+        f.seek(size - 1)
+        return f.read(1) == b'\n'
+
+
+def check_input(path, previous, segment_exists):
+    """
+    Decide how to bring one airport file's segment up to date
+
+    Parameters:
+    -----------
+    path : str
+        Airport CSV
+    previous : dict or None
+        The file's manifest entry from the last run
+    segment_exists : bool
+        Whether the parsed segment recorded in `previous` is still on disk
+
+    Returns:
+    --------
+    (str, dict or None, int)
+        action ('missing', 'unchanged', 'append' or 'full'), the file's
+        current fingerprint and the byte offset to parse from (append only)
+    """
+    if not os.path.exists(path):
+        return 'missing', None, 0
+
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime}
+    usable = previous is not None and segment_exists
+
+    # Same size and mtime: trust it without reading the file
+    if usable and previous['size'] == stat.st_size and previous['mtime'] == stat.st_mtime:
+        fingerprint['sha256'] = previous['sha256']
+        return 'unchanged', fingerprint, 0
+
+    grew = usable and stat.st_size > previous['size'] and _ends_with_newline(path, previous['size'])
+    fingerprint['sha256'], prefix_hash = hash_file(path, previous['size'] if grew else None)
+
+    if usable and fingerprint['sha256'] == previous['sha256']:
+        return 'unchanged', fingerprint, 0
+    if grew and prefix_hash == previous['sha256']:
+        # Old content intact with rows appended: parse only the new bytes
+        return 'append', fingerprint, previous['size']
+    return 'full', fingerprint, 0
+
+
+def record_input(manifest, path, fingerprint, zone_name, airport, segment, rows):
+    """Store a successfully processed input and its segment in the manifest"""
+    manifest['inputs'][path] = {
+        **fingerprint,
+        'zone': zone_name,
+        'airport': airport,
+        'segment': segment,
+        'rows': rows,
+        'processed_at': time.time(),
+    }
+
+
+def forget_input(manifest, path):
+    manifest['inputs'].pop(path, None)
+
+
+def record_zone(manifest, zone_name, airports, output, rows):
+    """Store the airports a zone output was built from"""
+    manifest['zones'][zone_name] = {
+        'airports': list(airports),
+        'output': output,
+        'rows': rows,
+        'built_at': time.time(),
+    }
@@ -0,0 +1,337 @@
+"""
+Process-wide registry of zone model bundles
+Loads each zone's (model, scaler, features) once, keeps bundles in a bounded
+LRU cache and reloads them when the artifacts on disk are replaced
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+# Get the project root directory (parent of Src/)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(PROJECT_ROOT, 'models', 'zones')
+
+
+def zone_artifact_paths(zone_name, model_dir=MODEL_DIR):
+    """Paths of the artifacts that make up a zone model"""
+    return {
+        'model': os.path.join(model_dir, f'{zone_name}_model.pkl'),
+        'raw_model': os.path.join(model_dir, f'{zone_name}_raw_model.pkl'),
+        'scaler': os.path.join(model_dir, f'{zone_name}_scaler.pkl'),
+        'features': os.path.join(model_dir, f'{zone_name}_features.txt'),
+        'compiled': os.path.join(model_dir, f'{zone_name}_compiled.npz'),
+        'impute': os.path.join(model_dir, f'{zone_name}_impute.json'),
+    }
+
+
+BACKENDS = ('xgboost', 'compiled')
+
+
+def artifact_version(paths):
+    """Short content hash of a zone's artifacts; changes whenever a model is retrained"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class ZoneModelBundle:
+    """Everything needed to score one zone, as loaded from disk"""
+
+    def __init__(self, zone_name, model, scaler, features, signature, backend='xgboost', impute_values=None,
+                 version=None):
+        self.zone_name = zone_name
+        self.backend = backend
+        self.model = model
+        self.scaler = scaler
+        self.features = features
+        self.signature = signature
+        self.version = version
+        self.checked_at = time.monotonic()
+        self._column_index = {}
+        self._local = threading.local()
+
+        # Per-feature fill values for missing observations (NaN = let the
+        # trees' default direction handle it)
+        if impute_values is None:
+            impute_values = np.full(len(features), np.nan)
+        self.impute_values = np.asarray(impute_values, dtype=np.float64)
+
+
+    def __iter__(self):
+        # Allows `model, scaler, features = bundle`
+        return iter((self.model, self.scaler, self.features))
+
+    def row_buffer(self):
+        """Preallocated 1 x F input row, one per thread"""
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.empty((1, len(self.features)), dtype=np.float32)
+        return row
+
+    def predict(self, X):
+        """
+        Raw model output for an N x F matrix of raw features in `features` order
+
+        Features are rounded to float32, the precision the models are
+        trained on, and only then standardized (in float64, the arithmetic
+        of StandardScaler.transform). A scaled model and its folded
+        scaler-free export (see model_export.raw_threshold) therefore send
+        every row down the same branches.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if self.scaler is not None:
+            X = X.astype(np.float64)
+            if getattr(self.scaler, 'with_mean', True) and self.scaler.mean_ is not None:
+                X -= self.scaler.mean_
+            if getattr(self.scaler, 'with_std', True) and self.scaler.scale_ is not None:
+                X /= self.scaler.scale_
+        return self.model.predict(X)
+
+    def column_index(self, columns):
+        """Positions of this zone's features within `columns` (memoized per column layout)"""
+        key = tuple(columns)
+        index = self._column_index.get(key)
+        if index is None:
+            position = {name: i for i, name in enumerate(key)}
+            index = np.array([position[name] for name in self.features], dtype=np.intp)
+            self._column_index[key] = index
+        return index
+
+
+class ZoneModelRegistry:
+    """
+    Thread-safe LRU cache of zone model bundles
+
+    Parameters:
+    -----------
+    model_dir : str
+        Directory holding the zone artifacts
+    max_size : int
+        Maximum number of zone bundles kept in memory
+    check_interval : float
+        Seconds between mtime checks of a cached bundle's artifacts. A check
+        is a handful of os.stat calls, so this only needs to be non-zero under
+        very high request rates
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, max_size=16, check_interval=1.0):
+        self.model_dir = model_dir
+        self.max_size = max_size
+        self.check_interval = check_interval
+
+        self._bundles = OrderedDict()
+        self._lock = threading.Lock()
+        self._zone_locks = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._reloads = 0
+        self._evictions = 0
+        self._load_time = 0.0
+
+    def _signature(self, zone_name, backend='xgboost'):
+        """
+        (name, path, mtime, size) of every artifact the zone is served from;
+        changes when any of those files is replaced
+
+        A scaler-free {zone}_raw_model.pkl is preferred over model + scaler,
+        unless the scaled model has been retrained since it was exported.
+        The compiled backend serves {zone}_compiled.npz, which must be at
+        least as new as the XGBoost model it was compiled from.
+        """
+        paths = zone_artifact_paths(zone_name, self.model_dir)
+        stats = {}
+        for name, path in paths.items():
+            try:
+                stats[name] = os.stat(path)
+            except FileNotFoundError:
+                pass
+
+        raw = stats.get('raw_model')
+        scaled = stats.get('model')
+        if backend == 'compiled':
+            compiled = stats.get('compiled')
+            newest = max((st.st_mtime_ns for st in (raw, scaled) if st is not None), default=0)
+            if compiled is None or compiled.st_mtime_ns < newest:
+                raise FileNotFoundError(
+                    f"Compiled model for {zone_name} is missing or out of date; run Src/compiled_ensemble.py"
+                )
+            names = ('compiled',)
+        elif raw is not None and (scaled is None or raw.st_mtime_ns >= scaled.st_mtime_ns):
+            names = ('raw_model', 'features')
+        else:
+            names = ('model', 'scaler', 'features')
+
+        if not all(name in stats for name in names):
+            raise FileNotFoundError(f"Model files not found for {zone_name}")
+
+        # Optional training-time imputation statistics
+        if 'impute' in stats:
+            names += ('impute',)
+
+        return tuple((name, paths[name], stats[name].st_mtime_ns, stats[name].st_size) for name in names)
+
+    def _load(self, zone_name, signature, backend='xgboost'):
+        """Deserialize a zone's artifacts"""
+        paths = {name: path for name, path, _, _ in signature}
+
+        if backend == 'compiled':
+            # NumPy-only path: no xgboost/sklearn import
+            try:
+                from Src.compiled_ensemble import load_compiled
+            except ImportError:  # Running as a script from inside Src/
+                from compiled_ensemble import load_compiled
+            model = load_compiled(paths['compiled'])
+            scaler = None
+            features = model.features
+            fallback = model.mean
+        else:
+            if 'raw_model' in paths:
+                model = joblib.load(paths['raw_model'])
+                scaler = None
+            else:
+                model = joblib.load(paths['model'])
+                scaler = joblib.load(paths['scaler'])
+
+            with open(paths['features'], 'r') as f:
+                features = [line.strip() for line in f.readlines() if line.strip()]
+
+            fallback = getattr(scaler, 'mean_', None)
+
+        return ZoneModelBundle(zone_name, model, scaler, features, signature, backend,
+                               self._impute_values(paths.get('impute'), features, fallback),
+                               artifact_version(paths[name] for name, _, _, _ in signature))
+
+    @staticmethod
+    def _impute_values(path, features, fallback=None):
+        """
+        Fill values aligned to `features`: the medians saved at training time,
+        else the scaler means (close to the training distribution's center),
+        else NaN
+        """
+        values = np.full(len(features), np.nan)
+        if fallback is not None:
+            values[:] = fallback
+        if path is not None:
+            with open(path, 'r') as f:
+                saved = json.load(f)
+            for i, name in enumerate(features):
+                if saved.get(name) is not None:
+                    values[i] = saved[name]
+        return values
+
+    def _zone_lock(self, key):
+        with self._lock:
+            lock = self._zone_locks.get(key)
+            if lock is None:
+                lock = self._zone_locks[key] = threading.Lock()
+            return lock
+
+    def _touch(self, key, bundle, now):
+        """Record a cache hit; caller holds self._lock"""
+        bundle.checked_at = now
+        if self._bundles.get(key) is bundle:
+            self._bundles.move_to_end(key)
+        self._hits += 1
+
+    def get(self, zone_name, backend='xgboost'):
+        """
+        Return the bundle for a zone, loading or reloading it if needed
+
+        backend='compiled' serves the NumPy evaluator from {zone}_compiled.npz.
+        Raises FileNotFoundError if the zone has no usable artifacts on disk.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend} (expected one of {BACKENDS})")
+
+        key = (zone_name, backend)
+        now = time.monotonic()
+
+        with self._lock:
+            bundle = self._bundles.get(key)
+            if bundle is not None and now - bundle.checked_at < self.check_interval:
+                self._touch(key, bundle, now)
+                return bundle
+
+        # Cheap freshness check outside the lock
+        if bundle is not None and self._signature(zone_name, backend) == bundle.signature:
+            with self._lock:
+                self._touch(key, bundle, now)
+            return bundle
+
+        # Load (or reload) while holding only this zone's lock, so a slow
+        # deserialization doesn't block requests for other zones
+        with self._zone_lock(key):
+            signature = self._signature(zone_name, backend)
+
+            with self._lock:
+                current = self._bundles.get(key)
+                if current is not None and current.signature == signature:
+                    # Another thread loaded it while we were waiting
+                    self._touch(key, current, now)
+                    return current
+
+            start = time.perf_counter()
+            bundle = self._load(zone_name, signature, backend)
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                if current is not None:
+                    self._reloads += 1
+                else:
+                    self._misses += 1
+                self._load_time += elapsed
+
+                self._bundles[key] = bundle
+                self._bundles.move_to_end(key)
+                while len(self._bundles) > self.max_size:
+                    self._bundles.popitem(last=False)
+                    self._evictions += 1
+
+        return bundle
+
+    def invalidate(self, zone_name=None):
+        """Drop one zone (or every zone) from the cache, for every backend"""
+        with self._lock:
+            for key in list(self._bundles):
+                if zone_name is None or key[0] == zone_name:
+                    del self._bundles[key]
+
+    def stats(self):
+        """Hit/miss counters and cumulative load time"""
+        with self._lock:
+            lookups = self._hits + self._misses + self._reloads
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'reloads': self._reloads,
+                'evictions': self._evictions,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'load_time_s': self._load_time,
+                'cached_zones': [f"{zone}:{backend}" for zone, backend in self._bundles],
+                'max_size': self.max_size,
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry shared by every caller"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ZoneModelRegistry()
+    return _registry
@@ -0,0 +1,239 @@
+"""
+Typed columnar store for processed zone weather
+process_all_zones.py writes each zone to Parquet with explicit dtypes
+(float32 measurements, categorical identifiers, datetime64 timestamps), so
+training scripts load only the columns and rows they need instead of
+re-parsing a CSV. Falls back to the legacy CSV files when pyarrow is not
+installed or a zone has not been reprocessed yet
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pq = None
+    PYARROW_AVAILABLE = False
+
+try:
+    from Src.dtype_policy import compact_dtypes
+except ImportError:  # Running as a script from inside Src/
+    from dtype_policy import compact_dtypes
+
+ZONE_DATA_DIR = 'Data/processed_zones'
+
+# Weather columns the training scripts merge and learn from
+WEATHER_FEATURE_COLUMNS = [
+    'temperature_c', 'dewpoint_c', 'wind_direction', 'wind_speed_kts',
+    'visibility_km', 'ceiling_ft', 'sea_level_pressure_mb',
+    'gust', 'relh', 'temp_spread', 'gust_factor', 'ceiling_vis_ratio',
+    'pressure_change', 'humidity', 'hour', 'month', 'is_night'
+]
+TRAINING_COLUMNS = ['airport', 'valid', 'date'] + WEATHER_FEATURE_COLUMNS
+
+# Rows are sorted by (airport, valid), so row-group statistics let the
+# airport/date filters skip most of a file
+ROW_GROUP_SIZE = 64 * 1024
+
+
+def zone_store_paths(zone_name, data_dir=ZONE_DATA_DIR):
+    """Parquet and legacy CSV paths of a zone's processed weather"""
+    return {
+        'parquet': os.path.join(data_dir, f'{zone_name}_weather.parquet'),
+        'csv': os.path.join(data_dir, f'{zone_name}_weather.csv'),
+    }
+
+
+def _store_path(zone_name, data_dir):
+    """The file to read for a zone: the newest of Parquet (if readable) and CSV, or None"""
+    paths = zone_store_paths(zone_name, data_dir)
+    parquet = paths['parquet'] if PYARROW_AVAILABLE and os.path.exists(paths['parquet']) else None
+    csv = paths['csv'] if os.path.exists(paths['csv']) else None
+    if parquet and csv:
+        return parquet if os.path.getmtime(parquet) >= os.path.getmtime(csv) else csv
+    return parquet or csv
+
+
+def zone_weather_exists(zone_name, data_dir=ZONE_DATA_DIR):
+    """True if processed weather for the zone is on disk in a readable format"""
+    return _store_path(zone_name, data_dir) is not None
+
+
+def apply_zone_dtypes(df):
+    """
+    Cast processed zone weather to the store's dtypes
+
+    The pipeline dtype policy (see dtype_policy.compact_dtypes) plus
+    valid -> datetime64. The `date` column is dropped: it is derived from
+    `valid` on load.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Output of process_all_zones (or a frame read back from CSV)
+
+    Returns:
+    --------
+    pd.DataFrame
+        A typed copy
+    """
+    df = df.drop(columns=['date'], errors='ignore').copy()
+
+    if 'valid' in df.columns:
+        df['valid'] = pd.to_datetime(df['valid'])
+
+    return compact_dtypes(df)
+
+
+def cast_to_schema(df, reference):
+    """
+    Cast the columns df shares with `reference` to their dtypes there
+
+    For rows parsed on their own (e.g. a tail appended to a stored segment),
+    whose dtypes pandas inferred from just those rows. Values that don't
+    parse in a numeric column (IEM's 'M') become NaN; integer columns with
+    gaps stay float and are settled by apply_zone_dtypes after the concat.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Frame to cast
+    reference : pd.DataFrame
+        Frame whose dtypes to match (e.g. the stored segment)
+
+    Returns:
+    --------
+    pd.DataFrame
+        A cast copy
+    """
+    df = df.copy()
+    for column, dtype in reference.dtypes.items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        if pd.api.types.is_bool_dtype(dtype):
+            continue
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+        elif pd.api.types.is_numeric_dtype(dtype):
+            values = pd.to_numeric(df[column], errors='coerce')
+            if pd.api.types.is_float_dtype(dtype) or not values.isna().any():
+                values = values.astype(dtype)
+            df[column] = values
+    return df
+
+
+def save_zone_weather(df, zone_name, data_dir=ZONE_DATA_DIR):
+    """
+    Write a zone's processed weather to the store
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Processed zone weather with `airport` and `valid` columns
+    zone_name : str
+        Zone name, used for the file name
+
+    Returns:
+    --------
+    str
+        Path written (Parquet, or CSV when pyarrow is not installed)
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    paths = zone_store_paths(zone_name, data_dir)
+
+    if not PYARROW_AVAILABLE:
+        print("  pyarrow not installed - saving CSV instead of Parquet")
+        df.to_csv(paths['csv'], index=False)
+        return paths['csv']
+
+    typed = apply_zone_dtypes(df)
+    sort_keys = [column for column in ('airport', 'valid') if column in typed.columns]
+    if sort_keys:
+        typed = typed.sort_values(sort_keys, kind='stable', ignore_index=True)
+
+    typed.to_parquet(paths['parquet'], engine='pyarrow', index=False, compression='zstd',
+                     row_group_size=ROW_GROUP_SIZE)
+    return paths['parquet']
+
+
+def _parquet_filters(airports, start, end):
+    filters = []
+    if airports is not None:
+        filters.append(('airport', 'in', list(airports)))
+    if start is not None:
+        filters.append(('valid', '>=', pd.Timestamp(start)))
+    if end is not None:
+        filters.append(('valid', '<', pd.Timestamp(end)))
+    return filters or None
+
+
+def load_zone_weather(zone_name, columns=None, airports=None, start=None, end=None, data_dir=ZONE_DATA_DIR):
+    """
+    Load a zone's processed weather from the store
+
+    Reads the Parquet file when available, pushing the column projection and
+    the airport/time filters down to the reader; otherwise reads the legacy
+    CSV and applies the same dtypes and filters in pandas.
+
+    Parameters:
+    -----------
+    zone_name : str
+        Zone name
+    columns : list or None
+        Columns to load (None = all). Columns the file doesn't have are
+        skipped. `date` is derived from `valid`
+    airports : list or None
+        Only rows for these airports
+    start, end : date-like or None
+        Only rows with start <= valid < end
+
+    Returns:
+    --------
+    pd.DataFrame
+        Typed zone weather with a datetime64 `date` column (when requested)
+    """
+    path = _store_path(zone_name, data_dir)
+    if path is None:
+        raise FileNotFoundError(f"No processed weather for {zone_name} in {data_dir}. "
+                                f"Run process_all_zones.py first.")
+
+    is_parquet = path.endswith('.parquet')
+    if is_parquet:
+        available = pq.read_schema(path).names
+    else:
+        available = pd.read_csv(path, nrows=0).columns.tolist()
+
+    want_date = columns is None or 'date' in columns
+    if columns is None:
+        read_columns = [column for column in available if column != 'date']
+    else:
+        requested = [column for column in columns if column != 'date'] + (['valid'] if want_date else [])
+        read_columns = [column for column in dict.fromkeys(requested) if column in available]
+
+    if is_parquet:
+        df = pd.read_parquet(path, engine='pyarrow', columns=read_columns,
+                             filters=_parquet_filters(airports, start, end))
+    else:
+        filter_columns = [column for column, wanted in (('airport', airports is not None),
+                                                        ('valid', start is not None or end is not None))
+                          if wanted and column not in read_columns]
+        df = pd.read_csv(path, usecols=read_columns + filter_columns, low_memory=False)
+        df = apply_zone_dtypes(df)
+
+        mask = np.ones(len(df), dtype=bool)
+        if airports is not None:
+            mask &= df['airport'].isin(list(airports)).to_numpy()
+        if start is not None:
+            mask &= (df['valid'] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (df['valid'] < pd.Timestamp(end)).to_numpy()
+        df = df.loc[mask, read_columns].reset_index(drop=True)
+
+    if want_date and 'valid' in df.columns:
+        df['date'] = df['valid'].dt.normalize()
+
+    return df
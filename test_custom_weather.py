@@ -2,7 +2,7 @@
 Custom Weather Testing Script
 Modify the weather conditions below and run this script to test
 """
-from Src.predict_zone_risk import predict_zone_risk, interpret_risk_score, ZONES
+from Src.predict_zone_risk import predict_zones_batch, ZONES
 
 # MODIFY THESE WEATHER CONDITIONS TO TEST YOUR OWN SCENARIOS
 custom_weather = {
@@ -45,23 +45,26 @@ def test_custom_weather():
     print("RISK PREDICTIONS FOR ALL ZONES")
     print("="*70)
     
+    batch = predict_zones_batch([custom_weather], list(ZONES.keys()))
+    
     results = {}
-    for zone_name in ZONES.keys():
-        try:
-            risk_score = predict_zone_risk(zone_name, custom_weather)
-            category = interpret_risk_score(risk_score[0])
-            results[zone_name] = risk_score[0]
-            
-            # Risk level emoji
-            emoji = "🟢" if risk_score[0] < 20 else "🟡" if risk_score[0] < 60 else "🟠" if risk_score[0] < 80 else "🔴"
-            
-            print(f"\n{zone_name} {emoji}")
-            print(f"  Risk Score: {risk_score[0]:.1f}/100")
-            print(f"  Category: {category}")
-        except Exception as e:
+    for j, zone_name in enumerate(batch['zones']):
+        if zone_name in batch['errors']:
             print(f"\n{zone_name} ❌")
-            print(f"  Error: {e}")
+            print(f"  Error: {batch['errors'][zone_name]}")
             results[zone_name] = None
+            continue
+        
+        score = batch['scores'][0, j]
+        category = batch['categories'][0, j]
+        results[zone_name] = score
+        
+        # Risk level emoji
+        emoji = "🟢" if score < 20 else "🟡" if score < 60 else "🟠" if score < 80 else "🔴"
+        
+        print(f"\n{zone_name} {emoji}")
+        print(f"  Risk Score: {score:.1f}/100")
+        print(f"  Category: {category}")
     
     # Summary
     print("\n" + "="*70)
@@ -0,0 +1,71 @@
+"""
+Shared fixtures: small synthetic zone models written to a temporary model
+directory, so the tests never depend on the trained artifacts in models/
+"""
+
+import os
+import sys
+
+import joblib
+import numpy as np
+import pytest
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler
+
+# Import the modules as Src.<module>, as the scripts at the project root do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Src import zone_model_registry
+from Src.predict_zone_risk import FEATURE_COLUMNS
+
+
+def synthetic_weather(n_rows, seed=0):
+    """Plausible raw weather rows in FEATURE_COLUMNS order"""
+    rng = np.random.default_rng(seed)
+    center = np.array([15, 8, 180, 10, 12, 3000, 1013, 15, 65, 6, 1.2, 250, 0, 65, 12, 6, 0, 12], dtype=float)
+    spread = np.array([10, 8, 100, 6, 5, 2000, 8, 8, 20, 4, 0.3, 200, 2, 20, 7, 3, 0.5, 7], dtype=float)
+    return np.round(rng.normal(center, spread, size=(n_rows, len(FEATURE_COLUMNS))), 1)
+
+
+def fit_zone_model(X, seed=0):
+    """XGBRegressor trained behind a StandardScaler, as the zone trainers do"""
+    rng = np.random.default_rng(seed)
+    y = np.clip(30 + X[:, 3] - 0.002 * X[:, 5] + 0.5 * X[:, 0] + rng.normal(0, 2, len(X)), 0, 100)
+    scaler = StandardScaler().fit(X)
+    model = xgb.XGBRegressor(n_estimators=20, max_depth=4, learning_rate=0.3, random_state=seed)
+    model.fit(scaler.transform(X), y)
+    return model, scaler
+
+
+def write_zone_model(model_dir, zone_name, model, scaler, features=FEATURE_COLUMNS):
+    """Save a zone's model, scaler and features the way the trainers do"""
+    paths = zone_model_registry.zone_artifact_paths(zone_name, model_dir)
+    joblib.dump(model, paths['model'])
+    joblib.dump(scaler, paths['scaler'])
+    with open(paths['features'], 'w') as f:
+        f.write('\n'.join(features) + '\n')
+    return paths
+
+
+@pytest.fixture(scope='session')
+def zone_model():
+    """(model, scaler, X) of a synthetic zone"""
+    X = synthetic_weather(2000)
+    model, scaler = fit_zone_model(X)
+    return model, scaler, X
+
+
+@pytest.fixture
+def model_dir(tmp_path, zone_model):
+    """Model directory holding the synthetic 'Testzone' model"""
+    model, scaler, _ = zone_model
+    write_zone_model(str(tmp_path), 'Testzone', model, scaler)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def registry(model_dir, monkeypatch):
+    """Process-wide registry pointed at model_dir for the duration of a test"""
+    registry = zone_model_registry.ZoneModelRegistry(model_dir, check_interval=0)
+    monkeypatch.setattr(zone_model_registry, '_registry', registry)
+    return registry
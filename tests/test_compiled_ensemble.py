@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from Src.compiled_ensemble import compile_model, export_compiled_model, load_compiled
+from Src.model_export import fold_scaler_into_model
+from Src.predict_zone_risk import FEATURE_COLUMNS, predict_observation
+from conftest import synthetic_weather
+
+# The evaluator sums leaves in float64, XGBoost in float32
+TOLERANCE = 1e-4
+
+
+@pytest.fixture(scope='module')
+def rows():
+    X = synthetic_weather(3000, seed=7)
+    X[np.random.default_rng(7).random(X.shape) < 0.05] = np.nan
+    return X
+
+
+def test_compiled_scaled_model_matches_xgboost(zone_model, rows):
+    model, scaler, _ = zone_model
+    compiled = compile_model(model, FEATURE_COLUMNS, scaler)
+
+    expected = model.predict((rows - scaler.mean_) / scaler.scale_)
+    np.testing.assert_allclose(compiled.predict(rows), expected, rtol=0, atol=TOLERANCE)
+
+
+def test_compiled_raw_model_matches_xgboost(zone_model, rows):
+    model, scaler, _ = zone_model
+    folded = fold_scaler_into_model(model, scaler)
+    compiled = compile_model(folded, FEATURE_COLUMNS)
+
+    np.testing.assert_allclose(compiled.predict(rows), folded.predict(rows), rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(compiled.predict(rows[0]), folded.predict(rows[:1]), rtol=0, atol=TOLERANCE)
+
+
+def test_compiled_model_keeps_only_the_best_iteration(zone_model, rows):
+    _, scaler, X = zone_model
+    y = X[:, 3] + np.random.default_rng(1).normal(0, 5, len(X))
+    model = xgb.XGBRegressor(n_estimators=200, max_depth=3, early_stopping_rounds=5, random_state=0)
+    model.fit(X[:1500], y[:1500], eval_set=[(X[1500:], y[1500:])], verbose=False)
+    assert model.best_iteration < 199
+
+    compiled = compile_model(model, FEATURE_COLUMNS)
+    assert compiled.n_trees == model.best_iteration + 1
+    np.testing.assert_allclose(compiled.predict(rows), model.predict(rows), rtol=0, atol=TOLERANCE)
+
+
+def test_compiled_backend_serves_the_saved_ensemble(registry, model_dir, zone_model, rows):
+    compiled, model, scaler = export_compiled_model('Testzone', model_dir)
+    loaded = load_compiled(f'{model_dir}/Testzone_compiled.npz')
+    np.testing.assert_array_equal(loaded.predict(rows), compiled.predict(rows))
+
+    observation = {name: float(value) for name, value in zip(FEATURE_COLUMNS, rows[3])}
+    np.testing.assert_allclose(predict_observation('Testzone', observation, backend='compiled'),
+                               predict_observation('Testzone', observation), rtol=0, atol=TOLERANCE)
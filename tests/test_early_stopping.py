@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Src.early_stopping import flight_holdout_starts, holdout_masks, window_masks
+from Src.out_of_core_training import stage_zone_batches
+from Src.weather_delay_join import join_departure_weather
+from Src.zone_store import WEATHER_FEATURE_COLUMNS, save_zone_weather
+
+AIRPORTS = ['ATL', 'DEN']
+
+
+@pytest.fixture
+def zone(tmp_path):
+    """Hourly weather for two airports (with a week-long gap) and the delays of their flights"""
+    rng = np.random.default_rng(11)
+    valid = pd.date_range('2024-01-01 00:53', '2024-03-01', freq='h')
+    valid = valid[(valid < '2024-02-10') | (valid >= '2024-02-17')]
+    weather = pd.concat([pd.DataFrame({'airport': airport, 'valid': valid}) for airport in AIRPORTS],
+                        ignore_index=True)
+    for name in WEATHER_FEATURE_COLUMNS:
+        weather[name] = rng.normal(10, 3, len(weather)).astype(np.float32)
+    weather['hour'] = weather['valid'].dt.hour
+    weather['month'] = weather['valid'].dt.month
+    weather['is_night'] = (weather['hour'] < 6).astype(int)
+    data_dir = str(tmp_path / 'zones')
+    save_zone_weather(weather, 'Testzone', data_dir)
+
+    n_flights = 3000
+    delays = pd.DataFrame({
+        'ORIGIN': pd.Categorical(rng.choice(AIRPORTS, n_flights)),
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 60, n_flights), unit='D'),
+        'departure_hour': rng.integers(0, 24, n_flights).astype(np.uint8),
+        'departure_minute': rng.integers(0, 60, n_flights).astype(np.uint8),
+        # Unique per flight, so subsets can be compared by target
+        'delay_score': np.arange(n_flights, dtype=np.float32),
+    })
+    return weather, delays, data_dir
+
+
+def test_windows_split_at_the_requested_shares():
+    times = pd.Series(pd.date_range('2024-01-01', periods=1000, freq='h'))
+    valid, test = holdout_masks(times, valid_fraction=0.2, test_fraction=0.1)
+
+    assert not (valid & test).any()
+    assert abs(valid.sum() - 200) <= 1 and abs(test.sum() - 100) <= 1
+    assert times[valid].max() < times[test].min() and times[~valid & ~test].max() < times[valid].min()
+
+
+def test_in_memory_and_out_of_core_modes_hold_out_the_same_flights(zone, tmp_path):
+    weather, delays, data_dir = zone
+    holdout = flight_holdout_starts(delays)
+
+    combined = join_departure_weather(delays, weather)
+    valid, test = window_masks(combined['departure_time'], holdout)
+    y = combined['delay_score'].to_numpy()
+    in_memory = {'train': y[~valid & ~test], 'valid': y[valid], 'test': y[test]}
+
+    staged = stage_zone_batches('Testzone', AIRPORTS, delays, str(tmp_path), batch_rows=700, holdout=holdout,
+                                data_dir=data_dir)
+    for subset, expected in in_memory.items():
+        out_of_core = np.concatenate([np.load(y_path) for _, y_path in staged[subset]])
+        assert len(expected) > 0
+        np.testing.assert_array_equal(np.sort(out_of_core), np.sort(expected))
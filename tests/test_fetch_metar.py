@@ -0,0 +1,22 @@
+import pytest
+
+from Src.fetch_metar import parse_metar_text
+from Src.sky_conditions import UNLIMITED_CEILING_FT
+
+
+@pytest.mark.parametrize('sky', ['CLR', 'SKC', 'NSC', 'NCD', 'FEW250', 'SCT040 FEW100'])
+def test_skies_without_a_ceiling_layer_get_the_unlimited_ceiling(sky):
+    data = parse_metar_text(f'KATL 171752Z 27008KT 10SM {sky} 22/12 A3012')
+
+    assert data['ceiling_ft'] == UNLIMITED_CEILING_FT
+    assert data['ceiling_vis_ratio'] > 0
+
+
+def test_ceiling_is_the_lowest_broken_or_overcast_layer():
+    data = parse_metar_text('KATL 171752Z 27008KT 10SM FEW008 BKN025 OVC040 22/12 A3012')
+
+    assert data['ceiling_ft'] == 2500
+
+
+def test_reports_without_a_sky_group_leave_the_ceiling_out():
+    assert 'ceiling_ft' not in parse_metar_text('KATL 171752Z 27008KT 10SM 22/12 A3012')
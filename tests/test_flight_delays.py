@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Src.flight_delays import departure_hour_minute, load_flight_delays, partition_by_zone
+
+ONTIME_CSV = """FL_DATE,ORIGIN,CRS_DEP_TIME,DEP_DELAY,WEATHER_DELAY
+1/5/2024 12:00:00 AM,ATL,1435,30,20
+1/5/2024 12:00:00 AM,BOS,0005,-10,
+1/6/2024 12:00:00 AM,ATL,2400,45,
+,ATL,930,12,
+1/7/2024 12:00:00 AM,DEN,,0,0
+"""
+
+
+@pytest.fixture
+def ontime_csv(tmp_path):
+    path = tmp_path / 'ontime.csv'
+    path.write_text(ONTIME_CSV)
+    return str(path)
+
+
+def test_departure_hour_minute():
+    hour, minute = departure_hour_minute(pd.Series([1435, 5, 2400, 2359.0, np.nan, -1, 'n/a', 1299]))
+
+    assert hour.dtype == np.uint8 and minute.dtype == np.uint8
+    assert hour.tolist() == [14, 0, 0, 23, 12, 12, 12, 12]
+    assert minute.tolist() == [35, 5, 0, 59, 0, 0, 0, 59]
+
+
+def test_load_flight_delays_parses_every_column(ontime_csv):
+    df = load_flight_delays(ontime_csv, target='total')
+
+    assert df['ORIGIN'].tolist() == ['ATL', 'BOS', 'ATL', 'ATL', 'DEN']
+    assert df['date'].tolist()[:3] == [pd.Timestamp('2024-01-05')] * 2 + [pd.Timestamp('2024-01-06')]
+    assert pd.isna(df['date'].iloc[3])
+    assert df['departure_hour'].tolist() == [14, 0, 0, 9, 12]
+    assert df['departure_minute'].tolist() == [35, 5, 0, 30, 0]
+    assert df['has_delay'].tolist() == [1, 0, 1, 0, 0]
+
+
+def test_load_flight_delays_filters_airports_and_weather_target(ontime_csv):
+    df = load_flight_delays(ontime_csv, airports=['ATL'], chunksize=2)
+
+    assert df['ORIGIN'].tolist() == ['ATL', 'ATL', 'ATL']
+    np.testing.assert_allclose(df['delay_score'], [20 / 6, 45 / 8, 0], rtol=1e-6)
+
+
+def test_chunks_without_dates_keep_the_date_dtype(ontime_csv):
+    chunked = load_flight_delays(ontime_csv, target='total', chunksize=1)
+    whole = load_flight_delays(ontime_csv, target='total')
+
+    pd.testing.assert_frame_equal(chunked, whole)
+
+
+def test_partition_by_zone_keeps_file_order_within_each_zone(ontime_csv):
+    df = load_flight_delays(ontime_csv, target='total')
+    partitions = partition_by_zone(df, {'South': ['ATL'], 'North': ['BOS', 'JFK'], 'Empty': ['SEA']})
+
+    assert list(partitions) == ['South', 'North', 'Empty']
+    pd.testing.assert_frame_equal(partitions['South'].reset_index(drop=True),
+                                  df[df['ORIGIN'] == 'ATL'].reset_index(drop=True))
+    assert partitions['North']['ORIGIN'].tolist() == ['BOS']
+    assert len(partitions['Empty']) == 0 and list(partitions['Empty'].columns) == list(df.columns)
+
+
+def test_partition_by_zone_rejects_shared_airports(ontime_csv):
+    df = load_flight_delays(ontime_csv, target='total')
+    with pytest.raises(ValueError, match='ATL'):
+        partition_by_zone(df, {'South': ['ATL'], 'East': ['ATL', 'BOS']})
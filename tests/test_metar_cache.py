@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+
+from Src.fetch_metar import MetarFetchError
+from Src.metar_cache import MetarCache
+
+OBSERVED = 1_700_000_000
+
+
+class Clock:
+    def __init__(self, now=OBSERVED + 600):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Upstream:
+    """fetch_reports stand-in recording every call"""
+
+    def __init__(self, reports=None, fail=()):
+        self.reports = reports or {}
+        self.fail = set(fail)
+        self.calls = []
+
+    def __call__(self, stations):
+        self.calls.append(list(stations))
+        reports = {station: self.reports[station] for station in stations
+                   if station in self.reports and station not in self.fail}
+        failed = [station for station in stations if station in self.fail]
+        if failed:
+            raise MetarFetchError(f"{len(failed)} station(s) failed", failed=failed, reports=reports)
+        return reports
+
+
+def report(station, observed=OBSERVED):
+    observation_time = datetime.fromtimestamp(observed, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return {'station': station, 'raw_text': f'{station} 27010KT 10SM CLR 20/10 A3000',
+            'observation_time': observation_time}
+
+
+def cache_with(upstream, clock, **options):
+    return MetarCache(fetch_reports=upstream, clock=clock, retry_interval=120, **options)
+
+
+def test_fresh_reports_are_served_from_the_cache():
+    upstream, clock = Upstream({'KATL': report('KATL')}), Clock()
+    cache = cache_with(upstream, clock)
+
+    assert cache.get_report('katl') is not None
+    assert cache.get_report('KATL') is not None
+    assert len(upstream.calls) == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_failing_station_is_fetched_once_per_retry_interval():
+    upstream, clock = Upstream(fail={'KATL'}), Clock()
+    cache = cache_with(upstream, clock)
+
+    for _ in range(5):
+        assert cache.get_report('KATL') is None
+        clock.now += 10
+    assert upstream.calls == [['KATL']]
+    assert cache.stats()['upstream_errors'] == 1
+    assert 'KATL' not in cache._absent
+
+    clock.now += 120
+    upstream.fail.clear()
+    upstream.reports['KATL'] = report('KATL', observed=clock.now - 300)
+    assert cache.get_report('KATL') is not None
+    assert len(upstream.calls) == 2 and not cache._failed_at
+
+
+def test_partial_outage_only_backs_off_the_failed_stations():
+    upstream, clock = Upstream({'KBOS': report('KBOS')}, fail={'KATL'}), Clock()
+    cache = cache_with(upstream, clock)
+
+    assert cache.get_reports(['KATL', 'KBOS', 'KXYZ']) == {'KATL': None, 'KBOS': upstream.reports['KBOS'],
+                                                          'KXYZ': None}
+    assert set(cache._failed_at) == {'KATL'} and set(cache._absent) == {'KXYZ'}
+    assert cache.stats()['in_flight'] == 0
@@ -0,0 +1,69 @@
+import os
+import sys
+
+import numpy as np
+
+from Src.model_export import (_threshold_probes, export_scaler_free_model, fold_scaler_into_model, main,
+                              raw_threshold, verify_folded_model)
+from Src.predict_zone_risk import FEATURE_COLUMNS, predict_zone_risk
+
+
+def test_raw_threshold_sends_float32_values_like_the_scaled_split():
+    rng = np.random.default_rng(0)
+    for threshold, mean, scale in zip(rng.normal(0, 2, 50), rng.normal(0, 500, 50), rng.uniform(0.01, 300, 50)):
+        threshold = np.float32(threshold)
+        raw = raw_threshold(threshold, mean, scale)
+        below, above = np.nextafter(raw, np.float32(-np.inf)), raw
+        assert np.float32((np.float64(below) - mean) / scale) < threshold
+        assert np.float32((np.float64(above) - mean) / scale) >= threshold
+
+
+def test_folded_model_round_trips_on_training_rows(zone_model):
+    model, scaler, X = zone_model
+    folded = fold_scaler_into_model(model, scaler)
+    X = X.copy()
+    X[::17, 4] = np.nan
+
+    report = verify_folded_model(model, scaler, folded, X)
+    assert report['identical'], report
+
+
+def test_folded_model_round_trips_on_split_boundaries(zone_model):
+    model, scaler, _ = zone_model
+    folded = fold_scaler_into_model(model, scaler)
+    probes = _threshold_probes(model, scaler, len(FEATURE_COLUMNS), n_random=2000)
+
+    report = verify_folded_model(model, scaler, folded, probes)
+    assert report['identical'], report
+
+
+def test_cli_exports_and_verifies_every_zone(model_dir, monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['model_export.py', '--model-dir', model_dir])
+    main()
+
+    assert '0 mismatches' in capsys.readouterr().out
+    assert os.path.exists(os.path.join(model_dir, 'Testzone_raw_model.pkl'))
+
+
+def test_exported_model_scores_float64_rows_like_the_scaled_model(registry, model_dir, zone_model):
+    model, scaler, _ = zone_model
+    probes = _threshold_probes(model, scaler, len(FEATURE_COLUMNS), n_random=2000)
+    scaled = registry.get('Testzone').predict(probes)
+
+    export_scaler_free_model('Testzone', model, scaler, FEATURE_COLUMNS, probes, output_dir=model_dir)
+    raw = registry.get('Testzone')
+    assert raw.scaler is None
+    np.testing.assert_array_equal(raw.predict(probes), scaled)
+
+
+def test_exported_model_is_served_without_the_scaler(registry, model_dir, zone_model):
+    model, scaler, X = zone_model
+    weather = {name: float(value) for name, value in zip(FEATURE_COLUMNS, X[0])}
+    expected = predict_zone_risk('Testzone', weather)
+
+    folded, report = export_scaler_free_model('Testzone', model, scaler, FEATURE_COLUMNS, X, output_dir=model_dir)
+    assert folded is not None and report['identical']
+
+    bundle = registry.get('Testzone')
+    assert bundle.scaler is None
+    np.testing.assert_array_equal(predict_zone_risk('Testzone', weather), expected)
@@ -0,0 +1,33 @@
+import numpy as np
+
+from Src.model_export import export_scaler_free_model
+from Src.predict_zone_risk import FEATURE_COLUMNS, predict_observation, predict_zones_batch
+
+
+def observation_with_gaps(X):
+    observation = {name: float(value) for name, value in zip(FEATURE_COLUMNS, X[0])}
+    for name in ('ceiling_ft', 'gust', 'pressure_change'):
+        del observation[name]
+    observation['visibility_km'] = None
+    return observation
+
+
+def test_fast_path_matches_the_batch_path(registry, zone_model):
+    _, _, X = zone_model
+    observation = observation_with_gaps(X)
+
+    batch = predict_zones_batch([observation], zones=['Testzone'])
+    assert not batch['errors']
+    np.testing.assert_array_equal(predict_observation('Testzone', observation), batch['scores'][:, 0])
+
+
+def test_scaled_and_raw_bundles_fill_gaps_alike(registry, model_dir, zone_model):
+    model, scaler, X = zone_model
+    observation = observation_with_gaps(X)
+    scaled = predict_observation('Testzone', observation)
+
+    export_scaler_free_model('Testzone', model, scaler, FEATURE_COLUMNS, X, output_dir=model_dir)
+    bundle = registry.get('Testzone')
+    assert bundle.scaler is None
+    np.testing.assert_array_equal(bundle.impute_values, scaler.mean_)
+    np.testing.assert_array_equal(predict_observation('Testzone', observation), scaled)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from Src.prediction_cache import DEFAULT_RESOLUTIONS, PredictionCache
+from Src.predict_zone_risk import (FEATURE_COLUMNS, predict_observation, predict_observations_cached,
+                                   predict_zone_risk_cached)
+from conftest import synthetic_weather
+
+
+@pytest.fixture
+def observations():
+    rows = synthetic_weather(200, seed=3)
+    observations = [{name: float(value) for name, value in zip(FEATURE_COLUMNS, row)} for row in rows]
+    for observation in observations[::5]:
+        del observation['ceiling_ft']
+    return observations
+
+
+def snap(observation):
+    """The observation as the cache scores it"""
+    snapped = dict(observation)
+    for name, step in DEFAULT_RESOLUTIONS.items():
+        if name in snapped:
+            snapped[name] = np.round(snapped[name] / step) * step
+    return snapped
+
+
+def test_cached_score_is_the_uncached_score_of_the_snapped_observation(registry, observations):
+    cache = PredictionCache()
+    for observation in observations:
+        cached = predict_zone_risk_cached('Testzone', observation, cache=cache)
+        np.testing.assert_allclose(cached, predict_observation('Testzone', snap(observation)), rtol=0, atol=1e-5)
+
+
+def test_hit_returns_the_miss_score(registry, observations):
+    cache = PredictionCache()
+    misses = [predict_zone_risk_cached('Testzone', observation, cache=cache)[0] for observation in observations]
+    hits = [predict_zone_risk_cached('Testzone', observation, cache=cache)[0] for observation in observations]
+
+    assert hits == misses
+    assert cache.stats()['hits'] == len(observations)
+
+
+def test_observations_in_one_bin_share_an_entry(registry, observations):
+    cache = PredictionCache()
+    observation = observations[1]
+    nearby = {**observation, 'temperature_c': np.round(observation['temperature_c'] * 2) / 2 + 0.1}
+
+    first = predict_zone_risk_cached('Testzone', observation, cache=cache)
+    assert predict_zone_risk_cached('Testzone', nearby, cache=cache) == first
+    assert cache.stats()['size'] == 1
+
+
+def test_batch_scores_match_single_observation_scores(registry, observations):
+    cache = PredictionCache()
+    batch = predict_observations_cached('Testzone', observations, cache=cache)
+    assert cache.stats()['size'] == len(observations)
+
+    single = [predict_zone_risk_cached('Testzone', observation, cache=PredictionCache())[0]
+              for observation in observations]
+    np.testing.assert_array_equal(batch, single)
+    np.testing.assert_array_equal(predict_observations_cached('Testzone', observations, cache=cache), batch)
+
+
+def test_expired_entries_are_rescored():
+    cache = PredictionCache(ttl=0)
+    cache.put('key', 1.0)
+    assert cache.get('key') is None
+    assert cache.stats()['expirations'] == 1
@@ -0,0 +1,116 @@
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from Src import tune_zone_models as tuning
+from Src.train_zones import load_tuned_params
+from conftest import synthetic_weather
+
+SEARCH = {'n_trials': 6, 'min_rounds': 2, 'max_rounds': 18, 'rate': 3, 'hyperband': False,
+          'latency_weight': 0.0, 'max_latency': None, 'seed': 7, 'rows': [800, 200]}
+
+
+def settings(**changes):
+    search = {**SEARCH, **changes}
+    return {'brackets': tuning.brackets(search['n_trials'], search['min_rounds'], search['max_rounds'],
+                                        search['rate'], search['hyperband']),
+            'rate': search['rate'], 'seed': search['seed'], 'n_jobs': 1,
+            'latency_weight': search['latency_weight'], 'max_latency': search['max_latency'], 'search': search}
+
+
+@pytest.fixture
+def stage_dir(tmp_path):
+    X = synthetic_weather(1000, seed=5).astype(np.float32)
+    y = (X[:, 3] + np.random.default_rng(5).normal(0, 3, len(X))).astype(np.float32)
+    for subset, rows in (('train', slice(0, 800)), ('valid', slice(800, None))):
+        np.save(tmp_path / f'{subset}_X.npy', X[rows])
+        np.save(tmp_path / f'{subset}_y.npy', y[rows])
+    yield str(tmp_path)
+    tuning._MATRICES.pop(str(tmp_path), None)
+
+
+def search(stage_dir, path, current, executor=None):
+    """Run every bracket against the journal at `path`; returns (finalists, new trials)"""
+    journal = tuning.open_journal(path, current['search'])
+    resumed = len(journal)
+    finalists = []
+    for bracket, (n_configs, budgets) in enumerate(current['brackets']):
+        finalists += tuning.successive_halving('Testzone', stage_dir, bracket, n_configs, budgets, journal, path,
+                                               current, executor)
+    return finalists, len(journal) - resumed
+
+
+def outcome(finalists):
+    return [(record['trial'], record['rmse'], record['trees']) for record in finalists]
+
+
+def test_rung_budgets():
+    assert tuning.rung_budgets(25, 675, 3) == [25, 75, 225, 675]
+    assert tuning.rung_budgets(5, 50, 3) == [5, 15, 45, 50]
+
+
+def test_interrupted_search_resumes_to_the_same_result(stage_dir, tmp_path):
+    path = str(tmp_path / 'full.jsonl')
+    finalists, trials = search(stage_dir, path, settings())
+    assert trials == 6 + 2 + 1
+
+    with open(path) as f:
+        lines = f.readlines()
+    resumed_path = str(tmp_path / 'resumed.jsonl')
+    with open(resumed_path, 'w') as f:
+        f.writelines(lines[:5])
+        f.write(lines[5][:20])  # Torn mid-write
+
+    resumed, trials = search(stage_dir, resumed_path, settings())
+    assert trials == 9 - 4
+    assert outcome(resumed) == outcome(finalists)
+
+    again, trials = search(stage_dir, resumed_path, settings())
+    assert trials == 0 and outcome(again) == outcome(finalists)
+
+
+def test_journal_from_other_settings_is_rejected(stage_dir, tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    search(stage_dir, path, settings())
+
+    for changes in ({'latency_weight': 0.05}, {'max_latency': 10}, {'max_rounds': 54}, {'seed': 8},
+                    {'rows': [900, 100]}):
+        with pytest.raises(ValueError, match=next(iter(changes))):
+            search(stage_dir, path, settings(**changes))
+
+
+def test_objectives_are_recomputed_and_never_written(stage_dir, tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    current = settings(max_latency=1)
+    finalists, _ = search(stage_dir, path, current)
+
+    assert all(math.isinf(record['objective']) for record in finalists)
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    assert records[0] == {'search': current['search']}
+    assert all('objective' not in record for record in records[1:])
+
+
+def test_parallel_trials_match_sequential_trials(stage_dir, tmp_path):
+    sequential, _ = search(stage_dir, str(tmp_path / 'sequential.jsonl'), settings())
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        parallel, trials = search(stage_dir, str(tmp_path / 'parallel.jsonl'), settings(), executor)
+
+    assert trials == 9
+    assert outcome(parallel) == outcome(sequential)
+
+
+def test_tuned_params_load_from_a_file_or_the_tuning_directory(tmp_path):
+    best = {'xgb_params': {'max_depth': 4, 'eta': 0.1}, 'n_estimators': 37}
+    (tmp_path / 'South_best.json').write_text(json.dumps(best))
+
+    assert load_tuned_params(str(tmp_path), ['South', 'North']) == {'South': (best['xgb_params'], 37)}
+    assert load_tuned_params(str(tmp_path / 'South_best.json'), ['South', 'North']) == {
+        'South': (best['xgb_params'], 37), 'North': (best['xgb_params'], 37)}
+
+    (tmp_path / 'North_best.json').write_text(json.dumps({'rmse': 1.0}))
+    with pytest.raises(ValueError, match='North_best.json'):
+        load_tuned_params(str(tmp_path), ['North'])
@@ -0,0 +1,59 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from Src.zone_model_registry import ZoneModelRegistry
+from conftest import fit_zone_model, synthetic_weather
+
+
+def test_bundle_is_loaded_once(registry):
+    first = registry.get('Testzone')
+    second = registry.get('Testzone')
+
+    assert second is first
+    stats = registry.stats()
+    assert (stats['misses'], stats['hits'], stats['reloads']) == (1, 1, 0)
+
+
+def test_replaced_artifacts_are_reloaded(registry, model_dir):
+    bundle = registry.get('Testzone')
+
+    model, _ = fit_zone_model(synthetic_weather(500, seed=1), seed=1)
+    path = os.path.join(model_dir, 'Testzone_model.pkl')
+    joblib.dump(model, path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    reloaded = registry.get('Testzone')
+    assert reloaded is not bundle
+    assert reloaded.version != bundle.version
+    assert registry.stats()['reloads'] == 1
+
+
+def test_least_recently_used_zone_is_evicted(model_dir):
+    for zone_name in ('Other', 'Third'):
+        for suffix in ('model.pkl', 'scaler.pkl', 'features.txt'):
+            with open(os.path.join(model_dir, f'Testzone_{suffix}'), 'rb') as src, \
+                    open(os.path.join(model_dir, f'{zone_name}_{suffix}'), 'wb') as dst:
+                dst.write(src.read())
+
+    registry = ZoneModelRegistry(model_dir, max_size=2)
+    registry.get('Testzone')
+    registry.get('Other')
+    registry.get('Testzone')
+    registry.get('Third')
+
+    assert registry.stats()['cached_zones'] == ['Testzone:xgboost', 'Third:xgboost']
+    assert registry.stats()['evictions'] == 1
+
+
+def test_impute_values_fall_back_to_scaler_mean(registry, zone_model):
+    _, scaler, _ = zone_model
+    np.testing.assert_array_equal(registry.get('Testzone').impute_values, scaler.mean_)
+
+
+def test_missing_zone_raises(registry):
+    with pytest.raises(FileNotFoundError):
+        registry.get('Nowhere')